@@ -4,34 +4,51 @@ from flask_bcrypt import Bcrypt
 from flask_cors import CORS
 import uuid
 import os
-import random
-import base64  
 from werkzeug.utils import secure_filename
 from datetime import datetime
-from google.cloud import vision
-from google.cloud import storage
-from google.oauth2 import service_account
 import io
 import certifi
-import json
 import os
 from dotenv import load_dotenv
-from flask import send_file
-import tempfile
-import shutil
+from flask import send_file, abort
 
 # Load environment variables from .env file
 if os.path.exists('.env'):
     load_dotenv()
 
 # Import your utility modules
-from utils.color_utils import get_color_name, calculate_color_match_score
-from utils.vision_utils import extract_colors, predict_clothing_category
-from utils.outfit_generator import generate_color_coordinated_outfit, has_color
-from utils.gemini_utils import analyze_clothing_occasion, categorize_clothing_item
-from utils.weather_utils import get_weather_by_location, get_weather_condition_by_id, determine_outfit_type_by_weather
-from utils.weather_outfit_generator import generate_weather_based_outfit
-from utils.gemini_weather_utils import analyze_clothing_weather_suitability
+from utils.color_utils import calculate_color_match_score
+from utils.vision_utils import predict_clothing_category
+from utils.outfit_generator import (generate_color_coordinated_outfit, has_color, select_matching_items,
+                                   select_matching_shoes_for_complete_top)
+from utils.gemini_utils import categorize_clothing_item
+from utils.weather_utils import (get_weather_by_location, get_weather_condition_by_id, determine_outfit_type_by_weather,
+                                 get_forecast_by_location, get_local_window, summarize_forecast_window,
+                                 get_forecast_timezone, FORECAST_DAYS)
+from utils.weather_outfit_generator import (generate_weather_based_outfit, generate_layered_weather_outfit,
+                                            generate_weekly_weather_outfits)
+from utils.image_utils import (IMMUTABLE_MAX_AGE, encode_webp_variant, get_webp_variant_key,
+                               select_image_variant, compute_file_etag)
+from utils.storage_utils import create_storage_backend
+from utils.gcp_clients import get_vision_client, get_storage_client, has_google_credentials
+from utils.readiness import Warmup
+from utils.upload_utils import analyze_clothing_image, analysis_from_item, get_enrichment_executor, with_upload_slot
+from utils.perceptual_hash import compute_image_fingerprint, dhash_to_hex, get_hash_bands, find_near_duplicate
+from utils.image_embedding import embed_image, embedding_to_bytes, IMAGE_EMBEDDINGS_ENABLED
+from utils.local_classifier import LOCAL_CLASSIFIER_ENABLED, classify_locally
+from utils.similarity_index import find_similar_items
+from utils.wardrobe_utils import (ensure_indexes, bump_wardrobe_version, get_wardrobe_etag, parse_page_size,
+                                  build_wardrobe_query, serialize_wardrobe_item, get_wardrobe_index, load_wardrobe_items)
+from utils.metrics import MongoCommandMetrics, init_request_metrics, render_metrics, stage_timer
+from utils.item_features import compute_item_features, is_complete_top_item, is_outerwear_item
+from utils.recent_suggestions import (ensure_recent_suggestion_indexes, get_recent_item_ids, record_recent_suggestion,
+                                      choose_fresh_item)
+from utils.outfit_planner import build_plan_days, plan_outfits, DEFAULT_MAX_ITEM_USES, DEFAULT_PLAN_TIME_BUDGET, MAX_PLAN_TIME_BUDGET
+from utils.packing_optimizer import optimize_packing, DEFAULT_PACKING_TIME_BUDGET, MAX_PACKING_TIME_BUDGET
+from utils.accessory_utils import bucket_accessories, select_outfit_accessories, serialize_accessory
+from utils.outfit_stream import (STREAM_FORMATS, DEFAULT_STREAM_LIMIT, MAX_STREAM_LIMIT, DEFAULT_TIME_BUDGET,
+                                 MAX_TIME_BUDGET, build_candidate_source, stream_outfit_events)
+from utils.wardrobe_summary import get_wardrobe_summary, wardrobe_change, get_category_count, get_summary_colors
 
 app = Flask(__name__, 
             template_folder="../templates",  
@@ -45,60 +62,67 @@ app.secret_key = os.environ.get("SECRET_KEY", os.urandom(24))
 app.config["SESSION_PERMANENT"] = False 
 app.config["SESSION_TYPE"] = "filesystem"  
 
+# Time every request by route (exposed on /metrics)
+init_request_metrics(app)
+
+# Let a front-end server (nginx/Apache) stream image files with X-Sendfile when configured.
+# Otherwise send_file uses the WSGI server's file wrapper (sendfile under gunicorn).
+app.config["USE_X_SENDFILE"] = os.environ.get("USE_X_SENDFILE", "").lower() in ("1", "true", "yes")
+
 # Configure MongoDB connection from environment variable
 connection_string = os.environ.get("MONGODB_URI")
 app.config["MONGO_URI"] = connection_string
 
 # Initialize Flask-PyMongo with certificate verification
-mongo = PyMongo(app, tlsCAFile=certifi.where())
+# connect=False defers the first connection to the first query (or the warm-up below)
+mongo = PyMongo(app, tlsCAFile=certifi.where(), event_listeners=[MongoCommandMetrics()], connect=False)
 bcrypt = Bcrypt(app)
 
 # Set up collections
 users_collection = mongo.db.users  
 uploads_collection = mongo.db.uploads
 outfits_collection = mongo.db.outfits
+wardrobe_summaries_collection = mongo.db.wardrobe_summaries
+recent_suggestions_collection = mongo.db.recent_suggestions
 
 # Define allowed file extensions
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'webp'}
 
+# Maximum number of files accepted by one /upload_batch request
+MAX_BATCH_UPLOAD_FILES = int(os.environ.get("MAX_BATCH_UPLOAD_FILES", 100))
+
+# Results returned by /similar_items, and alternatives offered when an item is marked unavailable
+DEFAULT_SIMILAR_ITEMS = 6
+MAX_SIMILAR_ITEMS = 24
+UNAVAILABLE_ALTERNATIVES = 3
+
+# Outfit slots /regenerate_slot can re-pick (named after the item category that fills them)
+REGENERATE_SLOTS = ["top", "bottom", "shoes"]
+
+# Forecast planning modes for /plan_weather_outfit and the number of days in a week plan
+PLAN_MODES = ["window", "pair", "week"]
+WEEK_PLAN_DAYS = 7
+
 # Local Image Storage Setup
 UPLOAD_FOLDER = os.path.join(app.static_folder, 'uploads')
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
 # Google Cloud setup
-# Set up clients for Vision API and Cloud Storage
-vision_client = None
-storage_client = None
+# The Vision and Storage clients are created lazily on first use (see utils/gcp_clients.py)
 GCS_BUCKET = os.environ.get('GCS_BUCKET_NAME', 'aesclo-images')
 
-try:
-    # Option 1: Check for file path
-    google_creds_path = os.environ.get("GOOGLE_APPLICATION_CREDENTIALS")
-    if google_creds_path:
-        os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = google_creds_path
-        vision_client = vision.ImageAnnotatorClient()
-        storage_client = storage.Client()
-    else:
-        # Option 2: Check for JSON content in environment variable
-        google_creds_json = os.environ.get("GOOGLE_CREDENTIALS_JSON")
-        if google_creds_json:
-            credentials_info = json.loads(google_creds_json)
-            credentials = service_account.Credentials.from_service_account_info(credentials_info)
-            vision_client = vision.ImageAnnotatorClient(credentials=credentials)
-            storage_client = storage.Client(credentials=credentials)
-        else:
-            # Option 3: Check for base64 encoded JSON content
-            google_creds_b64 = os.environ.get("GOOGLE_CREDENTIALS_B64")
-            if google_creds_b64:
-                credentials_json = base64.b64decode(google_creds_b64).decode('utf-8')
-                credentials_info = json.loads(credentials_json)
-                credentials = service_account.Credentials.from_service_account_info(credentials_info)
-                vision_client = vision.ImageAnnotatorClient(credentials=credentials)
-                storage_client = storage.Client(credentials=credentials)
-            else:
-                print("WARNING: No Google credentials found. Vision API and Cloud Storage will not work.")
-except Exception as e:
-    print(f"Error setting up Google Cloud clients: {e}")
+if not has_google_credentials():
+    print("WARNING: No Google credentials found. Vision API and Cloud Storage will not work.")
+
+# Image storage backend: "local" keeps files in static/uploads, "gcs" stores them in GCS_BUCKET
+# so any replica behind a load balancer can serve them
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "local").lower()
+storage_backend = create_storage_backend(
+    STORAGE_BACKEND,
+    UPLOAD_FOLDER,
+    storage_client_factory=get_storage_client if has_google_credentials() else None,
+    bucket_name=GCS_BUCKET
+)
 
 # Get Gemini API key from environment
 gemini_api_key = os.environ.get("GEMINI_API_KEY")
@@ -112,14 +136,101 @@ app.config['OPENWEATHER_API_KEY'] = os.environ.get("OPENWEATHER_API_KEY")
 if not app.config['OPENWEATHER_API_KEY']:
     print("WARNING: No OpenWeather API key found. Weather features will not work.")
 
-# Create tmp directory if it doesn't exist (for temporary file storage)
-if not os.path.exists('/tmp'):
-    os.makedirs('/tmp')
+# Cap the request size (default 128 MB, enough for a batch upload of phone photos).
+# Multipart files are spooled to disk by Werkzeug and read into memory one at a time per worker.
+app.config["MAX_CONTENT_LENGTH"] = int(os.environ.get("MAX_UPLOAD_BYTES", 128 * 1024 * 1024))
+
+# Ping MongoDB and make sure the collection indexes exist
+def warm_up_mongodb():
+    mongo.cx.admin.command("ping")
+    # Create the indexes behind the wardrobe queries and filters
+    ensure_indexes(users_collection, uploads_collection, outfits_collection, wardrobe_summaries_collection)
+    ensure_recent_suggestion_indexes(recent_suggestions_collection)
+
+def warm_up_vision():
+    if not has_google_credentials():
+        return "skipped: no Google credentials"
+    if get_vision_client() is None:
+        raise RuntimeError("Vision client could not be created")
+
+def warm_up_storage():
+    if storage_backend.serves_locally:
+        return "skipped: local storage"
+    storage_backend.bucket
+
+# Connect to MongoDB and build the Google clients in the background so the first
+# requests don't pay for it; /readyz reports when everything is warm
+warmup = Warmup({
+    "mongodb": warm_up_mongodb,
+    "vision": warm_up_vision,
+    "storage": warm_up_storage
+})
+warmup.start()
 
 # Check if the uploaded file has an allowed extension
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+# Serve uploaded images with long-lived immutable caching
+# Every upload gets a UUID filename and is never rewritten, so browsers never need to revalidate
+@app.route("/images/<path:filename>")
+def serve_image(filename):
+    # Serve the precompressed WebP variant to browsers that support it
+    key, mimetype = select_image_variant(filename, request.headers.get("Accept", ""), storage_backend)
+
+    # Remote backends hand the browser a (signed) URL to fetch the object directly
+    if not storage_backend.serves_locally:
+        if not storage_backend.exists(key):
+            abort(404)
+        response = redirect(storage_backend.get_url(key))
+        response.cache_control.private = True
+        response.cache_control.max_age = min(3600, storage_backend.signed_url_ttl // 2)
+        response.vary.add("Accept")
+        return response
+
+    file_path = storage_backend.local_path(key)
+    if file_path is None or not os.path.isfile(file_path):
+        abort(404)
+
+    # conditional=True answers If-None-Match with 304 and Range requests with 206
+    response = send_file(
+        file_path,
+        mimetype=mimetype,
+        conditional=True,
+        etag=compute_file_etag(file_path),
+        max_age=IMMUTABLE_MAX_AGE
+    )
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    response.vary.add("Accept")
+    return response
+
+# Liveness probe: the process is up and serving requests
+@app.route("/healthz")
+def healthz():
+    return jsonify({"status": "ok"})
+
+# Readiness probe: 503 until MongoDB and the Google clients have been warmed up
+@app.route("/readyz")
+def readyz():
+    report = warmup.report()
+    return jsonify(report), 200 if report["ready"] else 503
+
+# Prometheus scrape endpoint; set METRICS_TOKEN to require "Authorization: Bearer <token>"
+@app.route("/metrics")
+def metrics():
+    metrics_token = os.environ.get("METRICS_TOKEN")
+    if metrics_token and request.headers.get("Authorization") != f"Bearer {metrics_token}":
+        return jsonify({"message": "Unauthorized"}), 401
+
+    return app.response_class(render_metrics(), mimetype="text/plain; version=0.0.4")
+
+def get_item_image_key(item):
+    """
+    Get the storage key of an item's image (older items only store the image URL)
+    """
+    return item.get("image_key") or os.path.basename(item["image_url"])
+
 # Route for login page
 @app.route("/", methods=["GET"])
 def login_page():
@@ -193,6 +304,86 @@ def generator():
         return redirect(url_for("login_page"))
     return render_template("generator.html") 
 
+def has_enough_items_for_outfit(user):
+    """
+    Check from the wardrobe summary whether the user has at least one top and one pair of shoes
+    """
+    summary = get_wardrobe_summary(wardrobe_summaries_collection, uploads_collection, users_collection, user["_id"])
+    return get_category_count(summary, "top") >= 1 and get_category_count(summary, "shoes") >= 1
+
+def remember_suggestion(user, top, bottom, shoes, accessories=()):
+    """
+    Add a generated outfit to the user's recent suggestions (only complete outfits are remembered)
+    """
+    if top and shoes:
+        record_recent_suggestion(recent_suggestions_collection, user["_id"], [top, bottom, shoes, *accessories])
+
+def serialize_outer_layer(outer_layer):
+    """
+    Convert the outer layer of a layered outfit into the JSON shape of the other outfit items (None if there isn't one)
+    """
+    if not outer_layer:
+        return None
+    return {
+        "id": outer_layer["item_id"],
+        "image_url": outer_layer["image_url"],
+        "colors": outer_layer.get("colors", []),
+        "weather_conditions": outer_layer.get("weather_conditions", []),
+        "temperature_range": outer_layer.get("temperature_range", []),
+        "unavailable": outer_layer.get("unavailable", False)
+    }
+
+def serialize_planned_outfit(top, bottom, shoes, outer_layer, accessories):
+    """
+    Convert a planned outfit into JSON, with every garment in the weather outfit item shape (None if nothing fits)
+    """
+    if not top or not shoes:
+        return None
+    return {
+        "top": serialize_outer_layer(top),
+        "bottom": serialize_outer_layer(bottom),
+        "shoes": serialize_outer_layer(shoes),
+        "outer_layer": serialize_outer_layer(outer_layer),
+        "accessories": [serialize_accessory(accessory) for accessory in accessories],
+        "is_complete_top": bottom is None
+    }
+
+def fill_days_from_forecast(days, location, start_hour, end_hour):
+    """
+    Give plan days without a temperature the forecast temperature and worst condition of their start_hour-end_hour
+    window (days already past are left as they are)
+
+    Returns:
+        list: Forecast summary per day (None where the forecast wasn't used), or None if the forecast is unavailable
+    """
+    with stage_timer("forecast_fetch"):
+        forecast_data = get_forecast_by_location(location, app.config['OPENWEATHER_API_KEY'])
+    if not forecast_data:
+        return None
+    today = datetime.now(get_forecast_timezone(forecast_data)).date()
+    forecasts = [None] * len(days)
+    for index, day in enumerate(days):
+        day_offset = (day["date"] - today).days
+        if day.get("temperature") is not None or day_offset < 0:
+            continue
+        forecast = summarize_forecast_window(forecast_data, *get_local_window(forecast_data, day_offset, start_hour, end_hour))
+        day["temperature"] = forecast["temperature"]
+        day["weather_condition"] = day.get("weather_condition") or forecast["weather_condition"]
+        forecasts[index] = forecast
+    return forecasts
+
+def suggest_accessories(data, wardrobe_items, top, bottom, shoes, temperature=None, weather_condition=None, recent_item_ids=None):
+    """
+    Pick accessories for a generated outfit when the request asked for them ("include_accessories")
+
+    Returns:
+        list: Accessory items (empty unless requested)
+    """
+    if not data.get("include_accessories"):
+        return []
+    buckets = bucket_accessories([item for item in wardrobe_items if item["category"] == "accessory"])
+    return select_outfit_accessories(buckets, top, bottom, shoes, temperature, weather_condition, recent_item_ids)
+
 @app.route("/get_wardrobe_colors")
 def get_wardrobe_colors():
     if "user" not in session:
@@ -202,20 +393,9 @@ def get_wardrobe_colors():
     if not user:
         return jsonify({"success": False, "message": "User not found"}), 404
 
-    # Get all tops from the wardrobe
-    tops = list(uploads_collection.find({"user_id": user["_id"], "category": "top"}))
-    
-    # Extract only the first (dominant) color from each top
-    available_colors = set()
-    for item in tops:
-        if 'colors' in item and item['colors'] and len(item['colors']) > 0:
-            # Only add the first color (dominant color) from each top
-            first_color = item['colors'][0]['name'].lower()
-            if first_color != 'unknown':  # Skip unknown colors
-                available_colors.add(first_color)
-    
-    # Sort colors alphabetically
-    sorted_colors = sorted(list(available_colors))
+    # Dominant (first) colors of the user's tops, kept up to date in the wardrobe summary
+    summary = get_wardrobe_summary(wardrobe_summaries_collection, uploads_collection, users_collection, user["_id"])
+    sorted_colors = get_summary_colors(summary)
     
     return jsonify({
         "success": True,
@@ -235,13 +415,24 @@ def generate_color_outfit():
     if not user:
         return jsonify({"success": False, "message": "User not found"}), 404
     
+    # Check the wardrobe summary before loading every item
+    if not has_enough_items_for_outfit(user):
+        return jsonify({
+            "success": False, 
+            "message": "Your wardrobe needs at least one top and one pair of shoes to generate an outfit."
+        }), 400
+
     # Get the user's wardrobe items
-    wardrobe_items = list(uploads_collection.find({"user_id": user["_id"]}))
+    with stage_timer("wardrobe_load"):
+        wardrobe_items = load_wardrobe_items(uploads_collection, user["_id"])
     
     # Separate items by category
     all_tops = [item for item in wardrobe_items if item["category"] == "top"]
     bottoms = [item for item in wardrobe_items if item["category"] == "bottom"]
     shoes = [item for item in wardrobe_items if item["category"] == "shoes"]
+
+    # Items shown in the user's last few outfits are down-weighted so "generate" gives something new
+    recent_item_ids = get_recent_item_ids(recent_suggestions_collection, user["_id"])
     
     # Check if wardrobe has enough items
     if len(all_tops) < 1 or len(shoes) < 1:
@@ -253,7 +444,7 @@ def generate_color_outfit():
     # Handle random color coordination if requested
     if random_color or base_color == 'random':
         # For random color, choose a random top first
-        selected_top = random.choice(all_tops)
+        selected_top = choose_fresh_item(all_tops, recent_item_ids)
         
         # Get the dominant color of the selected top if available
         if 'colors' in selected_top and selected_top['colors']:
@@ -270,8 +461,10 @@ def generate_color_outfit():
             if is_complete_top:
                 # For complete tops, generate outfit without bottoms
                 _, _, best_shoes = generate_color_coordinated_outfit(
-                    [selected_top], bottoms, shoes, base_color
+                    [selected_top], bottoms, shoes, base_color, recent_item_ids
                 )
+                accessories = suggest_accessories(data, wardrobe_items, selected_top, None, best_shoes,
+                                                  recent_item_ids=recent_item_ids)
                 
                 if not all([selected_top, best_shoes]):
                     return jsonify({
@@ -279,6 +472,7 @@ def generate_color_outfit():
                         "message": "Could not generate a well-coordinated outfit. Please try again or try with different items."
                     }), 400
                 
+                remember_suggestion(user, selected_top, None, best_shoes, accessories)
                 # Return outfit with no bottom
                 return jsonify({
                     "success": True,
@@ -297,13 +491,16 @@ def generate_color_outfit():
                     },
                     "coordination_style": f"Random Color Coordination",
                     "base_color": base_color,
+                    "accessories": [serialize_accessory(accessory) for accessory in accessories],
                     "is_complete_top": True  # Flag to indicate this is a complete top
                 })
             else:
                 # Use the outfit generator module with the random top as the basis
                 _, best_bottom, best_shoes = generate_color_coordinated_outfit(
-                    [selected_top], bottoms, shoes, base_color
+                    [selected_top], bottoms, shoes, base_color, recent_item_ids
                 )
+                accessories = suggest_accessories(data, wardrobe_items, selected_top, best_bottom, best_shoes,
+                                                  recent_item_ids=recent_item_ids)
                 
                 if not all([selected_top, best_bottom, best_shoes]):
                     return jsonify({
@@ -311,6 +508,7 @@ def generate_color_outfit():
                         "message": "Could not generate a well-coordinated outfit. Please try again or try with different items."
                     }), 400
                 
+                remember_suggestion(user, selected_top, best_bottom, best_shoes, accessories)
                 return jsonify({
                     "success": True,
                     "top": {
@@ -333,6 +531,7 @@ def generate_color_outfit():
                     },
                     "coordination_style": f"Random Color Coordination",
                     "base_color": base_color,
+                    "accessories": [serialize_accessory(accessory) for accessory in accessories],
                     "is_complete_top": False  # Flag to indicate this is a standard top
                 })
         except Exception as e:
@@ -369,8 +568,10 @@ def generate_color_outfit():
     try:
         # Generate outfit using the module function
         selected_top, best_bottom, best_shoes = generate_color_coordinated_outfit(
-            tops_with_color, bottoms, shoes, base_color
+            tops_with_color, bottoms, shoes, base_color, recent_item_ids
         )
+        accessories = suggest_accessories(data, wardrobe_items, selected_top, best_bottom, best_shoes,
+                                          recent_item_ids=recent_item_ids)
         
         # Check if selected top is a "complete" top
         is_complete_top = selected_top.get("subcategory") == "complete"
@@ -383,6 +584,7 @@ def generate_color_outfit():
                     "message": "Could not generate a well-coordinated outfit. Please try again or try with different items."
                 }), 400
             
+            remember_suggestion(user, selected_top, best_bottom, best_shoes, accessories)
             # Return outfit with no bottom 
             return jsonify({
                 "success": True,
@@ -401,6 +603,7 @@ def generate_color_outfit():
                 },
                 "coordination_style": f"{base_color.capitalize()} Coordinated Outfit",
                 "base_color": base_color,
+                "accessories": [serialize_accessory(accessory) for accessory in accessories],
                 "is_complete_top": True  # Flag to indicate this is a complete top
             })
         else:
@@ -411,6 +614,7 @@ def generate_color_outfit():
                     "message": "Could not generate a well-coordinated outfit. Please try again or try with different items."
                 }), 400
             
+            remember_suggestion(user, selected_top, best_bottom, best_shoes, accessories)
             return jsonify({
                 "success": True,
                 "top": {
@@ -433,6 +637,7 @@ def generate_color_outfit():
                 },
                 "coordination_style": f"{base_color.capitalize()} Coordinated Outfit",
                 "base_color": base_color,
+                "accessories": [serialize_accessory(accessory) for accessory in accessories],
                 "is_complete_top": False  # Flag to indicate this is a standard top
             })
     except Exception as e:
@@ -462,8 +667,16 @@ def generate_occasion_outfit():
     if not user:
         return jsonify({"success": False, "message": "User not found"}), 404
     
+    # Check the wardrobe summary before loading every item
+    if not has_enough_items_for_outfit(user):
+        return jsonify({
+            "success": False, 
+            "message": "Your wardrobe needs at least one top and one pair of shoes to generate an outfit."
+        }), 400
+
     # Get the user's wardrobe items
-    wardrobe_items = list(uploads_collection.find({"user_id": user["_id"]}))
+    with stage_timer("wardrobe_load"):
+        wardrobe_items = load_wardrobe_items(uploads_collection, user["_id"])
     
     # Separate items by category
     tops = [item for item in wardrobe_items if item["category"] == "top"]
@@ -506,9 +719,13 @@ def generate_occasion_outfit():
         from utils.outfit_generator import generate_occasion_based_outfit
         
         # Only pass items that match the selected occasion to the generator
+        recent_item_ids = get_recent_item_ids(recent_suggestions_collection, user["_id"])
         selected_top, best_bottom, best_shoes = generate_occasion_based_outfit(
-            tops_matching_occasion, bottoms_matching_occasion, shoes_matching_occasion, target_occasion
+            tops_matching_occasion, bottoms_matching_occasion, shoes_matching_occasion, target_occasion,
+            recent_item_ids
         )
+        accessories = suggest_accessories(data, wardrobe_items, selected_top, best_bottom, best_shoes,
+                                          recent_item_ids=recent_item_ids)
         
         # Check if this is a complete top outfit (no bottom)
         is_complete_top = selected_top.get("subcategory") == "complete"
@@ -521,6 +738,7 @@ def generate_occasion_outfit():
                     "message": f"Could not generate a suitable outfit for {target_occasion}. Try uploading more items."
                 }), 400
             
+            remember_suggestion(user, selected_top, best_bottom, best_shoes, accessories)
             # Return outfit with no bottom 
             return jsonify({
                 "success": True,
@@ -540,6 +758,7 @@ def generate_occasion_outfit():
                     "unavailable": best_shoes.get("unavailable", False)
                 },
                 "outfit_type": f"{target_occasion.capitalize()} Outfit",
+                "accessories": [serialize_accessory(accessory) for accessory in accessories],
                 "is_complete_top": True  # Flag to indicate this is a complete top
             })
         else:
@@ -550,6 +769,7 @@ def generate_occasion_outfit():
                     "message": f"Could not generate a suitable outfit for {target_occasion}. Try uploading more items."
                 }), 400
             
+            remember_suggestion(user, selected_top, best_bottom, best_shoes, accessories)
             return jsonify({
                 "success": True,
                 "top": {
@@ -574,6 +794,7 @@ def generate_occasion_outfit():
                     "unavailable": best_shoes.get("unavailable", False)
                 },
                 "outfit_type": f"{target_occasion.capitalize()} Outfit",
+                "accessories": [serialize_accessory(accessory) for accessory in accessories],
                 "is_complete_top": False  # Flag to indicate this is a standard top
             })
     except Exception as e:
@@ -597,6 +818,11 @@ def save_outfit():
     # Validate data - only top and shoes are required now
     if not all([top_id, shoe_id]):
         return jsonify({"success": False, "message": "Missing required outfit items"}), 400
+
+    # Accessories are optional
+    accessory_ids = data.get("accessory_ids") or []
+    if not isinstance(accessory_ids, list) or not all(isinstance(accessory_id, str) for accessory_id in accessory_ids):
+        return jsonify({"success": False, "message": "accessory_ids must be a list of item IDs"}), 400
         
     # Get user information
     user = users_collection.find_one({"username": session["user"]})
@@ -610,6 +836,8 @@ def save_outfit():
         "top_id": top_id,
         "bottom_id": bottom_id,  
         "shoe_id": shoe_id,
+        "outer_layer_id": data.get("outer_layer_id"),
+        "accessory_ids": accessory_ids,
         "created_at": datetime.utcnow().isoformat(),
         "name": data.get("name", f"Outfit {datetime.now().strftime('%Y-%m-%d %H:%M')}")
     }
@@ -646,7 +874,15 @@ def get_wardrobe():
     if not user:
         return jsonify({"message": "User not found"}), 404
 
-    wardrobe_items = list(uploads_collection.find({"user_id": user["_id"]}))
+    # Unchanged wardrobes are answered from the browser cache
+    etag = get_wardrobe_etag(user, "get_wardrobe")
+    if request.if_none_match.contains_weak(etag):
+        return wardrobe_not_modified(etag)
+
+    wardrobe_items = list(uploads_collection.find(
+        {"user_id": user["_id"]},
+        {"item_id": 1, "image_url": 1, "category": 1, "subcategory": 1}
+    ))
 
     wardrobe = {"tops": [], "bottoms": [], "shoes": [], "accessories": []}
 
@@ -668,7 +904,63 @@ def get_wardrobe():
         elif item["category"] == "accessory":
             wardrobe["accessories"].append(item_data)
 
-    return jsonify(wardrobe)
+    response = jsonify(wardrobe)
+    return with_wardrobe_etag(response, etag)
+
+def wardrobe_not_modified(etag):
+    """
+    Build an empty 304 response for a wardrobe request whose ETag still matches
+    """
+    response = app.response_class(status=304)
+    return with_wardrobe_etag(response, etag)
+
+def with_wardrobe_etag(response, etag):
+    """
+    Attach the wardrobe ETag and make the browser revalidate it on every use
+    """
+    response.set_etag(etag, weak=True)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+# Paginated wardrobe API: filtering happens in MongoDB and pages are walked with an _id cursor
+@app.route("/api/wardrobe")
+def api_wardrobe():
+    if "user" not in session:
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
+
+    user = users_collection.find_one({"username": session["user"]})
+    if not user:
+        return jsonify({"success": False, "message": "User not found"}), 404
+
+    limit = parse_page_size(request.args.get("limit"))
+    if limit is None:
+        return jsonify({"success": False, "message": "limit must be a number"}), 400
+
+    query, error = build_wardrobe_query(user["_id"], request.args)
+    if error:
+        return jsonify({"success": False, "message": error}), 400
+
+    etag = get_wardrobe_etag(user, request.query_string.decode())
+    if request.if_none_match.contains_weak(etag):
+        return wardrobe_not_modified(etag)
+
+    # Fetch one extra item to know whether another page follows
+    wardrobe_items = list(
+        uploads_collection.find(query, {
+            "item_id": 1, "image_url": 1, "category": 1, "subcategory": 1, "colors.name": 1,
+            "occasions": 1, "weather_conditions": 1, "temperature_range": 1, "unavailable": 1
+        }).sort("_id", 1).limit(limit + 1)
+    )
+
+    has_more = len(wardrobe_items) > limit
+    wardrobe_items = wardrobe_items[:limit]
+
+    response = jsonify({
+        "success": True,
+        "items": [serialize_wardrobe_item(item) for item in wardrobe_items],
+        "next_cursor": str(wardrobe_items[-1]["_id"]) if has_more else None
+    })
+    return with_wardrobe_etag(response, etag)
 
 @app.route("/signup")
 def signup():
@@ -720,6 +1012,21 @@ def saved_outfits():
             # Add bottom image only if it exists
             if bottom:
                 outfit_data["bottom_image"] = bottom["image_url"]  
+
+            # Outer layer of a layered (cold weather) outfit
+            if outfit.get("outer_layer_id"):
+                outer_layer = uploads_collection.find_one({"item_id": outfit["outer_layer_id"]}, {"image_url": 1})
+                if outer_layer:
+                    outfit_data["outer_layer_image"] = outer_layer["image_url"]
+
+            # Accessories that were since removed from the wardrobe are simply left out
+            accessory_ids = outfit.get("accessory_ids") or []
+            if accessory_ids:
+                accessories = uploads_collection.find({"item_id": {"$in": accessory_ids}}, {"image_url": 1, "subcategory": 1})
+                outfit_data["accessories"] = [
+                    {"image_url": accessory["image_url"], "subcategory": accessory.get("subcategory")}
+                    for accessory in accessories
+                ]
             
             outfits_data.append(outfit_data)
     
@@ -748,8 +1055,91 @@ def delete_outfit():
     else:
         return jsonify({"success": False, "message": "Outfit not found or not authorized to delete"}), 404
 
+def store_uploaded_image(image_bytes, unique_filename, content_type=None):
+    """
+    Store an uploaded image and its precompressed WebP variant in the configured storage backend
+    """
+    webp_variant = encode_webp_variant(io.BytesIO(image_bytes), len(image_bytes))
+    if webp_variant:
+        storage_backend.save(get_webp_variant_key(unique_filename), webp_variant, content_type="image/webp")
+    storage_backend.save(unique_filename, io.BytesIO(image_bytes), content_type=content_type)
+
+def build_upload_document(user, unique_filename, analysis, fingerprint=(None, None)):
+    """
+    Build the wardrobe item document for a stored upload from its analysis results
+    (and its perceptual fingerprint, which makes it findable by later near-duplicate uploads)
+    """
+    document = {
+        "item_id": str(uuid.uuid4()),
+        "user_id": user["_id"],
+        "image_url": url_for('serve_image', filename=unique_filename),
+        "image_key": unique_filename,
+        "timestamp": datetime.utcnow().isoformat(),
+        "category": analysis["category"],
+        "subcategory": analysis["subcategory"],
+        "colors": analysis["colors"],
+        "occasions": analysis["occasions"],
+        "weather_conditions": analysis["weather_conditions"],
+        "temperature_range": analysis["temperature_range"]
+    }
+    # Precompute what the outfit generators need so they don't re-derive it on every request
+    document["features"] = compute_item_features(document)
+    dhash, color_signature = fingerprint
+    if dhash is not None:
+        document["dhash"] = dhash_to_hex(dhash)
+        document["dhash_bands"] = get_hash_bands(dhash)
+        document["color_signature"] = color_signature
+    if analysis.get("category_source"):
+        document["category_source"] = analysis["category_source"]
+    if analysis.get("embedding") is not None:
+        document["embedding"] = embedding_to_bytes(analysis["embedding"])
+    return document
+
+def analyze_or_reuse(user, image_bytes):
+    """
+    Analyze an upload, unless it is a near-duplicate of one of the user's items (the same garment
+    re-cropped or re-compressed), in which case that item's analysis is reused without any API calls.
+    With LOCAL_CLASSIFIER on, an upload whose analysis isn't cached is compared with the user's labeled
+    items first, and Gemini is only asked for the category when the local vote isn't confident.
+
+    Returns:
+        tuple: (analysis or None, perceptual fingerprint, near-duplicate item or None)
+    """
+    with stage_timer("upload_dhash"):
+        fingerprint = compute_image_fingerprint(image_bytes)
+    duplicate = None
+    if fingerprint[0] is not None:
+        duplicate, _ = find_near_duplicate(uploads_collection, user["_id"], *fingerprint)
+
+    embedding = None
+
+    def classify():
+        # Only runs when the analysis isn't cached
+        nonlocal embedding
+        with stage_timer("upload_embedding"):
+            embedding = embed_image(image_bytes)
+        if embedding is None:
+            return None
+        with stage_timer("upload_local_classify"):
+            return classify_locally(uploads_collection, user, embedding)
+
+    if duplicate:
+        analysis = analysis_from_item(duplicate)
+    else:
+        analysis = analyze_clothing_image(image_bytes, get_vision_client(),
+                                          classify if LOCAL_CLASSIFIER_ENABLED else None)
+    if analysis and (LOCAL_CLASSIFIER_ENABLED or IMAGE_EMBEDDINGS_ENABLED):
+        # Items keep their embedding for the classifier's references and similarity search
+        if embedding is None:
+            with stage_timer("upload_embedding"):
+                embedding = embed_image(image_bytes)
+        if embedding is not None:
+            analysis["embedding"] = embedding
+    return analysis, fingerprint, duplicate
+
 # Image upload handler with color detection and occasion tagging
 @app.route("/upload", methods=["POST"])
+@with_upload_slot(lambda: (render_template("upload.html", error_message="The server is busy processing other uploads. Please try again in a moment."), 503))
 def upload_image():
     if "user" not in session:
         return redirect(url_for("login_page"))
@@ -772,92 +1162,128 @@ def upload_image():
     # Generate unique filename
     filename = secure_filename(file.filename)
     unique_filename = f"{uuid.uuid4()}_{filename}"
-    temp_filepath = os.path.join('/tmp', unique_filename)
-    file.save(temp_filepath)
 
-    # Predict clothing category and subcategory
-    from utils.gemini_utils import categorize_clothing_item
-    predicted_category, predicted_subcategory = categorize_clothing_item(temp_filepath)
+    # Read the upload once; every analyzer and the storage write share this buffer
+    with stage_timer("upload_read"):
+        image_bytes = file.read()
 
-    if not predicted_category:
-        try:
-            os.remove(temp_filepath)
-        except Exception as e:
-            print(f"Error removing temporary file: {e}")
+    # Categorize, extract colors and tag occasions/weather (cached by image content, reused from near-duplicates)
+    with stage_timer("upload_analyze"):
+        analysis, fingerprint, duplicate = analyze_or_reuse(user, image_bytes)
+    if not analysis:
         return render_template("upload.html", error_message="This image doesn't appear to be a clothing item. Please upload a clearer or different image.")
 
-    # Extract dominant colors
+    # Store the image (and its precompressed WebP variant) in the configured storage backend
     try:
-        colors = extract_colors(temp_filepath, vision_client)
-        from utils.vision_utils import get_top_colors
-        top_colors = get_top_colors(colors, max_colors=3, single_color_threshold=0.6)
-
-        dominant_colors = []
-        for color in top_colors:
-            rgb = color['rgb']
-            color_name = get_color_name(rgb)
-            dominant_colors.append({
-                'name': color_name,
-                'rgb': rgb,
-                'score': color['score'],
-                'pixel_fraction': color['pixel_fraction']
-            })
-    except Exception as e:
-        print(f"Error extracting colors: {e}")
-        dominant_colors = []
+        with stage_timer("upload_store"):
+            store_uploaded_image(image_bytes, unique_filename, content_type=file.mimetype)
+
+        new_upload = build_upload_document(user, unique_filename, analysis, fingerprint)
+        with stage_timer("upload_db_insert"), wardrobe_change(users_collection, wardrobe_summaries_collection, user["_id"]) as change:
+            uploads_collection.insert_one(new_upload)
+            change.add([new_upload])
+        bump_wardrobe_version(users_collection, user["_id"])
+        warning_message = None
+        if duplicate:
+            warning_message = "This looks like an item already in your wardrobe, so its details were copied from that item."
+        return render_template("upload.html", success_message="Image uploaded successfully!", warning_message=warning_message)
 
-    # Analyze clothing occasion
-    try:
-        occasions = analyze_clothing_occasion(temp_filepath)
-        print(f"Detected occasions: {occasions}")
     except Exception as e:
-        print(f"Error analyzing clothing occasion: {e}")
-        occasions = []
+        print(f"Error saving uploaded image: {e}")
+        return render_template("upload.html", error_message=f"Upload failed: {str(e)}")
 
-    # Analyze weather suitability
-    try:
-        weather_suitability = analyze_clothing_weather_suitability(temp_filepath)
-        weather_conditions = weather_suitability.get("weather_conditions", [])
-        temperature_range = weather_suitability.get("temperature_range", [])
-        print(f"Detected weather suitability: {weather_suitability}")
-    except Exception as e:
-        print(f"Error analyzing clothing weather suitability: {e}")
-        weather_conditions = []
-        temperature_range = []
+def enrich_batch_upload(file, unique_filename, user):
+    """
+    Analyze and store one file of a batch upload (runs on the enrichment pool).
+    The file is read here so only the files currently being analyzed are held in memory.
+
+    Returns:
+        tuple: (analysis or None if the image isn't a clothing item, perceptual fingerprint, near-duplicate item or None)
+    """
+    image_bytes = file.read()
+    content_type = file.mimetype
+    analysis, fingerprint, duplicate = analyze_or_reuse(user, image_bytes)
+    if analysis:
+        store_uploaded_image(image_bytes, unique_filename, content_type=content_type)
+    return analysis, fingerprint, duplicate
+
+# Batch upload API: many files in one multipart request, analyzed with bounded concurrency
+@app.route("/upload_batch", methods=["POST"])
+@with_upload_slot(lambda: (jsonify({"success": False, "message": "The server is busy processing other uploads. Please try again in a moment."}), 503))
+def upload_batch():
+    if "user" not in session:
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
 
-    # Move file to static/uploads/ using shutil to avoid cross-device error
-    try:
-        upload_folder = os.path.join(app.static_folder, 'uploads')
-        os.makedirs(upload_folder, exist_ok=True)
-        final_path = os.path.join(upload_folder, unique_filename)
-        shutil.move(temp_filepath, final_path)  # ✅ safer than os.rename across file systems
-
-        # Create image URL served from static
-        image_url = url_for('static', filename=f'uploads/{unique_filename}')
-
-        new_upload = {
-            "item_id": str(uuid.uuid4()),
-            "user_id": user["_id"],
-            "image_url": image_url,
-            "timestamp": datetime.utcnow().isoformat(),
-            "category": predicted_category,
-            "subcategory": predicted_subcategory,
-            "colors": dominant_colors,
-            "occasions": occasions,
-            "weather_conditions": weather_conditions,
-            "temperature_range": temperature_range
-        }
+    files = request.files.getlist("files")
+    if not files:
+        return jsonify({"success": False, "message": "No files provided"}), 400
 
-        uploads_collection.insert_one(new_upload)
-        return render_template("upload.html", success_message="Image uploaded successfully!")
+    if len(files) > MAX_BATCH_UPLOAD_FILES:
+        return jsonify({
+            "success": False,
+            "message": f"Too many files. Upload at most {MAX_BATCH_UPLOAD_FILES} files per batch."
+        }), 400
 
-    except Exception as e:
-        print(f"Error saving uploaded image: {e}")
+    user = users_collection.find_one({"username": session["user"]})
+    if not user:
+        return jsonify({"success": False, "message": "User not found"}), 404
+
+    executor = get_enrichment_executor()
+    results = []
+    pending = []
+
+    for index, file in enumerate(files):
+        result = {"index": index, "filename": file.filename, "success": False}
+        results.append(result)
+
+        if file.filename == '':
+            result["message"] = "No file selected"
+            continue
+        if not allowed_file(file.filename):
+            result["message"] = "Invalid file type. Only .png, .jpg, .jpeg, .webp are allowed."
+            continue
+
+        unique_filename = f"{uuid.uuid4()}_{secure_filename(file.filename)}"
+        future = executor.submit(enrich_batch_upload, file, unique_filename, user)
+        pending.append((result, unique_filename, future))
+
+    # Collect results in request order and insert every successful item at once
+    new_uploads = []
+    for result, unique_filename, future in pending:
         try:
-            os.remove(temp_filepath)
-        except:
-            pass
-        return render_template("upload.html", error_message=f"Upload failed: {str(e)}")
+            analysis, fingerprint, duplicate = future.result()
+        except Exception as e:
+            print(f"Error processing {result['filename']}: {e}")
+            result["message"] = f"Upload failed: {str(e)}"
+            continue
+
+        if not analysis:
+            result["message"] = "This image doesn't appear to be a clothing item."
+            continue
+
+        new_upload = build_upload_document(user, unique_filename, analysis, fingerprint)
+        new_uploads.append(new_upload)
+        result.update({
+            "success": True,
+            "item_id": new_upload["item_id"],
+            "image_url": new_upload["image_url"],
+            "category": new_upload["category"],
+            "subcategory": new_upload["subcategory"],
+            "near_duplicate_of": duplicate["item_id"] if duplicate else None
+        })
+
+    if new_uploads:
+        with wardrobe_change(users_collection, wardrobe_summaries_collection, user["_id"]) as change:
+            uploads_collection.insert_many(new_uploads)
+            change.add(new_uploads)
+        bump_wardrobe_version(users_collection, user["_id"])
+
+    return jsonify({
+        "success": len(new_uploads) > 0,
+        "uploaded": len(new_uploads),
+        "failed": len(results) - len(new_uploads),
+        "results": results
+    })
 
 @app.route("/remove_item/<item_id>", methods=["POST"])
 def remove_item(item_id):
@@ -873,26 +1299,30 @@ def remove_item(item_id):
     if not item:
         return jsonify({"success": False, "message": "Item not found or not authorized to delete"}), 404
 
-    # Delete the image file from static/uploads/
+    # Delete the image file and its WebP variant from storage
     try:
         if "image_url" in item:
-            filename = os.path.basename(item["image_url"])
-            local_path = os.path.join(app.static_folder, 'uploads', filename)
-            if os.path.exists(local_path):
-                os.remove(local_path)
+            image_key = get_item_image_key(item)
+            storage_backend.delete_many([image_key, get_webp_variant_key(image_key)])
     except Exception as e:
-        print(f"Error deleting file from local storage: {e}")
+        print(f"Error deleting file from storage: {e}")
 
     # Delete the item from MongoDB
-    result = uploads_collection.delete_one({"item_id": item_id, "user_id": user["_id"]})
+    with wardrobe_change(users_collection, wardrobe_summaries_collection, user["_id"]) as change:
+        result = uploads_collection.delete_one({"item_id": item_id, "user_id": user["_id"]})
+        if result.deleted_count > 0:
+            change.add([item], sign=-1)
 
     if result.deleted_count > 0:
+        bump_wardrobe_version(users_collection, user["_id"])
+
         # Also remove the item from any saved outfits
         outfits_to_delete = list(outfits_collection.find({
             "$or": [
                 {"top_id": item_id},
                 {"bottom_id": item_id},
-                {"shoe_id": item_id}
+                {"shoe_id": item_id},
+                {"outer_layer_id": item_id}
             ],
             "user_id": user["_id"]
         }))
@@ -901,6 +1331,13 @@ def remove_item(item_id):
             outfit_ids = [outfit["outfit_id"] for outfit in outfits_to_delete]
             outfits_collection.delete_many({"outfit_id": {"$in": outfit_ids}})
 
+        # Accessories are optional, so outfits that used one just lose it
+        if item.get("category") == "accessory":
+            outfits_collection.update_many(
+                {"user_id": user["_id"], "accessory_ids": item_id},
+                {"$pull": {"accessory_ids": item_id}}
+            )
+
         return jsonify({"success": True, "message": "Item deleted successfully"})
     else:
         return jsonify({"success": False, "message": "Failed to delete item"}), 500
@@ -918,20 +1355,20 @@ def clear_wardrobe():
         # Find all wardrobe items for this user
         wardrobe_items = list(uploads_collection.find({"user_id": user["_id"]}))
 
-        # Delete each file from local storage
+        # Delete all image files (and WebP variants) from storage in one batch
+        image_keys = []
         for item in wardrobe_items:
             if "image_url" in item:
-                filename = os.path.basename(item["image_url"])
-                local_path = os.path.join(app.static_folder, 'uploads', filename)
-                if os.path.exists(local_path):
-                    try:
-                        os.remove(local_path)
-                    except Exception as e:
-                        print(f"Error deleting {filename}: {e}")
+                image_key = get_item_image_key(item)
+                image_keys.extend([image_key, get_webp_variant_key(image_key)])
+        storage_backend.delete_many(image_keys)
 
         # Delete wardrobe items and outfits from MongoDB
-        uploads_result = uploads_collection.delete_many({"user_id": user["_id"]})
+        with wardrobe_change(users_collection, wardrobe_summaries_collection, user["_id"]) as change:
+            uploads_result = uploads_collection.delete_many({"user_id": user["_id"]})
+            change.clear()
         outfits_result = outfits_collection.delete_many({"user_id": user["_id"]})
+        bump_wardrobe_version(users_collection, user["_id"])
 
         return jsonify({
             "success": True,
@@ -1018,8 +1455,16 @@ def generate_weather_outfit():
     if not user:
         return jsonify({"success": False, "message": "User not found"}), 404
     
+    # Check the wardrobe summary before loading every item
+    if not has_enough_items_for_outfit(user):
+        return jsonify({
+            "success": False, 
+            "message": "Your wardrobe needs at least one top and one pair of shoes to generate an outfit."
+        }), 400
+
     # Get the user's wardrobe items
-    wardrobe_items = list(uploads_collection.find({"user_id": user["_id"]}))
+    with stage_timer("wardrobe_load"):
+        wardrobe_items = load_wardrobe_items(uploads_collection, user["_id"])
     
     # Separate items by category
     tops = [item for item in wardrobe_items if item["category"] == "top"]
@@ -1035,9 +1480,19 @@ def generate_weather_outfit():
     
     # Use the weather-based outfit generator to generate an outfit
     try:
-        selected_top, best_bottom, best_shoes = generate_weather_based_outfit(
-            tops, bottoms, shoes, temperature, weather_condition
-        )
+        recent_item_ids = get_recent_item_ids(recent_suggestions_collection, user["_id"])
+        outer_layer = None
+        # Clients that send "layered": true get an outer layer over the top on cold and cool days
+        if data.get("layered", False):
+            selected_top, best_bottom, best_shoes, outer_layer = generate_layered_weather_outfit(
+                tops, bottoms, shoes, temperature, weather_condition, recent_item_ids
+            )
+        else:
+            selected_top, best_bottom, best_shoes = generate_weather_based_outfit(
+                tops, bottoms, shoes, temperature, weather_condition, recent_item_ids
+            )
+        accessories = suggest_accessories(data, wardrobe_items, selected_top, best_bottom, best_shoes,
+                                          temperature, weather_condition, recent_item_ids)
         
         # Check if this is a complete top outfit (no bottom)
         is_complete_top = selected_top.get("subcategory") == "complete"
@@ -1050,6 +1505,7 @@ def generate_weather_outfit():
                     "message": f"Could not generate a suitable outfit for {weather_condition} weather at {temperature}°F. Try uploading more items."
                 }), 400
             
+            remember_suggestion(user, selected_top, best_bottom, best_shoes, [outer_layer, *accessories])
             # Return outfit with no bottom
             return jsonify({
                 "success": True,
@@ -1070,7 +1526,9 @@ def generate_weather_outfit():
                     "temperature_range": best_shoes.get("temperature_range", []),
                     "unavailable": best_shoes.get("unavailable", False)
                 },
+                "outer_layer": serialize_outer_layer(outer_layer),
                 "outfit_type": f"{weather_condition.capitalize()} Weather Outfit ({temperature}°F)",
+                "accessories": [serialize_accessory(accessory) for accessory in accessories],
                 "is_complete_top": True  # Flag to indicate this is a complete top
             })
         else:
@@ -1081,6 +1539,7 @@ def generate_weather_outfit():
                     "message": f"Could not generate a suitable outfit for {weather_condition} weather at {temperature}°F. Try uploading more items."
                 }), 400
             
+            remember_suggestion(user, selected_top, best_bottom, best_shoes, [outer_layer, *accessories])
             return jsonify({
                 "success": True,
                 "top": {
@@ -1107,7 +1566,9 @@ def generate_weather_outfit():
                     "temperature_range": best_shoes.get("temperature_range", []),
                     "unavailable": best_shoes.get("unavailable", False)
                 },
+                "outer_layer": serialize_outer_layer(outer_layer),
                 "outfit_type": f"{weather_condition.capitalize()} Weather Outfit ({temperature}°F)",
+                "accessories": [serialize_accessory(accessory) for accessory in accessories],
                 "is_complete_top": False  # Flag to indicate this is a standard top
             })
     except Exception as e:
@@ -1116,7 +1577,474 @@ def generate_weather_outfit():
             "success": False,
             "message": "Failed to generate outfit. Please try again."
         }), 500
+
+# Plans outfits from the forecast instead of current conditions. "window" dresses for the worst of one
+# time window, "pair" splits it into a morning and an evening outfit, "week" plans the next seven days.
+@app.route("/plan_weather_outfit", methods=["POST"])
+def plan_weather_outfit():
+    if "user" not in session:
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
+
+    data = request.get_json(silent=True) or {}
+    location = data.get("location")
+    mode = data.get("mode", "window")
+
+    if not location:
+        return jsonify({
+            "success": False,
+            "message": "Please provide a location (city name or ZIP code)."
+        }), 400
+    if mode not in PLAN_MODES:
+        return jsonify({"success": False, "message": f"Invalid mode. Valid options are: {', '.join(PLAN_MODES)}"}), 400
+
+    try:
+        start_hour = int(data.get("start_hour", 8))
+        end_hour = int(data.get("end_hour", 20))
+        day_offset = int(data.get("day_offset", 0))
+        split_hour = int(data.get("split_hour", (start_hour + end_hour) // 2))
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "message": "start_hour, end_hour, split_hour and day_offset must be whole numbers"}), 400
+    if not 0 <= start_hour < end_hour <= 24:
+        return jsonify({"success": False, "message": "Hours must satisfy 0 <= start_hour < end_hour <= 24."}), 400
+    if not 0 <= day_offset < FORECAST_DAYS:
+        return jsonify({"success": False, "message": f"day_offset must be between 0 and {FORECAST_DAYS - 1}."}), 400
+    if mode == "pair" and not start_hour < split_hour < end_hour:
+        return jsonify({"success": False, "message": "split_hour must fall between start_hour and end_hour."}), 400
+
+    user = users_collection.find_one({"username": session["user"]})
+    if not user:
+        return jsonify({"success": False, "message": "User not found"}), 404
+
+    # Check the wardrobe summary before loading every item
+    if not has_enough_items_for_outfit(user):
+        return jsonify({
+            "success": False,
+            "message": "Your wardrobe needs at least one top and one pair of shoes to generate an outfit."
+        }), 400
+
+    # One forecast fetch (usually a cache hit) covers every window in the plan
+    with stage_timer("forecast_fetch"):
+        forecast_data = get_forecast_by_location(location, app.config['OPENWEATHER_API_KEY'])
+    if not forecast_data:
+        return jsonify({
+            "success": False,
+            "message": "Could not retrieve the forecast. Please check the location and try again."
+        }), 404
+
+    if mode == "window":
+        windows = [("window", get_local_window(forecast_data, day_offset, start_hour, end_hour))]
+    elif mode == "pair":
+        windows = [("morning", get_local_window(forecast_data, day_offset, start_hour, split_hour)),
+                   ("evening", get_local_window(forecast_data, day_offset, split_hour, end_hour))]
+    else:
+        windows = []
+        for offset in range(WEEK_PLAN_DAYS):
+            window = get_local_window(forecast_data, offset, start_hour, end_hour)
+            windows.append((window[0].date().isoformat(), window))
+    forecasts = [summarize_forecast_window(forecast_data, start, end) for _, (start, end) in windows]
+
+    # One wardrobe snapshot for the whole plan
+    with stage_timer("wardrobe_load"):
+        wardrobe_items = load_wardrobe_items(uploads_collection, user["_id"])
+
+    tops = [item for item in wardrobe_items if item["category"] == "top"]
+    bottoms = [item for item in wardrobe_items if item["category"] == "bottom"]
+    shoes = [item for item in wardrobe_items if item["category"] == "shoes"]
+
+    if len(tops) < 1 or len(shoes) < 1:
+        return jsonify({
+            "success": False,
+            "message": "Your wardrobe needs at least one top and one pair of shoes to generate an outfit."
+        }), 400
+
+    try:
+        recent_item_ids = get_recent_item_ids(recent_suggestions_collection, user["_id"])
+        if mode == "week":
+            outfits = generate_weekly_weather_outfits(tops, bottoms, shoes, forecasts, recent_item_ids)
+        else:
+            outfits = [generate_layered_weather_outfit(tops, bottoms, shoes, forecast["temperature"],
+                                                       forecast["weather_condition"], recent_item_ids)
+                       for forecast in forecasts]
+
+        plans = []
+        suggestions = []
+        for (label, _), forecast, (top, bottom, shoe, outer_layer) in zip(windows, forecasts, outfits):
+            accessories = []
+            if top and shoe:
+                accessories = suggest_accessories(data, wardrobe_items, top, bottom, shoe, forecast["temperature"],
+                                                  forecast["weather_condition"], recent_item_ids)
+                suggestions.append((top, bottom, shoe, [outer_layer, *accessories]))
+            plans.append({
+                "label": label,
+                "forecast": forecast,
+                "outfit": serialize_planned_outfit(top, bottom, shoe, outer_layer, accessories)
+            })
+    except Exception as e:
+        print(f"Error planning weather outfit: {e}")
+        return jsonify({
+            "success": False,
+            "message": "Failed to plan outfits. Please try again."
+        }), 500
+
+    if not any(plan["outfit"] for plan in plans):
+        return jsonify({
+            "success": False,
+            "message": "Could not plan a suitable outfit for the forecast. Try uploading more items."
+        }), 400
+
+    # A week plan is a schedule rather than a suggestion to wear now, so it isn't remembered
+    if mode != "week":
+        for suggestion in suggestions:
+            remember_suggestion(user, *suggestion)
+    return jsonify({
+        "success": True,
+        "location": forecast_data.get("city", {}).get("name", location),
+        "mode": mode,
+        "plans": plans
+    })
+
+# Plans a date range in one go: a beam search over every day's candidates maximizes the total score
+# while keeping each item under its usage limit. Days can set their own occasion and weather; with a
+# location, days without a temperature take it from the forecast.
+@app.route("/plan_week", methods=["POST"])
+def plan_week():
+    if "user" not in session:
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
+
+    data = request.get_json(silent=True) or {}
+    days, error_message = build_plan_days(data)
+    if error_message:
+        return jsonify({"success": False, "message": error_message}), 400
+
+    try:
+        max_uses = max(int(data.get("max_uses", DEFAULT_MAX_ITEM_USES)), 1)
+        time_budget = min(max(float(data.get("time_budget_ms", DEFAULT_PLAN_TIME_BUDGET * 1000)) / 1000, 0.05), MAX_PLAN_TIME_BUDGET)
+        start_hour = int(data.get("start_hour", 8))
+        end_hour = int(data.get("end_hour", 20))
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "message": "max_uses, time_budget_ms, start_hour and end_hour must be numbers"}), 400
+    if not 0 <= start_hour < end_hour <= 24:
+        return jsonify({"success": False, "message": "Hours must satisfy 0 <= start_hour < end_hour <= 24."}), 400
+
+    user = users_collection.find_one({"username": session["user"]})
+    if not user:
+        return jsonify({"success": False, "message": "User not found"}), 404
+
+    # Check the wardrobe summary before loading every item
+    if not has_enough_items_for_outfit(user):
+        return jsonify({
+            "success": False,
+            "message": "Your wardrobe needs at least one top and one pair of shoes to generate an outfit."
+        }), 400
+
+    forecasts = [None] * len(days)
+    if data.get("location"):
+        forecasts = fill_days_from_forecast(days, data["location"], start_hour, end_hour)
+        if forecasts is None:
+            return jsonify({
+                "success": False,
+                "message": "Could not retrieve the forecast. Please check the location and try again."
+            }), 404
+
+    # One wardrobe snapshot for the whole plan
+    with stage_timer("wardrobe_load"):
+        wardrobe_items = load_wardrobe_items(uploads_collection, user["_id"])
+
+    tops = [item for item in wardrobe_items if item["category"] == "top"]
+    bottoms = [item for item in wardrobe_items if item["category"] == "bottom"]
+    shoes = [item for item in wardrobe_items if item["category"] == "shoes"]
+
+    try:
+        plan = plan_outfits(days, tops, bottoms, shoes, max_uses, time_budget)
+        plans = []
+        for day, forecast, planned in zip(days, forecasts, plan["days"]):
+            accessories = []
+            if planned["top"] and planned["shoes"]:
+                accessories = suggest_accessories(data, wardrobe_items, planned["top"], planned["bottom"], planned["shoes"],
+                                                  day.get("temperature"), day.get("weather_condition"))
+            plans.append({
+                "date": day["date"].isoformat(),
+                "occasion": day.get("occasion"),
+                "temperature": day.get("temperature"),
+                "weather_condition": day.get("weather_condition"),
+                "forecast": forecast,
+                "score": planned["score"],
+                "outfit": serialize_planned_outfit(planned["top"], planned["bottom"], planned["shoes"],
+                                                   planned["outer_layer"], accessories)
+            })
+    except Exception as e:
+        print(f"Error planning outfits: {e}")
+        return jsonify({
+            "success": False,
+            "message": "Failed to plan outfits. Please try again."
+        }), 500
+
+    if not any(entry["outfit"] for entry in plans):
+        return jsonify({
+            "success": False,
+            "message": "Could not plan any outfit for these days. Try uploading more items or relaxing the constraints."
+        }), 400
+
+    return jsonify({
+        "success": True,
+        "days": plans,
+        "total_score": plan["total_score"],
+        "complete": plan["complete"],
+        "max_uses": max_uses
+    })
+
+# Picks the fewest items that still give every trip day its own valid outfit. Takes the same day options as
+# /plan_week (trip_length is a shorthand for end_date).
+@app.route("/packing_list", methods=["POST"])
+def packing_list():
+    if "user" not in session:
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
+
+    data = request.get_json(silent=True) or {}
+    days, error_message = build_plan_days(data)
+    if error_message:
+        return jsonify({"success": False, "message": error_message}), 400
+
+    try:
+        time_budget = min(max(float(data.get("time_budget_ms", DEFAULT_PACKING_TIME_BUDGET * 1000)) / 1000, 0.05), MAX_PACKING_TIME_BUDGET)
+        start_hour = int(data.get("start_hour", 8))
+        end_hour = int(data.get("end_hour", 20))
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "message": "time_budget_ms, start_hour and end_hour must be numbers"}), 400
+    if not 0 <= start_hour < end_hour <= 24:
+        return jsonify({"success": False, "message": "Hours must satisfy 0 <= start_hour < end_hour <= 24."}), 400
+
+    user = users_collection.find_one({"username": session["user"]})
+    if not user:
+        return jsonify({"success": False, "message": "User not found"}), 404
+
+    # Check the wardrobe summary before loading every item
+    if not has_enough_items_for_outfit(user):
+        return jsonify({
+            "success": False,
+            "message": "Your wardrobe needs at least one top and one pair of shoes to generate an outfit."
+        }), 400
+
+    if data.get("location") and fill_days_from_forecast(days, data["location"], start_hour, end_hour) is None:
+        return jsonify({
+            "success": False,
+            "message": "Could not retrieve the forecast. Please check the location and try again."
+        }), 404
+
+    with stage_timer("wardrobe_load"):
+        wardrobe_items = load_wardrobe_items(uploads_collection, user["_id"])
+
+    tops = [item for item in wardrobe_items if item["category"] == "top"]
+    bottoms = [item for item in wardrobe_items if item["category"] == "bottom"]
+    shoes = [item for item in wardrobe_items if item["category"] == "shoes"]
+
+    try:
+        packing = optimize_packing(days, tops, bottoms, shoes, time_budget)
+    except Exception as e:
+        print(f"Error optimizing packing list: {e}")
+        return jsonify({
+            "success": False,
+            "message": "Failed to build a packing list. Please try again."
+        }), 500
+
+    if not packing["items"]:
+        return jsonify({
+            "success": False,
+            "message": f"Your wardrobe can't make {len(days)} different outfits for this trip. Try fewer days or upload more items."
+        }), 400
+
+    packed_items = packing["items"] + ([packing["outer_layer"]] if packing["outer_layer"] else [])
+    return jsonify({
+        "success": True,
+        "items": [dict(serialize_outer_layer(item), category=item["category"], subcategory=item.get("subcategory"))
+                  for item in packed_items],
+        "item_count": len(packed_items),
+        "days": [{
+            "date": day["date"].isoformat(),
+            "occasion": day.get("occasion"),
+            "temperature": day.get("temperature"),
+            "weather_condition": day.get("weather_condition"),
+            "score": round(score, 3),
+            "outfit": serialize_planned_outfit(top, bottom, shoe, outer_layer, [])
+        } for day, (score, top, bottom, shoe, outer_layer) in zip(days, packing["days"])],
+        "lower_bound": packing["lower_bound"],
+        "optimal": packing["optimal"]
+    })
+
+# Streams outfit suggestions as NDJSON (default) or Server-Sent Events, best first, until the
+# limit or time budget runs out. Accepts the options of the three generate routes plus "mode".
+@app.route("/stream_outfits", methods=["GET", "POST"])
+def stream_outfits():
+    if "user" not in session:
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
+
+    # POST takes a JSON body (fetch streaming); GET takes query parameters (EventSource)
+    data = request.get_json(silent=True) if request.method == "POST" else request.args
+    data = data or {}
+
+    stream_format = data.get("format")
+    if not stream_format:
+        stream_format = "sse" if request.accept_mimetypes.best == "text/event-stream" else "ndjson"
+    if stream_format not in STREAM_FORMATS:
+        return jsonify({"success": False, "message": "Invalid format. Valid options are: ndjson, sse"}), 400
+
+    try:
+        limit = min(max(int(data.get("limit", DEFAULT_STREAM_LIMIT)), 1), MAX_STREAM_LIMIT)
+        time_budget = min(max(float(data.get("time_budget_ms", DEFAULT_TIME_BUDGET * 1000)) / 1000, 0.05), MAX_TIME_BUDGET)
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "message": "limit and time_budget_ms must be numbers"}), 400
+
+    user = users_collection.find_one({"username": session["user"]})
+    if not user:
+        return jsonify({"success": False, "message": "User not found"}), 404
+
+    # Check the wardrobe summary before loading every item
+    if not has_enough_items_for_outfit(user):
+        return jsonify({
+            "success": False,
+            "message": "Your wardrobe needs at least one top and one pair of shoes to generate an outfit."
+        }), 400
+
+    # One wardrobe snapshot for the whole stream; the search never goes back to MongoDB
+    with stage_timer("wardrobe_load"):
+        wardrobe_items = load_wardrobe_items(uploads_collection, user["_id"])
+
+    tops = [item for item in wardrobe_items if item["category"] == "top"]
+    bottoms = [item for item in wardrobe_items if item["category"] == "bottom"]
+    shoes = [item for item in wardrobe_items if item["category"] == "shoes"]
+
+    if len(tops) < 1 or len(shoes) < 1:
+        return jsonify({
+            "success": False,
+            "message": "Your wardrobe needs at least one top and one pair of shoes to generate an outfit."
+        }), 400
+
+    # Streams skip what the user was just shown but don't add to it; the client decides what it displays
+    recent_item_ids = get_recent_item_ids(recent_suggestions_collection, user["_id"])
+    source, score, error_message = build_candidate_source(data.get("mode", "color"), tops, bottoms, shoes, data,
+                                                          recent_item_ids)
+    if error_message:
+        return jsonify({"success": False, "message": error_message}), 400
+
+    response = app.response_class(
+        stream_outfit_events(source, score, stream_format, limit, time_budget),
+        mimetype=STREAM_FORMATS[stream_format]
+    )
+    response.headers["Cache-Control"] = "no-cache"
+    # Ask reverse proxies (nginx) not to buffer the stream
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
     
+# Re-pick one slot of an outfit (e.g. just the shoes) while keeping the other items
+@app.route("/regenerate_slot", methods=["POST"])
+def regenerate_slot():
+    if "user" not in session:
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
+
+    data = request.get_json(silent=True) or {}
+    slot = data.get("slot")
+    if slot not in REGENERATE_SLOTS:
+        return jsonify({"success": False, "message": f"Invalid slot. Valid options are: {', '.join(REGENERATE_SLOTS)}"}), 400
+
+    user = users_collection.find_one({"username": session["user"]})
+    if not user:
+        return jsonify({"success": False, "message": "User not found"}), 404
+
+    # Loaded once per wardrobe version, so re-picking a slot doesn't reload the whole wardrobe
+    with stage_timer("wardrobe_load"):
+        wardrobe = get_wardrobe_index(uploads_collection, user)
+
+    # The outfit being edited; the item in the re-picked slot is the one to replace
+    outfit = {}
+    for name in REGENERATE_SLOTS:
+        item_id = data.get(name)
+        if item_id:
+            outfit[name] = wardrobe["by_id"].get(item_id)
+            if not outfit[name] or outfit[name].get("category") != name:
+                return jsonify({"success": False, "message": f"The {name} item was not found"}), 404
+    current = outfit.pop(slot, None)
+    top, bottom, shoes = outfit.get("top"), outfit.get("bottom"), outfit.get("shoes")
+
+    def candidates(category):
+        return [item for item in wardrobe["by_category"].get(category, [])
+                if not item.get("unavailable") and (not current or item["item_id"] != current["item_id"])]
+
+    if slot == "top":
+        if not bottom:
+            return jsonify({"success": False, "message": "A bottom must be kept to re-pick the top"}), 400
+        tops = [item for item in candidates("top") if not is_complete_top_item(item) and not is_outerwear_item(item)]
+        top, new_shoes = select_matching_items(bottom, tops, [shoes] if shoes else candidates("shoes"))
+        shoes = shoes or new_shoes
+    elif not top:
+        return jsonify({"success": False, "message": "A top must be kept to re-pick the bottom or shoes"}), 400
+    elif slot == "bottom":
+        if is_complete_top_item(top):
+            return jsonify({"success": False, "message": "This top is a complete outfit and doesn't take a bottom"}), 400
+        bottom, new_shoes = select_matching_items(top, candidates("bottom"), [shoes] if shoes else candidates("shoes"))
+        shoes = shoes or new_shoes
+    elif bottom:
+        # Shoes scored against both kept items (the bottom is the only option for the first list)
+        _, shoes = select_matching_items(top, [bottom], candidates("shoes"))
+    else:
+        shoes = select_matching_shoes_for_complete_top(top, candidates("shoes"))
+
+    if not top or not shoes or (slot == "bottom" and not bottom):
+        return jsonify({
+            "success": False,
+            "message": f"No other available {slot} goes with the rest of this outfit."
+        }), 400
+
+    accessories = suggest_accessories(data, wardrobe["items"], top, bottom, shoes)
+    remember_suggestion(user, top, bottom, shoes, accessories)
+    response = serialize_planned_outfit(top, bottom, shoes, None, accessories)
+    response.update({"success": True, "slot": slot})
+    return jsonify(response)
+
+def serialize_similar_item(item, similarity):
+    """
+    Wardrobe API shape of an item found by visual similarity, with its similarity to the query item
+    """
+    serialized = serialize_wardrobe_item(item)
+    serialized["similarity"] = similarity
+    return serialized
+
+@app.route("/similar_items/<item_id>")
+def similar_items(item_id):
+    if "user" not in session:
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
+
+    user = users_collection.find_one({"username": session["user"]})
+    if not user:
+        return jsonify({"success": False, "message": "User not found"}), 404
+
+    try:
+        limit = min(max(int(request.args.get("limit", DEFAULT_SIMILAR_ITEMS)), 1), MAX_SIMILAR_ITEMS)
+    except ValueError:
+        return jsonify({"success": False, "message": "limit must be a number"}), 400
+    same_category = request.args.get("same_category", "true").lower() not in ("0", "false", "no")
+    available_only = request.args.get("available", "true").lower() not in ("0", "false", "no")
+
+    item = uploads_collection.find_one({"item_id": item_id, "user_id": user["_id"]})
+    if not item:
+        return jsonify({"success": False, "message": "Item not found"}), 404
+
+    try:
+        similar = find_similar_items(uploads_collection, user["_id"], item, limit, same_category, available_only)
+    except Exception as e:
+        print(f"Error finding similar items: {e}")
+        return jsonify({
+            "success": False,
+            "message": "Failed to find similar items. Please try again."
+        }), 500
+    if similar is None:
+        return jsonify({"success": False, "message": "This item has no image embedding yet (enable IMAGE_EMBEDDINGS and re-upload it)"}), 409
+
+    return jsonify({
+        "success": True,
+        "item_id": item_id,
+        "items": [serialize_similar_item(match, similarity) for match, similarity in similar]
+    })
+
 @app.route("/toggle_item_availability/<item_id>", methods=["POST"])
 def toggle_item_availability(item_id):
     if "user" not in session:
@@ -1142,13 +2070,27 @@ def toggle_item_availability(item_id):
     )
     
     if result.modified_count > 0 or result.matched_count > 0:
-        return jsonify({
+        if result.modified_count > 0:
+            bump_wardrobe_version(users_collection, user["_id"])
+        response = {
             "success": True, 
             "message": f"Item marked as {'unavailable' if unavailable else 'available'}"
-        })
+        }
+        # Offer the most similar available items of the same category, so an outfit
+        # can swap this one out instead of being regenerated
+        if unavailable:
+            try:
+                similar = find_similar_items(uploads_collection, user["_id"], item, UNAVAILABLE_ALTERNATIVES) or []
+            except Exception as e:
+                print(f"Error finding alternatives to an unavailable item: {e}")
+                similar = []
+            response["alternatives"] = [serialize_similar_item(match, similarity) for match, similarity in similar]
+            response["replacement"] = response["alternatives"][0] if response["alternatives"] else None
+        return jsonify(response)
     else:
         return jsonify({"success": False, "message": "Failed to update item status"}), 500
 
+# Development server only; production runs under gunicorn (see gunicorn.conf.py)
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5000))
     app.run(host="0.0.0.0", port=port)
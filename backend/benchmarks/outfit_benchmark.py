@@ -0,0 +1,226 @@
+# benchmarks/outfit_benchmark.py
+"""
+Benchmark the outfit generators against synthetic wardrobes.
+
+Run from the backend folder:
+    python -m benchmarks.outfit_benchmark
+    python -m benchmarks.outfit_benchmark --sizes 10,100,1000 --iterations 200 --fail-on-regression
+
+Each run is appended to benchmarks/results/history.jsonl and compared with the previous
+run that used the same seed and iteration count.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import subprocess
+import tracemalloc
+from datetime import datetime
+from statistics import mean
+from utils.outfit_generator import generate_color_coordinated_outfit, generate_occasion_based_outfit
+from utils.weather_outfit_generator import generate_weather_based_outfit, generate_layered_weather_outfit
+from benchmarks.synthetic_wardrobe import generate_synthetic_wardrobe, split_by_category
+
+DEFAULT_SIZES = [10, 100, 1000, 10000]
+DEFAULT_HISTORY_FILE = os.path.join(os.path.dirname(__file__), "results", "history.jsonl")
+
+BASE_COLORS = [None, "black", "white", "blue", "red", "beige", "green"]
+OCCASIONS = ["casual", "work/professional", "formal", "athletic/sport", "lounge/sleepwear"]
+WEATHER_CASES = [(25, "snow"), (45, "rain"), (60, "cloudy"), (75, "sunny"), (92, "sunny"), (88, "rain")]
+LAYERED_CASES = [(25, "snow"), (30, "cloudy"), (45, "rain"), (50, "sunny")]
+
+def _color_case(tops, bottoms, shoes, i):
+    return generate_color_coordinated_outfit(tops, bottoms, shoes, base_color=BASE_COLORS[i % len(BASE_COLORS)])
+
+def _occasion_case(tops, bottoms, shoes, i):
+    return generate_occasion_based_outfit(tops, bottoms, shoes, target_occasion=OCCASIONS[i % len(OCCASIONS)])
+
+def _weather_case(tops, bottoms, shoes, i):
+    temperature, condition = WEATHER_CASES[i % len(WEATHER_CASES)]
+    return generate_weather_based_outfit(tops, bottoms, shoes, temperature, condition)
+
+def _layered_case(tops, bottoms, shoes, i):
+    temperature, condition = LAYERED_CASES[i % len(LAYERED_CASES)]
+    return generate_layered_weather_outfit(tops, bottoms, shoes, temperature, condition)
+
+GENERATORS = {
+    "color": _color_case,
+    "occasion": _occasion_case,
+    "weather": _weather_case,
+    "layered": _layered_case
+}
+
+def percentile(sorted_values, fraction):
+    """
+    Nearest-rank percentile of an already sorted list
+    """
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+def _call(generator, wardrobe, i):
+    # Routes build fresh category lists per request and the generators shuffle them in place
+    tops, bottoms, shoes = wardrobe
+    return generator(list(tops), list(bottoms), list(shoes), i)
+
+def run_case(generator, wardrobe, iterations, seed, measure_memory=True):
+    """
+    Time one generator on one wardrobe
+
+    Returns:
+        dict: Latency percentiles in milliseconds, error/empty counts and peak allocation per call
+    """
+    random.seed(seed)
+    latencies = []
+    errors = 0
+    empty = 0
+    first_error = None
+
+    for i in range(iterations):
+        start = time.perf_counter()
+        try:
+            outfit = _call(generator, wardrobe, i)
+            if not outfit or outfit[0] is None:
+                empty += 1
+        except Exception as e:
+            errors += 1
+            first_error = first_error or f"{type(e).__name__}: {e}"
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    latencies.sort()
+    result = {
+        "iterations": iterations,
+        "p50_ms": percentile(latencies, 0.50),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+        "mean_ms": mean(latencies),
+        "max_ms": latencies[-1],
+        "errors": errors,
+        "empty": empty
+    }
+    if first_error:
+        result["first_error"] = first_error
+
+    # Allocations are measured in a separate pass because tracemalloc slows every call down
+    if measure_memory:
+        random.seed(seed)
+        peaks = []
+        for i in range(min(iterations, 20)):
+            tracemalloc.start()
+            try:
+                _call(generator, wardrobe, i)
+            except Exception:
+                pass
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        result["peak_alloc_kb"] = max(peaks) / 1024
+        result["mean_peak_alloc_kb"] = mean(peaks) / 1024
+
+    return result
+
+def get_git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+def load_previous_run(history_file, seed, iterations):
+    """
+    Get the most recent run in the history file made with the same seed and iteration count
+    """
+    if not os.path.exists(history_file):
+        return None
+    previous = None
+    with open(history_file) as f:
+        for line in f:
+            try:
+                run = json.loads(line)
+            except ValueError:
+                continue
+            if run.get("seed") == seed and run.get("iterations") == iterations:
+                previous = run
+    return previous
+
+def find_regressions(run, previous, threshold):
+    """
+    Compare p95 latency and peak allocation of every case with the previous run
+
+    Returns:
+        list: Human-readable regression descriptions
+    """
+    regressions = []
+    for case, result in run["cases"].items():
+        baseline = previous["cases"].get(case)
+        if not baseline:
+            continue
+        for metric in ("p95_ms", "peak_alloc_kb"):
+            if result.get(metric) is None or not baseline.get(metric):
+                continue
+            change = result[metric] / baseline[metric] - 1
+            if change > threshold:
+                regressions.append(f"{case} {metric}: {baseline[metric]:.3f} -> {result[metric]:.3f} (+{change:.0%})")
+        if result["errors"] > baseline.get("errors", 0):
+            regressions.append(f"{case} errors: {baseline.get('errors', 0)} -> {result['errors']}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the outfit generators on synthetic wardrobes")
+    parser.add_argument("--sizes", default=",".join(str(size) for size in DEFAULT_SIZES),
+                        help="Comma-separated wardrobe sizes (default: 10,100,1000,10000)")
+    parser.add_argument("--generators", default=",".join(GENERATORS), help="Comma-separated generators to run")
+    parser.add_argument("--iterations", type=int, default=100, help="Calls per generator and size")
+    parser.add_argument("--seed", type=int, default=42, help="Seed for the wardrobes and the generators")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc allocation pass")
+    parser.add_argument("--history", default=DEFAULT_HISTORY_FILE, help="JSONL file the results are appended to")
+    parser.add_argument("--no-save", action="store_true", help="Don't append this run to the history file")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Relative slowdown reported as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit with status 1 if a regression is found")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    generators = [name.strip() for name in args.generators.split(",") if name.strip()]
+    for name in generators:
+        if name not in GENERATORS:
+            parser.error(f"Unknown generator '{name}'. Choose from: {', '.join(GENERATORS)}")
+
+    run = {
+        "timestamp": datetime.utcnow().isoformat(),
+        "commit": get_git_commit(),
+        "python": platform.python_version(),
+        "seed": args.seed,
+        "iterations": args.iterations,
+        "cases": {}
+    }
+
+    print(f"{'case':<22}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'peak KB':>10}{'errors':>8}{'empty':>7}")
+    for size in sizes:
+        wardrobe = split_by_category(generate_synthetic_wardrobe(size, seed=args.seed))
+        for name in generators:
+            result = run_case(GENERATORS[name], wardrobe, args.iterations, args.seed, measure_memory=not args.no_memory)
+            case = f"{name}/{size}"
+            run["cases"][case] = result
+            peak = f"{result['peak_alloc_kb']:.1f}" if "peak_alloc_kb" in result else "-"
+            print(f"{case:<22}{result['p50_ms']:>10.3f}{result['p95_ms']:>10.3f}{result['p99_ms']:>10.3f}"
+                  f"{result['max_ms']:>10.3f}{peak:>10}{result['errors']:>8}{result['empty']:>7}")
+            if "first_error" in result:
+                print(f"    first error: {result['first_error']}")
+
+    previous = load_previous_run(args.history, args.seed, args.iterations)
+    regressions = find_regressions(run, previous, args.threshold) if previous else []
+    if previous:
+        print(f"\nCompared with run from {previous['timestamp']} (commit {previous.get('commit')}):")
+        print("\n".join(f"  REGRESSION {line}" for line in regressions) if regressions else "  no regressions")
+
+    if not args.no_save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.history)), exist_ok=True)
+        with open(args.history, "a") as f:
+            f.write(json.dumps(run) + "\n")
+
+    return 1 if regressions and args.fail_on_regression else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
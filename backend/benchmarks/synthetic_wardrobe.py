@@ -0,0 +1,141 @@
+# benchmarks/synthetic_wardrobe.py
+import random
+from utils.item_features import compute_item_features
+
+# Relative frequencies loosely based on real wardrobes uploaded to the app
+CATEGORY_WEIGHTS = {"top": 0.40, "bottom": 0.25, "shoes": 0.20, "accessory": 0.15}
+TOP_SUBCATEGORY_WEIGHTS = {"standard": 0.75, "outerwear": 0.12, "complete": 0.13}
+ACCESSORY_SUBCATEGORY_WEIGHTS = {"jewelry": 0.30, "bags": 0.25, "winter": 0.20, "headwear": 0.15, "other": 0.10}
+
+# Color names produced by get_color_name, with a representative RGB value for each
+COLOR_WEIGHTS = {
+    "black": 0.18, "white": 0.14, "gray": 0.10, "blue": 0.10, "navy": 0.08, "beige": 0.07,
+    "brown": 0.07, "red": 0.05, "green": 0.05, "pink": 0.04, "purple": 0.03, "yellow": 0.03,
+    "orange": 0.02, "unknown": 0.04
+}
+COLOR_RGB = {
+    "black": [20, 20, 22], "white": [240, 240, 238], "gray": [128, 128, 130], "blue": [40, 90, 200],
+    "navy": [20, 30, 80], "beige": [220, 200, 170], "brown": [110, 70, 40], "red": [200, 30, 40],
+    "green": [40, 140, 60], "pink": [240, 150, 190], "purple": [120, 50, 150], "yellow": [240, 220, 50],
+    "orange": [240, 140, 30], "unknown": [100, 120, 90]
+}
+
+OCCASION_WEIGHTS = {
+    "casual": 0.55, "work/professional": 0.15, "athletic/sport": 0.12,
+    "lounge/sleepwear": 0.10, "formal": 0.08
+}
+
+TEMPERATURE_RANGES = ["cold", "cool", "warm", "hot"]
+WEATHER_CONDITIONS = ["sunny", "cloudy", "rain", "snow"]
+
+def _weighted_choice(rng, weights):
+    return rng.choices(list(weights), weights=list(weights.values()), k=1)[0]
+
+def _weighted_sample(rng, weights, count):
+    """
+    Pick `count` distinct keys, each draw weighted by frequency
+    """
+    remaining = dict(weights)
+    picked = []
+    for _ in range(min(count, len(remaining))):
+        choice = _weighted_choice(rng, remaining)
+        picked.append(choice)
+        del remaining[choice]
+    return picked
+
+def _synthetic_colors(rng):
+    color_count = rng.choices([1, 2, 3], weights=[0.45, 0.35, 0.20], k=1)[0]
+    names = _weighted_sample(rng, COLOR_WEIGHTS, color_count)
+    scores = sorted((rng.uniform(0.05, 0.9) for _ in names), reverse=True)
+    return [{
+        "name": name,
+        "rgb": list(COLOR_RGB[name]),
+        "score": score,
+        "pixel_fraction": score * rng.uniform(0.6, 1.0)
+    } for name, score in zip(names, scores)]
+
+def _synthetic_temperature_range(rng):
+    # Items suit a contiguous span of temperature ranges (e.g. cool + warm)
+    span = rng.choices([1, 2, 3], weights=[0.40, 0.45, 0.15], k=1)[0]
+    start = rng.randrange(0, len(TEMPERATURE_RANGES) - span + 1)
+    return TEMPERATURE_RANGES[start:start + span]
+
+def _synthetic_weather_conditions(rng, temperature_range):
+    conditions = {"cloudy"}
+    if "warm" in temperature_range or "hot" in temperature_range:
+        conditions.add("sunny")
+    if "cold" in temperature_range and rng.random() < 0.6:
+        conditions.add("snow")
+    if rng.random() < 0.2:
+        conditions.add("rain")
+    return [condition for condition in WEATHER_CONDITIONS if condition in conditions]
+
+def generate_synthetic_item(rng, index):
+    """
+    Generate one wardrobe item shaped like an uploads document
+
+    Args:
+        rng (random.Random): Seeded random generator
+        index (int): Position of the item, used for its item_id
+
+    Returns:
+        dict: Wardrobe item with category, subcategory, colors, occasions, weather tags and features
+    """
+    category = _weighted_choice(rng, CATEGORY_WEIGHTS)
+    if category == "top":
+        subcategory = _weighted_choice(rng, TOP_SUBCATEGORY_WEIGHTS)
+    elif category == "accessory":
+        subcategory = _weighted_choice(rng, ACCESSORY_SUBCATEGORY_WEIGHTS)
+    else:
+        subcategory = None
+
+    temperature_range = _synthetic_temperature_range(rng)
+    occasion_count = rng.choices([1, 2, 3], weights=[0.55, 0.35, 0.10], k=1)[0]
+
+    item = {
+        "item_id": f"synthetic-{index}",
+        "image_url": f"/images/synthetic-{index}.jpg",
+        "image_key": f"synthetic-{index}.jpg",
+        "category": category,
+        "subcategory": subcategory,
+        "colors": _synthetic_colors(rng),
+        "occasions": _weighted_sample(rng, OCCASION_WEIGHTS, occasion_count),
+        "temperature_range": temperature_range,
+        "weather_conditions": _synthetic_weather_conditions(rng, temperature_range),
+        "unavailable": rng.random() < 0.05
+    }
+    # Uploads store their feature record alongside the analysis results
+    item["features"] = compute_item_features(item)
+    return item
+
+def generate_synthetic_wardrobe(size, seed=0):
+    """
+    Generate a reproducible synthetic wardrobe.
+    The first items always include a top, a bottom and a pair of shoes so every generator can run.
+
+    Args:
+        size (int): Number of items (at least 3)
+        seed (int): Random seed; the same seed and size always give the same wardrobe
+
+    Returns:
+        list: Wardrobe item dicts
+    """
+    rng = random.Random(seed)
+    items = [generate_synthetic_item(rng, index) for index in range(max(size, 3))]
+    for index, category in enumerate(["top", "bottom", "shoes"]):
+        items[index]["category"] = category
+        items[index]["subcategory"] = "standard" if category == "top" else None
+        items[index]["features"] = compute_item_features(items[index])
+    return items
+
+def split_by_category(items):
+    """
+    Split a wardrobe the way the app routes do before calling a generator
+
+    Returns:
+        tuple: (tops, bottoms, shoes)
+    """
+    tops = [item for item in items if item["category"] == "top"]
+    bottoms = [item for item in items if item["category"] == "bottom"]
+    shoes = [item for item in items if item["category"] == "shoes"]
+    return tops, bottoms, shoes
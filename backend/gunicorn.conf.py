@@ -0,0 +1,48 @@
+# gunicorn.conf.py
+"""
+Production serving configuration. Run from the backend folder:
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Graceful reload (new code, no dropped requests): kill -HUP <master pid>
+Graceful shutdown: kill -TERM <master pid>
+"""
+import os
+import multiprocessing
+
+bind = os.environ.get("GUNICORN_BIND", f"0.0.0.0:{os.environ.get('PORT', 5000)}")
+
+# Threaded workers: most request time is spent waiting on Gemini, Vision, OpenWeather and MongoDB,
+# so each process serves many requests concurrently while the GIL is released on I/O
+worker_class = "gthread"
+workers = int(os.environ.get("WEB_CONCURRENCY", max(2, multiprocessing.cpu_count())))
+threads = int(os.environ.get("GUNICORN_THREADS", 8))
+
+# Every worker imports the app itself, so MongoDB, the Google clients and the HTTP session are
+# created once per worker process after the fork (none of them are fork-safe)
+preload_app = False
+
+# Uploads wait on several external API calls; generation routes finish in milliseconds
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 120))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = 5
+
+# Recycle workers periodically (jittered so they don't all restart at once)
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 2000))
+max_requests_jitter = max_requests // 10
+
+# Heartbeat files in memory; container overlay filesystems can stall workers otherwise
+if os.path.isdir("/dev/shm"):
+    worker_tmp_dir = "/dev/shm"
+
+reload = os.environ.get("GUNICORN_RELOAD", "").lower() in ("1", "true", "yes")
+
+accesslog = "-"
+errorlog = "-"
+loglevel = os.environ.get("GUNICORN_LOG_LEVEL", "info")
+
+def worker_exit(server, worker):
+    # Let in-flight upload analysis finish before the worker goes away
+    from utils.upload_utils import shutdown_enrichment_executor
+    from utils.garment_mask import shutdown_mask_executor
+    shutdown_enrichment_executor()
+    shutdown_mask_executor()
@@ -0,0 +1,66 @@
+# loadtest/app_server.py
+"""
+Run the Flask app in load-test mode: fake Vision client, local fake Gemini/OpenWeather servers,
+a throwaway upload folder, and mongomock unless a local mongod is given with --mongodb-uri.
+
+Run from the backend folder (usually started by loadtest.run):
+    python -m loadtest.app_server --port 5050 --gemini-base http://127.0.0.1:8701 --weather-base http://127.0.0.1:8702
+"""
+import os
+import atexit
+import logging
+import shutil
+import tempfile
+import argparse
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the app against local stand-ins for external services")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5050)
+    parser.add_argument("--gemini-base", default="http://127.0.0.1:8701")
+    parser.add_argument("--weather-base", default="http://127.0.0.1:8702")
+    parser.add_argument("--mongodb-uri", help="Local mongod to use instead of mongomock, e.g. mongodb://localhost:27017/aesclo_loadtest")
+    parser.add_argument("--vision-latency-ms", type=float, default=150)
+    parser.add_argument("--vision-jitter-ms", type=float, default=50)
+    parser.add_argument("--vision-error-rate", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    # Everything must point at the stand-ins before the app (and load_dotenv) is imported,
+    # so a developer's .env can never send load-test traffic to Atlas or the real APIs
+    os.environ["GEMINI_API_BASE"] = args.gemini_base
+    os.environ["OPENWEATHER_API_BASE"] = args.weather_base
+    os.environ["GEMINI_API_KEY"] = "loadtest"
+    os.environ["OPENWEATHER_API_KEY"] = "loadtest"
+    os.environ["STORAGE_BACKEND"] = "local"
+    os.environ.setdefault("SECRET_KEY", "loadtest")
+
+    if args.mongodb_uri:
+        os.environ["MONGODB_URI"] = args.mongodb_uri
+    else:
+        try:
+            import mongomock
+        except ImportError:
+            parser.error("mongomock is not installed (pip install mongomock), or pass --mongodb-uri for a local mongod")
+        import flask_pymongo
+        flask_pymongo.MongoClient = mongomock.MongoClient
+        os.environ["MONGODB_URI"] = "mongodb://loadtest/aesclo"
+
+    import app as app_module
+    from utils.gcp_clients import set_vision_client
+    from utils.storage_utils import LocalStorageBackend
+    from loadtest.fake_vision import FakeVisionClient
+
+    set_vision_client(FakeVisionClient(args.vision_latency_ms, args.vision_jitter_ms, args.vision_error_rate))
+
+    upload_folder = tempfile.mkdtemp(prefix="aesclo-loadtest-")
+    atexit.register(shutil.rmtree, upload_folder, True)
+    app_module.storage_backend = LocalStorageBackend(upload_folder)
+
+    from werkzeug.serving import run_simple
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    print(f"Load-test app on http://{args.host}:{args.port} "
+          f"({'mongod ' + args.mongodb_uri if args.mongodb_uri else 'mongomock'}, uploads in {upload_folder})", flush=True)
+    run_simple(args.host, args.port, app_module.app, threaded=True, use_reloader=False)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+# loadtest/fake_services.py
+"""
+Local stand-ins for the Gemini and OpenWeather HTTP APIs with configurable latency and error rate.
+
+Run from the backend folder:
+    python -m loadtest.fake_services --gemini-port 8701 --weather-port 8702 --latency-ms 400 --error-rate 0.02
+
+Then start the app with GEMINI_API_BASE=http://127.0.0.1:8701 and OPENWEATHER_API_BASE=http://127.0.0.1:8702.
+"""
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from urllib.parse import urlsplit, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CATEGORY_ANSWERS = [
+    ("top", "standard", 0.29), ("top", "outerwear", 0.05), ("top", "complete", 0.06), ("bottom", "none", 0.25),
+    ("shoes", "none", 0.20), ("accessory", "jewelry", 0.05), ("accessory", "winter", 0.05),
+    ("accessory", "bags", 0.05)
+]
+OCCASION_ANSWERS = ["casual", "casual", "casual", "work/professional", "formal, work/professional",
+                    "athletic/sport", "athletic/sport, casual", "lounge/sleepwear"]
+WEATHER_ANSWERS = [
+    {"weather_conditions": ["sunny", "cloudy"], "temperature_range": ["warm", "hot"]},
+    {"weather_conditions": ["sunny", "cloudy"], "temperature_range": ["cool", "warm"]},
+    {"weather_conditions": ["cloudy", "rain"], "temperature_range": ["cool"]},
+    {"weather_conditions": ["snow", "cloudy"], "temperature_range": ["cold"]},
+    {"weather_conditions": ["rain"], "temperature_range": ["cold", "cool", "warm"]}
+]
+# (OpenWeather condition id, description, temperature in F)
+WEATHER_REPORTS = [(800, "clear sky", 78), (803, "broken clouds", 64), (500, "light rain", 55),
+                   (601, "snow", 28), (801, "few clouds", 91)]
+
+class FakeServiceConfig:
+    """
+    Latency and failure settings shared by the fake services
+    """
+    def __init__(self, latency_ms=0, jitter_ms=0, error_rate=0.0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.requests = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        self._random = random.Random()
+
+    def simulate(self):
+        """
+        Sleep for the configured latency and decide whether this call fails
+
+        Returns:
+            bool: True if the call should return an error
+        """
+        with self._lock:
+            self.requests += 1
+            delay = self.latency_ms + self._random.uniform(-self.jitter_ms, self.jitter_ms)
+            failed = self._random.random() < self.error_rate
+            if failed:
+                self.errors += 1
+        if delay > 0:
+            time.sleep(delay / 1000)
+        return failed
+
+def _stable_index(data, count):
+    # Same input -> same answer, so repeated uploads of one image are classified consistently
+    return int(hashlib.sha1(data.encode() if isinstance(data, str) else data).hexdigest(), 16) % count
+
+def fake_gemini_answer(prompt, image_data):
+    """
+    Answer a Gemini generateContent prompt the way the app expects to parse it
+    """
+    if "What category does this item belong to" in prompt:
+        weights = [weight for _, _, weight in CATEGORY_ANSWERS]
+        rng = random.Random(_stable_index(image_data, 2 ** 32))
+        category, subcategory, _ = rng.choices(CATEGORY_ANSWERS, weights=weights, k=1)[0]
+        return f"Category: {category}\nSubcategory: {subcategory}"
+    if "weather_conditions" in prompt:
+        return json.dumps(WEATHER_ANSWERS[_stable_index(image_data, len(WEATHER_ANSWERS))])
+    return OCCASION_ANSWERS[_stable_index(image_data, len(OCCASION_ANSWERS))]
+
+class _FakeHandler(BaseHTTPRequestHandler):
+    config = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+class FakeGeminiHandler(_FakeHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.config.simulate():
+            self._send_json(503, {"error": {"code": 503, "message": "The model is overloaded (fake)"}})
+            return
+        try:
+            parts = json.loads(body)["contents"][0]["parts"]
+            prompt = parts[0]["text"]
+            image_data = parts[1]["inline_data"]["data"] if len(parts) > 1 else prompt
+        except (ValueError, KeyError, IndexError):
+            self._send_json(400, {"error": {"code": 400, "message": "Invalid request"}})
+            return
+        text = fake_gemini_answer(prompt, image_data)
+        self._send_json(200, {"candidates": [{"content": {"parts": [{"text": text}], "role": "model"}}]})
+
+def fake_forecast(location, report_index):
+    """
+    Build a 5 day / 3 hour forecast that cycles through the fake weather reports, starting at the location's
+    current report and cooling off at night
+    """
+    start = int(time.time()) // 10800 * 10800
+    entries = []
+    for step in range(40):
+        weather_id, description, temperature = WEATHER_REPORTS[(report_index + step // 8) % len(WEATHER_REPORTS)]
+        night = (step % 8) in (0, 1, 7)
+        entries.append({
+            "dt": start + step * 10800,
+            "main": {"temp": temperature - (12 if night else 0) + 0.4, "humidity": 60},
+            "weather": [{"id": weather_id, "main": description.split()[-1].title(), "description": description}]
+        })
+    return {"list": entries, "city": {"name": location.split(",")[0].title(), "timezone": 0}}
+
+class FakeOpenWeatherHandler(_FakeHandler):
+    def do_GET(self):
+        if self.config.simulate():
+            self._send_json(502, {"cod": 502, "message": "Bad gateway (fake)"})
+            return
+        query = parse_qs(urlsplit(self.path).query)
+        location = (query.get("q") or query.get("zip") or ["Nowhere"])[0]
+        report_index = _stable_index(location, len(WEATHER_REPORTS))
+        if urlsplit(self.path).path.endswith("/forecast"):
+            self._send_json(200, fake_forecast(location, report_index))
+            return
+        weather_id, description, temperature = WEATHER_REPORTS[report_index]
+        self._send_json(200, {
+            "name": location.split(",")[0].title(),
+            "main": {"temp": temperature + 0.4, "humidity": 60},
+            "weather": [{"id": weather_id, "main": description.split()[-1].title(), "description": description}]
+        })
+
+def start_fake_server(handler_class, port, config, host="127.0.0.1"):
+    """
+    Start a fake service on a background thread
+
+    Returns:
+        ThreadingHTTPServer: The running server (call shutdown() to stop it)
+    """
+    handler = type(handler_class.__name__, (handler_class,), {"config": config})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run fake Gemini and OpenWeather servers")
+    parser.add_argument("--gemini-port", type=int, default=8701)
+    parser.add_argument("--weather-port", type=int, default=8702)
+    parser.add_argument("--latency-ms", type=float, default=300, help="Mean added latency per call")
+    parser.add_argument("--jitter-ms", type=float, default=100, help="Uniform +/- jitter around the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of calls that fail (0-1)")
+    args = parser.parse_args(argv)
+
+    config = FakeServiceConfig(args.latency_ms, args.jitter_ms, args.error_rate)
+    start_fake_server(FakeGeminiHandler, args.gemini_port, config)
+    start_fake_server(FakeOpenWeatherHandler, args.weather_port, config)
+    print(f"Fake Gemini on :{args.gemini_port}, fake OpenWeather on :{args.weather_port} "
+          f"(latency {args.latency_ms}±{args.jitter_ms} ms, error rate {args.error_rate})", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        print(f"Served {config.requests} requests ({config.errors} simulated errors)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+# loadtest/fake_vision.py
+import time
+import random
+import hashlib
+from types import SimpleNamespace
+
+# Representative dominant colors, one of which is picked per image
+FAKE_COLORS = [(20, 20, 22), (240, 240, 238), (128, 128, 130), (40, 90, 200), (20, 30, 80),
+               (220, 200, 170), (110, 70, 40), (200, 30, 40), (40, 140, 60), (240, 150, 190)]
+
+class FakeVisionClient:
+    """
+    Stand-in for google.cloud.vision.ImageAnnotatorClient covering the calls the app makes
+    (image_properties and object_localization), with configurable latency and error rate.
+    """
+    def __init__(self, latency_ms=0, jitter_ms=0, error_rate=0.0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self._random = random.Random()
+
+    def _simulate(self):
+        delay = self.latency_ms + self._random.uniform(-self.jitter_ms, self.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+        if self._random.random() < self.error_rate:
+            raise RuntimeError("503 Service Unavailable (fake Vision API)")
+
+    def image_properties(self, image):
+        self._simulate()
+        seed = int(hashlib.sha1(image.content).hexdigest(), 16)
+        rng = random.Random(seed)
+        picked = rng.sample(FAKE_COLORS, 3)
+        scores = sorted((rng.uniform(0.1, 0.8) for _ in picked), reverse=True)
+        colors = [
+            SimpleNamespace(
+                color=SimpleNamespace(red=r, green=g, blue=b),
+                score=score,
+                pixel_fraction=score * 0.8
+            )
+            for (r, g, b), score in zip(picked, scores)
+        ]
+        return SimpleNamespace(image_properties_annotation=SimpleNamespace(dominant_colors=SimpleNamespace(colors=colors)))
+
+    def object_localization(self, image):
+        self._simulate()
+        return SimpleNamespace(localized_object_annotations=[SimpleNamespace(name="Shirt", score=0.9)])
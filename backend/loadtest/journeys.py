@@ -0,0 +1,171 @@
+# loadtest/journeys.py
+import io
+import re
+import time
+import uuid
+import random
+import threading
+import requests
+from PIL import Image
+
+CITIES = ["Seattle", "Chicago", "Denver", "Miami", "Boston", "10001", "94103"]
+OCCASIONS = ["casual", "work/professional", "formal", "athletic/sport"]
+BASE_COLORS = ["random", "black", "white", "blue", "red", "beige"]
+
+class RouteStats:
+    """
+    Thread-safe latency and status recorder, keyed by route template
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}  # route -> list of (seconds, status)
+
+    def record(self, route, seconds, status):
+        with self._lock:
+            self.samples.setdefault(route, []).append((seconds, status))
+
+    def summary(self, wall_seconds):
+        """
+        Summarize every route
+
+        Returns:
+            dict: route -> count, throughput, latency percentiles (ms) and status counts
+        """
+        with self._lock:
+            samples = {route: list(values) for route, values in self.samples.items()}
+
+        result = {}
+        for route, values in sorted(samples.items()):
+            latencies = sorted(seconds * 1000 for seconds, _ in values)
+            statuses = [status for _, status in values]
+            result[route] = {
+                "count": len(values),
+                "rps": len(values) / wall_seconds if wall_seconds else 0,
+                "p50_ms": _percentile(latencies, 0.50),
+                "p95_ms": _percentile(latencies, 0.95),
+                "p99_ms": _percentile(latencies, 0.99),
+                "max_ms": latencies[-1],
+                "ok": sum(1 for status in statuses if 0 < status < 400),
+                "client_errors": sum(1 for status in statuses if 400 <= status < 500),
+                "server_errors": sum(1 for status in statuses if status >= 500 or status == 0)
+            }
+        return result
+
+def _percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+def make_test_image(seed, size=(320, 320)):
+    """
+    Build a small JPEG with content unique to the seed, so the analysis cache doesn't hide API cost
+    """
+    rng = random.Random(seed)
+    image = Image.new("RGB", size, tuple(rng.randrange(256) for _ in range(3)))
+    pixels = image.load()
+    for _ in range(200):
+        pixels[rng.randrange(size[0]), rng.randrange(size[1])] = tuple(rng.randrange(256) for _ in range(3))
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=85)
+    return buffer.getvalue()
+
+class VirtualUser:
+    """
+    One simulated user with its own cookie session.
+    Every request goes through call(), which records latency under the route template.
+    """
+    def __init__(self, base_url, stats, rng, timeout=60):
+        self.base_url = base_url.rstrip("/")
+        self.stats = stats
+        self.rng = rng
+        self.timeout = timeout
+        self.http = requests.Session()
+
+    def call(self, method, path, route=None, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = self.http.request(method, self.base_url + path, timeout=self.timeout, **kwargs)
+            status = response.status_code
+        except requests.RequestException:
+            response, status = None, 0
+        self.stats.record(f"{method} {route or path}", time.perf_counter() - start, status)
+        return response
+
+    def json(self, method, path, route=None, **kwargs):
+        response = self.call(method, path, route=route, **kwargs)
+        try:
+            return response.json() if response is not None else {}
+        except ValueError:
+            return {}
+
+    def signup_and_login(self):
+        username = f"lt_{uuid.uuid4().hex[:12]}"
+        credentials = {"username": username, "password": "loadtest-password"}
+        self.call("POST", "/register", json=dict(credentials, email=f"{username}@example.com",
+                                                  firstName="Load", lastName="Test"))
+        self.call("POST", "/login", json=credentials)
+
+    def bulk_upload(self, count):
+        files = [("files", (f"item{i}.jpg", make_test_image(self.rng.random()), "image/jpeg")) for i in range(count)]
+        return self.json("POST", "/upload_batch", files=files)
+
+    def browse_wardrobe(self):
+        cursor = None
+        while True:
+            params = {"limit": 20}
+            if cursor:
+                params["cursor"] = cursor
+            page = self.json("GET", "/api/wardrobe", params=params)
+            cursor = page.get("next_cursor")
+            if not cursor:
+                return [item["id"] for item in page.get("items", [])]
+
+    def generate_outfit(self):
+        kind = self.rng.choice(["color", "occasion", "weather"])
+        if kind == "color":
+            color = self.rng.choice(BASE_COLORS)
+            return self.json("POST", "/generate_color_outfit", json={"base_color": color, "random_color": color == "random"})
+        if kind == "occasion":
+            return self.json("POST", "/generate_occasion_outfit", json={"occasion": self.rng.choice(OCCASIONS)})
+
+        weather = self.json("POST", "/get_weather", json={"location": self.rng.choice(CITIES)})
+        if not weather.get("success"):
+            return weather
+        return self.json("POST", "/generate_weather_outfit", json={
+            "temperature": weather["temperature"],
+            "weather_condition": weather["weather_condition"]
+        })
+
+    def save_outfit(self, outfit):
+        self.call("POST", "/save_outfit", json={
+            "top_id": outfit["top"]["id"],
+            "bottom_id": (outfit.get("bottom") or {}).get("id"),
+            "shoe_id": outfit["shoes"]["id"]
+        })
+
+    def delete_saved_outfits(self, fraction=0.5):
+        response = self.call("GET", "/saved_outfits")
+        outfit_ids = re.findall(r'data-outfit-id="([^"]+)"', response.text) if response is not None else []
+        for outfit_id in outfit_ids[:int(len(outfit_ids) * fraction)]:
+            self.call("POST", "/delete_outfit", json={"outfit_id": outfit_id})
+
+def run_journey(user, upload_count=12, generate_loops=10, save_probability=0.3, cleanup=True):
+    """
+    Scripted journey: sign up, bulk upload, browse, generate outfits (saving some),
+    delete saved outfits, remove an item and finally clear the wardrobe
+    """
+    user.signup_and_login()
+    user.bulk_upload(upload_count)
+    item_ids = user.browse_wardrobe()
+    user.call("GET", "/get_wardrobe_colors")
+    user.call("GET", "/get_wardrobe")
+
+    for _ in range(generate_loops):
+        outfit = user.generate_outfit()
+        if outfit.get("success") and outfit.get("top") and outfit.get("shoes") and user.rng.random() < save_probability:
+            user.save_outfit(outfit)
+
+    user.delete_saved_outfits()
+    if item_ids:
+        user.call("POST", f"/remove_item/{user.rng.choice(item_ids)}", route="/remove_item/<item_id>")
+    if cleanup:
+        user.call("POST", "/clear_wardrobe")
@@ -0,0 +1,123 @@
+# loadtest/run.py
+"""
+End-to-end load test: starts the fake external services and the app in load-test mode,
+runs scripted user journeys with concurrent virtual users, and reports throughput and
+tail latency per route.
+
+Run from the backend folder:
+    python -m loadtest.run --users 20 --duration 120
+    python -m loadtest.run --users 50 --api-latency-ms 800 --error-rate 0.05 --json-out results.json
+    python -m loadtest.run --target http://127.0.0.1:8000   # an already running server (e.g. gunicorn)
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+import subprocess
+import requests
+from loadtest.journeys import RouteStats, VirtualUser, run_journey
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def start_process(module, *args):
+    return subprocess.Popen([sys.executable, "-m", module, *[str(arg) for arg in args]], cwd=BACKEND_DIR)
+
+def wait_until_up(url, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(url, timeout=2).status_code < 500:
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    return False
+
+def user_loop(index, args, stats, deadline):
+    rng = random.Random(args.seed + index)
+    journeys = 0
+    while True:
+        user = VirtualUser(args.target, stats, rng)
+        run_journey(user, upload_count=args.upload_count, generate_loops=args.generate_loops)
+        journeys += 1
+        if time.time() >= deadline or (args.journeys and journeys >= args.journeys):
+            return
+
+def print_report(summary, wall_seconds, users):
+    total = sum(route["count"] for route in summary.values())
+    print(f"\n{users} users, {total} requests in {wall_seconds:.1f}s ({total / wall_seconds:.1f} req/s)\n")
+    print(f"{'route':<36}{'count':>7}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}{'4xx':>6}{'5xx':>6}")
+    for route, result in summary.items():
+        print(f"{route:<36}{result['count']:>7}{result['rps']:>8.2f}{result['p50_ms']:>9.1f}{result['p95_ms']:>9.1f}"
+              f"{result['p99_ms']:>9.1f}{result['max_ms']:>9.1f}{result['client_errors']:>6}{result['server_errors']:>6}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the app with scripted user journeys")
+    parser.add_argument("--users", type=int, default=10, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=60, help="Seconds to keep starting new journeys")
+    parser.add_argument("--journeys", type=int, default=0, help="Stop each user after this many journeys (0 = use --duration)")
+    parser.add_argument("--upload-count", type=int, default=12, help="Images per bulk upload")
+    parser.add_argument("--generate-loops", type=int, default=10, help="Outfit generations per journey")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--target", help="Base URL of an already running app; skips starting the stand-ins")
+    parser.add_argument("--port", type=int, default=5050, help="Port for the load-test app")
+    parser.add_argument("--gemini-port", type=int, default=8701)
+    parser.add_argument("--weather-port", type=int, default=8702)
+    parser.add_argument("--api-latency-ms", type=float, default=300, help="Added latency of the fake Gemini/OpenWeather APIs")
+    parser.add_argument("--api-jitter-ms", type=float, default=100)
+    parser.add_argument("--vision-latency-ms", type=float, default=150, help="Added latency of the fake Vision client")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of fake external calls that fail")
+    parser.add_argument("--mongodb-uri", help="Local mongod for the app (default: mongomock)")
+    parser.add_argument("--json-out", help="Write the per-route summary to this file")
+    args = parser.parse_args(argv)
+
+    processes = []
+    try:
+        if not args.target:
+            processes.append(start_process(
+                "loadtest.fake_services",
+                "--gemini-port", args.gemini_port, "--weather-port", args.weather_port,
+                "--latency-ms", args.api_latency_ms, "--jitter-ms", args.api_jitter_ms, "--error-rate", args.error_rate
+            ))
+            app_args = [
+                "--port", args.port,
+                "--gemini-base", f"http://127.0.0.1:{args.gemini_port}",
+                "--weather-base", f"http://127.0.0.1:{args.weather_port}",
+                "--vision-latency-ms", args.vision_latency_ms, "--vision-error-rate", args.error_rate
+            ]
+            if args.mongodb_uri:
+                app_args += ["--mongodb-uri", args.mongodb_uri]
+            processes.append(start_process("loadtest.app_server", *app_args))
+            args.target = f"http://127.0.0.1:{args.port}"
+
+        if not wait_until_up(args.target + "/"):
+            print(f"App at {args.target} did not come up")
+            return 1
+
+        stats = RouteStats()
+        start = time.time()
+        deadline = start + args.duration
+        threads = [threading.Thread(target=user_loop, args=(i, args, stats, deadline), daemon=True) for i in range(args.users)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall_seconds = time.time() - start
+
+        summary = stats.summary(wall_seconds)
+        print_report(summary, wall_seconds, args.users)
+        if args.json_out:
+            with open(args.json_out, "w") as f:
+                json.dump({"users": args.users, "wall_seconds": wall_seconds, "routes": summary}, f, indent=2)
+        return 0
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=10)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+import mongomock
+import pytest
+from utils.wardrobe_summary import get_wardrobe_summary, wardrobe_change, get_category_count
+
+class ScanHook:
+    """
+    Uploads collection that runs a callback while a summary rebuild is scanning it
+    """
+    def __init__(self, collection, on_scan):
+        self.collection = collection
+        self.on_scan = on_scan
+
+    def find(self, *args, **kwargs):
+        items = list(self.collection.find(*args, **kwargs))
+        on_scan, self.on_scan = self.on_scan, None
+        if on_scan:
+            on_scan()
+        return items
+
+@pytest.fixture
+def db():
+    database = mongomock.MongoClient().db
+    user_id = database.users.insert_one({"username": "alice"}).inserted_id
+    database.uploads.insert_one({"user_id": user_id, "item_id": "top-1", "category": "top"})
+    return database, user_id
+
+def upload(database, user_id, item_id, category):
+    item = {"user_id": user_id, "item_id": item_id, "category": category}
+    with wardrobe_change(database.users, database.summaries, user_id) as change:
+        database.uploads.insert_one(item)
+        change.add([item])
+
+def read_summary(database, user_id, uploads=None):
+    return get_wardrobe_summary(database.summaries, uploads or database.uploads, database.users, user_id)
+
+def test_increment_applies_to_current_summary(db):
+    database, user_id = db
+    read_summary(database, user_id)
+    upload(database, user_id, "shoes-1", "shoes")
+
+    stored = database.summaries.find_one({"user_id": user_id})
+    assert get_category_count(stored, "shoes") == 1
+    assert read_summary(database, user_id)["total"] == 2
+
+def test_upload_during_rebuild_is_not_lost(db):
+    database, user_id = db
+    # The upload lands after the scan read the wardrobe, so its $inc finds no summary to update
+    uploads = ScanHook(database.uploads, lambda: upload(database, user_id, "shoes-1", "shoes"))
+    assert get_category_count(read_summary(database, user_id, uploads), "shoes") == 0
+
+    assert get_category_count(read_summary(database, user_id), "shoes") == 1
+
+def test_change_in_progress_during_rebuild_is_not_counted_twice(db):
+    database, user_id = db
+    item = {"user_id": user_id, "item_id": "shoes-1", "category": "shoes"}
+    with wardrobe_change(database.users, database.summaries, user_id) as change:
+        database.uploads.insert_one(item)
+        change.add([item])
+        # The rebuild sees the new item before the change's $inc is applied
+        assert get_category_count(read_summary(database, user_id), "shoes") == 1
+
+    assert get_category_count(read_summary(database, user_id), "shoes") == 1
+    assert read_summary(database, user_id)["total"] == 2
+
+def test_failed_change_leaves_summary_to_be_rebuilt(db):
+    database, user_id = db
+    read_summary(database, user_id)
+    with pytest.raises(RuntimeError):
+        with wardrobe_change(database.users, database.summaries, user_id):
+            database.uploads.insert_one({"user_id": user_id, "item_id": "shoes-1", "category": "shoes"})
+            raise RuntimeError("write failed after the insert")
+
+    assert get_category_count(read_summary(database, user_id), "shoes") == 1
+
+def test_clear_resets_summary(db):
+    database, user_id = db
+    read_summary(database, user_id)
+    with wardrobe_change(database.users, database.summaries, user_id) as change:
+        database.uploads.delete_many({"user_id": user_id})
+        change.clear()
+
+    assert database.summaries.find_one({"user_id": user_id}) is None
+    assert read_summary(database, user_id)["total"] == 0
@@ -0,0 +1,113 @@
+# utils/accessory_utils.py
+import random
+from utils.outfit_generator import calculate_dominant_color_match_score, has_matching_occasion
+from utils.weather_outfit_generator import get_temperature_range, has_temperature_range_tag, has_weather_tag
+from utils.recent_suggestions import penalize_recent
+from utils.metrics import timed
+
+# Accessory subcategories assigned by categorize_clothing_item
+ACCESSORY_SUBCATEGORIES = ["jewelry", "winter", "bags", "headwear", "other"]
+
+# Subcategories matched to the outfit by color; winter accessories are added for the weather instead
+COLOR_MATCHED_SUBCATEGORIES = ["bags", "jewelry"]
+
+# Minimum score for a color-matched accessory to be worth adding (0.85 = neutral, 0.8 = harmonious)
+MIN_ACCESSORY_SCORE = 0.75
+
+def bucket_accessories(accessories):
+    """
+    Group accessories by subcategory in a single pass, so each slot only scores its own bucket.
+    Unavailable accessories are left out since accessories are optional.
+
+    Args:
+        accessories (list): Accessory items
+
+    Returns:
+        dict: Subcategory -> list of items (unknown or missing subcategories go to "other")
+    """
+    buckets = {subcategory: [] for subcategory in ACCESSORY_SUBCATEGORIES}
+    for item in accessories:
+        if item.get("unavailable"):
+            continue
+        subcategory = item.get("subcategory")
+        buckets[subcategory if subcategory in buckets else "other"].append(item)
+    return buckets
+
+def _pick_scored(scored_items, recent_item_ids):
+    """
+    Pick one accessory from (item, score) pairs the same way the generators pick shoes and bottoms:
+    weighted by score among the top 3 candidates
+    """
+    penalize_recent(scored_items, recent_item_ids)
+    scored_items.sort(key=lambda x: x[1], reverse=True)
+    top_items = scored_items[:min(3, len(scored_items))]
+    return random.choices(
+        [item[0] for item in top_items],
+        weights=[max(0.1, item[1]) for item in top_items],
+        k=1
+    )[0]
+
+def score_accessory_color(accessory, outfit_items):
+    """
+    Score an accessory by its average dominant color match with the outfit's items, with a small
+    bonus when it shares an occasion with the top (the first item)
+    """
+    color_score = sum(calculate_dominant_color_match_score(accessory, item) for item in outfit_items) / len(outfit_items)
+    occasion_bonus = 0.05 if has_matching_occasion(outfit_items[0], accessory) else 0
+    return min(1.0, color_score + occasion_bonus)
+
+@timed("select_outfit_accessories")
+def select_outfit_accessories(buckets, top, bottom, shoes, temperature=None, weather_condition=None, recent_item_ids=None):
+    """
+    Choose accessories to complete a generated outfit, at most one per subcategory
+
+    Winter accessories (scarves, gloves, beanies) are added for cold or snowy weather when a temperature
+    or weather condition is given. Bags and jewelry are added when one matches the outfit's colors well.
+
+    Args:
+        buckets (dict): Accessories grouped by bucket_accessories
+        top, bottom, shoes (dict): The generated outfit (bottom may be None for complete tops)
+        temperature (float): Current temperature in Fahrenheit, for weather-based outfits
+        weather_condition (str): Current weather condition, for weather-based outfits
+        recent_item_ids (set): IDs of items recently suggested to the user, which are down-weighted
+
+    Returns:
+        list: Selected accessory items
+    """
+    if not top or not shoes:
+        return []
+
+    outfit_items = [item for item in (top, bottom, shoes) if item]
+    selected = []
+
+    current_temp_range = get_temperature_range(temperature) if temperature is not None else None
+    if buckets.get("winter") and (current_temp_range == "cold" or weather_condition == "snow"):
+        scored_winter = []
+        for accessory in buckets["winter"]:
+            weather_score = 0.5
+            if current_temp_range and has_temperature_range_tag(accessory, current_temp_range):
+                weather_score += 0.3
+            if weather_condition and has_weather_tag(accessory, weather_condition):
+                weather_score += 0.2
+            scored_winter.append((accessory, 0.6 * weather_score + 0.4 * score_accessory_color(accessory, outfit_items)))
+        selected.append(_pick_scored(scored_winter, recent_item_ids))
+
+    for subcategory in COLOR_MATCHED_SUBCATEGORIES:
+        scored_items = [(accessory, score_accessory_color(accessory, outfit_items)) for accessory in buckets.get(subcategory, [])]
+        scored_items = [(accessory, score) for accessory, score in scored_items if score >= MIN_ACCESSORY_SCORE]
+        if scored_items:
+            selected.append(_pick_scored(scored_items, recent_item_ids))
+
+    return selected
+
+def serialize_accessory(item):
+    """
+    Convert an accessory into the JSON shape returned with generated outfits
+    """
+    return {
+        "id": item["item_id"],
+        "image_url": item["image_url"],
+        "subcategory": item.get("subcategory"),
+        "colors": item.get("colors", []),
+        "unavailable": item.get("unavailable", False)
+    }
@@ -0,0 +1,254 @@
+# utils/garment_mask.py
+"""
+Optional local color extraction that ignores the photo background.
+
+The garment is separated from the backdrop with classical image processing (no model): pixels close to the
+colors along the image border, and connected to the border, are background. The remaining pixels are
+clustered with k-means into the garment's dominant colors. The work runs in a process pool so it never
+holds the web worker's GIL, and results are cached by image content.
+
+Enable with GARMENT_MASKING=1. If the mask looks wrong (almost nothing or almost everything is background,
+e.g. a white shirt on a white backdrop) the caller falls back to the Vision API colors.
+"""
+import io
+import os
+import hashlib
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from cachetools import TTLCache
+from utils.metrics import record_cache_lookup
+
+GARMENT_MASKING_ENABLED = os.environ.get("GARMENT_MASKING", "0").lower() in ("1", "true", "yes")
+GARMENT_MASK_WORKERS = int(os.environ.get("GARMENT_MASK_WORKERS", 2))
+GARMENT_MASK_TIMEOUT = float(os.environ.get("GARMENT_MASK_TIMEOUT", 10))
+
+# Images are analyzed at this size (longest side); colors don't need more detail
+WORKING_SIZE = 160
+# Width of the frame the background colors are sampled from, as a fraction of the image size
+BORDER_FRACTION = 0.04
+# RGB distance within which a pixel counts as the background color
+BACKGROUND_DISTANCE = 30
+# A mask covering less or more of the image than this is treated as a failed segmentation
+MIN_GARMENT_FRACTION = 0.03
+MAX_GARMENT_FRACTION = 0.97
+# k-means settings: clusters, iterations, pixels sampled, and the distance under which clusters are merged
+COLOR_CLUSTERS = 5
+KMEANS_ITERATIONS = 12
+MAX_CLUSTER_PIXELS = 4000
+MERGE_DISTANCE = 32
+
+_color_cache = TTLCache(maxsize=int(os.environ.get("GARMENT_COLOR_CACHE_SIZE", 512)), ttl=24 * 60 * 60)
+_color_cache_lock = threading.Lock()
+
+_mask_executor = None
+_mask_executor_lock = threading.Lock()
+
+def get_mask_executor():
+    """
+    Get the process pool that runs local image processing (garment masking, image embeddings).
+    Workers are spawned rather than forked, since the web server process is multi-threaded.
+    """
+    global _mask_executor
+    if _mask_executor is None:
+        with _mask_executor_lock:
+            if _mask_executor is None:
+                _mask_executor = ProcessPoolExecutor(max_workers=GARMENT_MASK_WORKERS,
+                                                     mp_context=multiprocessing.get_context("spawn"))
+    return _mask_executor
+
+def shutdown_mask_executor(wait=True):
+    """
+    Stop the local image processing pool (called when a server worker exits)
+    """
+    global _mask_executor
+    with _mask_executor_lock:
+        executor, _mask_executor = _mask_executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait)
+
+def run_in_image_pool(function, image_bytes):
+    """
+    Run a local image processing function on the process pool and wait up to GARMENT_MASK_TIMEOUT seconds.
+    A pool broken by a crashed worker is replaced, so one bad image can't disable local processing.
+
+    Returns:
+        The function's result
+
+    Raises:
+        Exception: Whatever the function raised, or a timeout
+    """
+    try:
+        return get_mask_executor().submit(function, bytes(image_bytes)).result(timeout=GARMENT_MASK_TIMEOUT)
+    except BrokenProcessPool:
+        shutdown_mask_executor(wait=False)
+        raise
+
+def extract_garment_colors(image_bytes):
+    """
+    Get the dominant colors of the garment in an image, leaving out the background
+
+    Args:
+        image_bytes (bytes): Image content
+
+    Returns:
+        list: Colors in the extract_colors shape ('rgb', 'score', 'pixel_fraction'), sorted by score,
+              or None if masking is disabled, failed or timed out
+    """
+    if not GARMENT_MASKING_ENABLED:
+        return None
+
+    cache_key = hashlib.sha256(image_bytes).hexdigest()
+    with _color_cache_lock:
+        cached = _color_cache.get(cache_key)
+    record_cache_lookup("garment_colors", cached is not None)
+    if cached is not None:
+        return [dict(color) for color in cached]
+
+    try:
+        colors = run_in_image_pool(mask_and_cluster, image_bytes)
+    except Exception as e:
+        print(f"Error masking garment: {e}")
+        return None
+
+    # Failed masks are cached too: the same photo would fail the same way
+    with _color_cache_lock:
+        _color_cache[cache_key] = colors
+    return [dict(color) for color in colors] if colors is not None else None
+
+def mask_and_cluster(image_bytes):
+    """
+    Mask the garment and cluster its colors (runs in a pool process)
+
+    Returns:
+        list: Colors sorted by score, or None if the mask isn't plausible
+    """
+    pixels, garment = load_masked_pixels(image_bytes)
+    if garment is None:
+        return None
+    return cluster_colors(pixels[garment])
+
+def load_masked_pixels(image_bytes):
+    """
+    Decode an image at WORKING_SIZE and mask its garment
+
+    Args:
+        image_bytes (bytes): Image content
+
+    Returns:
+        tuple: (height x width x 3 float array of RGB values, boolean garment mask or None if the mask
+               isn't plausible)
+    """
+    import numpy as np
+    from PIL import Image
+
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        image.draft("RGB", (WORKING_SIZE, WORKING_SIZE))
+        has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+        image = image.convert("RGBA" if has_alpha else "RGB")
+        image.thumbnail((WORKING_SIZE, WORKING_SIZE))
+        pixels = np.asarray(image, dtype=np.float32)
+
+    if has_alpha:
+        # Cut-out product photos already carry their mask
+        garment = pixels[..., 3] > 16
+        pixels = pixels[..., :3]
+    else:
+        garment = compute_garment_mask(pixels)
+
+    fraction = float(garment.mean())
+    if not MIN_GARMENT_FRACTION <= fraction <= MAX_GARMENT_FRACTION:
+        return pixels, None
+    return pixels, garment
+
+def compute_garment_mask(pixels):
+    """
+    Separate the garment from the background
+
+    The background colors are sampled from the median color of each side of the image border. Pixels within
+    BACKGROUND_DISTANCE of one of them are background candidates, and only candidate regions connected to the
+    border are removed, so garment areas that happen to match the backdrop color stay in the mask.
+
+    Args:
+        pixels (numpy.ndarray): Image as a height x width x 3 float array
+
+    Returns:
+        numpy.ndarray: Boolean mask, True for garment pixels
+    """
+    import numpy as np
+    from scipy import ndimage
+
+    height, width, _ = pixels.shape
+    border = max(1, int(round(min(height, width) * BORDER_FRACTION)))
+    sides = [pixels[:border].reshape(-1, 3), pixels[-border:].reshape(-1, 3),
+             pixels[:, :border].reshape(-1, 3), pixels[:, -border:].reshape(-1, 3)]
+    background_colors = np.array([np.median(side, axis=0) for side in sides])
+
+    distances = np.linalg.norm(pixels[:, :, None, :] - background_colors[None, None, :, :], axis=-1)
+    candidates = distances.min(axis=-1) < BACKGROUND_DISTANCE
+
+    labels, _ = ndimage.label(candidates)
+    border_labels = np.unique(np.concatenate([labels[0], labels[-1], labels[:, 0], labels[:, -1]]))
+    background = np.isin(labels, border_labels[border_labels > 0])
+
+    # Drop thin specks of noise and edge halos left outside the garment
+    return ndimage.binary_opening(~background, iterations=1)
+
+def cluster_colors(garment_pixels):
+    """
+    Cluster garment pixels into dominant colors with k-means (k-means++ seeding, fixed seed)
+
+    Args:
+        garment_pixels (numpy.ndarray): N x 3 float array of RGB values
+
+    Returns:
+        list: Colors in the extract_colors shape, largest first; score and pixel_fraction are both the
+              share of garment pixels
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(0)
+    if len(garment_pixels) > MAX_CLUSTER_PIXELS:
+        garment_pixels = garment_pixels[rng.choice(len(garment_pixels), MAX_CLUSTER_PIXELS, replace=False)]
+    k = min(COLOR_CLUSTERS, len(garment_pixels))
+
+    centers = [garment_pixels[rng.integers(len(garment_pixels))]]
+    for _ in range(1, k):
+        nearest = np.min(np.linalg.norm(garment_pixels[:, None, :] - np.array(centers)[None], axis=-1), axis=1) ** 2
+        if nearest.sum() == 0:
+            break
+        centers.append(garment_pixels[rng.choice(len(garment_pixels), p=nearest / nearest.sum())])
+    centers = np.array(centers)
+
+    for _ in range(KMEANS_ITERATIONS):
+        assignment = np.argmin(np.linalg.norm(garment_pixels[:, None, :] - centers[None], axis=-1), axis=1)
+        new_centers = np.array([garment_pixels[assignment == index].mean(axis=0) if np.any(assignment == index)
+                                else centers[index] for index in range(len(centers))])
+        if np.allclose(new_centers, centers):
+            break
+        centers = new_centers
+    counts = np.bincount(assignment, minlength=len(centers)).astype(float)
+
+    # Merge shades of the same color (weighted by size), largest cluster first
+    clusters = []
+    for index in np.argsort(-counts):
+        if counts[index] == 0:
+            continue
+        for cluster in clusters:
+            if np.linalg.norm(cluster["center"] - centers[index]) < MERGE_DISTANCE:
+                total = cluster["count"] + counts[index]
+                cluster["center"] = (cluster["center"] * cluster["count"] + centers[index] * counts[index]) / total
+                cluster["count"] = total
+                break
+        else:
+            clusters.append({"center": centers[index], "count": counts[index]})
+
+    total = counts.sum()
+    colors = [{
+        'rgb': [int(round(channel)) for channel in cluster["center"]],
+        'score': round(float(cluster["count"] / total), 4),
+        'pixel_fraction': round(float(cluster["count"] / total), 4)
+    } for cluster in clusters]
+    colors.sort(key=lambda color: color['score'], reverse=True)
+    return colors
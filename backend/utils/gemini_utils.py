@@ -1,15 +1,16 @@
 import os
 import base64
-import requests
+from utils.http_utils import http_session, GEMINI_API_BASE
 import json
+from utils.image_utils import read_image_bytes
 
-def analyze_clothing_occasion(image_path, api_key=None):
+def analyze_clothing_occasion(image_source, api_key=None):
     """
     Analyze an image using Google's Gemini 2.0 Flash API to determine 
     the most appropriate occasion(s) for the clothing item.
 
     Args:
-        image_path (str): Path to the image file
+        image_source (str or bytes): Path to the image file, or the image bytes already in memory
         api_key (str, optional): Gemini API key. If None, will try to load from env
 
     Returns:
@@ -22,12 +23,11 @@ def analyze_clothing_occasion(image_path, api_key=None):
             print("Error: No Gemini API key provided or found in environment")
             return []
 
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={api_key}"
+    url = f"{GEMINI_API_BASE}/v1beta/models/gemini-2.0-flash:generateContent?key={api_key}"
 
     try:
-        with open(image_path, "rb") as img_file:
-            image_bytes = img_file.read()
-            base64_encoded_image = base64.b64encode(image_bytes).decode("utf-8")
+        image_bytes = read_image_bytes(image_source)
+        base64_encoded_image = base64.b64encode(image_bytes).decode("utf-8")
 
         prompt = (
             "Analyze this clothing item and determine which occasion categories it best fits into. "
@@ -97,7 +97,7 @@ def analyze_clothing_occasion(image_path, api_key=None):
             }
         }
 
-        response = requests.post(url, json=payload)
+        response = http_session.post(url, json=payload)
         response.raise_for_status()
 
         result = response.json()
@@ -125,21 +125,21 @@ def analyze_clothing_occasion(image_path, api_key=None):
         print(f"Error analyzing image with Gemini API: {e}")
         return []
     
-def categorize_clothing_item(image_path, api_key=None):
+def categorize_clothing_item(image_source, api_key=None):
     """
     Use Google's Gemini 2.0 Flash API to categorize a clothing item into top, bottom, shoes, or accessory.
-    Also identifies if a top is a "complete" top like a dress or jumpsuit,
-    or if an accessory belongs to a specific subcategory.
+    Also identifies if a top is a "complete" top like a dress or jumpsuit, or an "outerwear" layer
+    like a jacket or coat, or if an accessory belongs to a specific subcategory.
     
     Args:
-        image_path (str): Path to the image file
+        image_source (str or bytes): Path to the image file, or the image bytes already in memory
         api_key (str, optional): Gemini API key. If None, will try to load from env
         
     Returns:
         tuple: (category, subcategory) where:
             - category is "top", "bottom", "shoes", or "accessory"
             - subcategory is:
-                - "standard" or "complete" for tops
+                - "standard", "outerwear" or "complete" for tops
                 - "jewelry", "winter", "bags", "headwear", or "other" for accessories
                 - None for others
     """
@@ -151,13 +151,12 @@ def categorize_clothing_item(image_path, api_key=None):
             return None, None
     
     # Gemini API endpoint for generating content
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={api_key}"
+    url = f"{GEMINI_API_BASE}/v1beta/models/gemini-2.0-flash:generateContent?key={api_key}"
     
     try:
-        # Read and encode the image file
-        with open(image_path, "rb") as img_file:
-            image_bytes = img_file.read()
-            base64_encoded_image = base64.b64encode(image_bytes).decode("utf-8")
+        # Encode the image (read from disk only if a path was given)
+        image_bytes = read_image_bytes(image_source)
+        base64_encoded_image = base64.b64encode(image_bytes).decode("utf-8")
         
         # Prepare the request payload with precise prompt
         payload = {
@@ -166,7 +165,7 @@ def categorize_clothing_item(image_path, api_key=None):
                     "role": "user",
                     "parts": [
                         {
-                            "text": "Please analyze this clothing item image and answer TWO questions:\n\n1. What category does this item belong to? Choose EXACTLY ONE: top, bottom, shoes, or accessory.\n\n2. IF the item is a top, is it a 'standard' top (shirts, t-shirts, blouses, sweaters, hoodies, jackets) that requires bottoms, OR is it a 'complete' top (dresses, jumpsuits, overalls, rompers) that doesn't require bottoms?\n\nIF the item is an accessory, what subcategory does it belong to? Choose EXACTLY ONE: jewelry (necklaces, bracelets, earrings, rings, watches), winter (scarves, gloves, beanies, earmuffs), bags (purses, backpacks, totes), headwear (hats, caps, headbands), or other (belts, sunglasses, ties).\n\nRules for categorization:\n- TOP: Any upper body garment (shirts, t-shirts, blouses, sweaters, hoodies, jackets, dresses, jumpsuits, etc.)\n- BOTTOM: Any lower body garment (pants, jeans, shorts, skirts, leggings, etc.)\n- SHOES: Any footwear (sneakers, boots, sandals, heels, slippers, etc.)\n- ACCESSORY: Any decorative or functional item worn to complement an outfit (jewelry, scarves, hats, bags, etc.)\n\nReturn your answer in this EXACT format:\nCategory: [top/bottom/shoes/accessory]\nSubcategory: [standard/complete/jewelry/winter/bags/headwear/other/none]"
+                            "text": "Please analyze this clothing item image and answer TWO questions:\n\n1. What category does this item belong to? Choose EXACTLY ONE: top, bottom, shoes, or accessory.\n\n2. IF the item is a top, is it a 'standard' top (shirts, t-shirts, blouses, sweaters) that requires bottoms, an 'outerwear' top (jackets, coats, hoodies, blazers, cardigans) that is worn over another top, OR a 'complete' top (dresses, jumpsuits, overalls, rompers) that doesn't require bottoms?\n\nIF the item is an accessory, what subcategory does it belong to? Choose EXACTLY ONE: jewelry (necklaces, bracelets, earrings, rings, watches), winter (scarves, gloves, beanies, earmuffs), bags (purses, backpacks, totes), headwear (hats, caps, headbands), or other (belts, sunglasses, ties).\n\nRules for categorization:\n- TOP: Any upper body garment (shirts, t-shirts, blouses, sweaters, hoodies, jackets, dresses, jumpsuits, etc.)\n- BOTTOM: Any lower body garment (pants, jeans, shorts, skirts, leggings, etc.)\n- SHOES: Any footwear (sneakers, boots, sandals, heels, slippers, etc.)\n- ACCESSORY: Any decorative or functional item worn to complement an outfit (jewelry, scarves, hats, bags, etc.)\n\nReturn your answer in this EXACT format:\nCategory: [top/bottom/shoes/accessory]\nSubcategory: [standard/outerwear/complete/jewelry/winter/bags/headwear/other/none]"
                         },
                         {
                             "inline_data": {
@@ -184,7 +183,7 @@ def categorize_clothing_item(image_path, api_key=None):
         }
         
         # Make the API request
-        response = requests.post(url, json=payload)
+        response = http_session.post(url, json=payload)
         response.raise_for_status()  
         
         # Parse the response
@@ -1,16 +1,17 @@
 # utils/gemini_weather_utils.py
 import os
 import base64
-import requests
+from utils.http_utils import http_session, GEMINI_API_BASE
 import json
+from utils.image_utils import read_image_bytes
 
-def analyze_clothing_weather_suitability(image_path, api_key=None):
+def analyze_clothing_weather_suitability(image_source, api_key=None):
     """
     Analyze an image using Google's Gemini 2.0 Flash API to determine 
     suitable weather conditions for the clothing item.
     
     Args:
-        image_path (str): Path to the image file
+        image_source (str or bytes): Path to the image file, or the image bytes already in memory
         api_key (str, optional): Gemini API key. If None, will try to load from env
         
     Returns:
@@ -27,13 +28,12 @@ def analyze_clothing_weather_suitability(image_path, api_key=None):
             return {"weather_conditions": [], "temperature_range": []}
     
     # Gemini API endpoint for generating content
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={api_key}"
+    url = f"{GEMINI_API_BASE}/v1beta/models/gemini-2.0-flash:generateContent?key={api_key}"
     
     try:
-        # Read and encode the image file
-        with open(image_path, "rb") as img_file:
-            image_bytes = img_file.read()
-            base64_encoded_image = base64.b64encode(image_bytes).decode("utf-8")
+        # Encode the image (read from disk only if a path was given)
+        image_bytes = read_image_bytes(image_source)
+        base64_encoded_image = base64.b64encode(image_bytes).decode("utf-8")
         
         # Prepare the request payload with improved prompt
         payload = {
@@ -109,7 +109,7 @@ def analyze_clothing_weather_suitability(image_path, api_key=None):
         }
         
         # Make the API request
-        response = requests.post(url, json=payload)
+        response = http_session.post(url, json=payload)
         response.raise_for_status()  # Raise exception for HTTP errors
         
         # Parse the response
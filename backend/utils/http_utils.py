@@ -0,0 +1,41 @@
+# utils/http_utils.py
+import os
+import time
+import requests
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+from utils.metrics import record_external_call
+
+# External API base URLs; override them to point the app at local stand-ins (see backend/loadtest)
+GEMINI_API_BASE = os.environ.get("GEMINI_API_BASE", "https://generativelanguage.googleapis.com").rstrip("/")
+OPENWEATHER_API_BASE = os.environ.get("OPENWEATHER_API_BASE", "https://api.openweathermap.org").rstrip("/")
+
+# Metric label for each external API host
+SERVICE_NAMES = {
+    urlsplit(GEMINI_API_BASE).netloc: "gemini",
+    urlsplit(OPENWEATHER_API_BASE).netloc: "openweather"
+}
+
+class InstrumentedSession(requests.Session):
+    """
+    requests.Session that records the latency and outcome of every call in the external API metrics
+    """
+    def request(self, method, url, *args, **kwargs):
+        host = urlsplit(url).netloc or "unknown"
+        service = SERVICE_NAMES.get(host, host)
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            response = super().request(method, url, *args, **kwargs)
+            outcome = "success" if response.status_code < 400 else "http_error"
+            return response
+        finally:
+            record_external_call(service, outcome, time.perf_counter() - start)
+
+# One pooled session per process so concurrent upload analysis reuses TLS connections
+# to the Gemini and OpenWeather APIs instead of opening a new one per call
+_pool_size = int(os.environ.get("HTTP_POOL_SIZE", 16))
+
+http_session = InstrumentedSession()
+http_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=_pool_size))
+http_session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=_pool_size))
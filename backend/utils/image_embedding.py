@@ -0,0 +1,127 @@
+# utils/image_embedding.py
+"""
+Compact image embeddings computed locally on CPU, without a model download.
+
+An embedding describes the masked garment (see utils/garment_mask.py) with three L2-normalized blocks:
+its silhouette, its edge orientations and its color histogram. Each block is weighted so the whole vector
+has unit length and the dot product of two embeddings is their cosine similarity. Embeddings are stored
+on wardrobe items as float16 bytes.
+"""
+import os
+import hashlib
+import threading
+import numpy as np
+from PIL import Image
+from cachetools import TTLCache
+from utils.garment_mask import run_in_image_pool, load_masked_pixels
+from utils.metrics import record_cache_lookup
+
+# Store an embedding on every upload, for visual similarity search (the local classifier turns them on too)
+IMAGE_EMBEDDINGS_ENABLED = os.environ.get("IMAGE_EMBEDDINGS", "0").lower() in ("1", "true", "yes")
+
+# Silhouette grid, edge orientation cells and bins, and color histogram bins per channel
+SILHOUETTE_SIZE = 12
+EDGE_SIZE = 48
+EDGE_CELLS = 4
+EDGE_BINS = 8
+COLOR_BINS = 4
+EMBEDDING_DIM = SILHOUETTE_SIZE ** 2 + EDGE_CELLS ** 2 * EDGE_BINS + COLOR_BINS ** 3
+# Share of the similarity each block contributes: shape matters most, color least
+BLOCK_WEIGHTS = (0.45, 0.35, 0.2)
+
+_embedding_cache = TTLCache(maxsize=int(os.environ.get("EMBEDDING_CACHE_SIZE", 1024)), ttl=24 * 60 * 60)
+_embedding_cache_lock = threading.Lock()
+
+def embed_image(image_bytes):
+    """
+    Get the embedding of an image, computed on the local image processing pool and cached by content
+
+    Args:
+        image_bytes (bytes): Image content
+
+    Returns:
+        numpy.ndarray: float32 vector of EMBEDDING_DIM with unit length, or None if it couldn't be computed
+    """
+    cache_key = hashlib.sha256(image_bytes).hexdigest()
+    with _embedding_cache_lock:
+        cached = _embedding_cache.get(cache_key)
+    record_cache_lookup("embedding", cached is not None)
+    if cached is not None:
+        return cached.copy()
+
+    try:
+        embedding = run_in_image_pool(compute_embedding, image_bytes)
+    except Exception as e:
+        print(f"Error computing image embedding: {e}")
+        return None
+
+    with _embedding_cache_lock:
+        _embedding_cache[cache_key] = embedding
+    return embedding.copy()
+
+def compute_embedding(image_bytes):
+    """
+    Compute the embedding of an image (runs in a pool process)
+
+    Returns:
+        numpy.ndarray: float32 vector of EMBEDDING_DIM with unit length
+    """
+    pixels, garment = load_masked_pixels(image_bytes)
+    if garment is None:
+        # No usable mask: describe the whole photo
+        garment = np.ones(pixels.shape[:2], dtype=bool)
+
+    # Crop to the garment and pad to a square, so the silhouette keeps its aspect ratio
+    rows, cols = np.nonzero(garment)
+    top, bottom, left, right = rows.min(), rows.max() + 1, cols.min(), cols.max() + 1
+    side = max(bottom - top, right - left)
+    pad_top, pad_left = (side - (bottom - top)) // 2, (side - (right - left)) // 2
+    square_mask = np.zeros((side, side), dtype=np.uint8)
+    square_mask[pad_top:pad_top + bottom - top, pad_left:pad_left + right - left] = garment[top:bottom, left:right] * 255
+    square_gray = np.zeros((side, side), dtype=np.uint8)
+    gray = pixels[top:bottom, left:right] @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+    square_gray[pad_top:pad_top + bottom - top, pad_left:pad_left + right - left] = np.clip(gray, 0, 255).astype(np.uint8)
+
+    # Silhouette centered on zero (garment +1, background -1) so outlines, not just sizes, decide the similarity
+    silhouette = np.asarray(Image.fromarray(square_mask).resize((SILHOUETTE_SIZE, SILHOUETTE_SIZE), Image.Resampling.BOX),
+                            dtype=np.float32).ravel() / 127.5 - 1
+
+    # Histogram of gradient orientations (unsigned, magnitude-weighted) over a grid of cells
+    edges = np.asarray(Image.fromarray(square_gray).resize((EDGE_SIZE, EDGE_SIZE), Image.Resampling.BILINEAR), dtype=np.float32)
+    edge_mask = np.asarray(Image.fromarray(square_mask).resize((EDGE_SIZE, EDGE_SIZE), Image.Resampling.BILINEAR)) > 0
+    grad_y, grad_x = np.gradient(edges)
+    magnitude = np.hypot(grad_x, grad_y) * edge_mask
+    orientation = ((np.arctan2(grad_y, grad_x) % np.pi) / np.pi * EDGE_BINS).astype(int) % EDGE_BINS
+    cell = EDGE_SIZE // EDGE_CELLS
+    cell_index = (np.arange(EDGE_SIZE) // cell)[:, None] * EDGE_CELLS + (np.arange(EDGE_SIZE) // cell)[None, :]
+    orientations = np.bincount((cell_index * EDGE_BINS + orientation).ravel(), weights=magnitude.ravel(),
+                               minlength=EDGE_CELLS ** 2 * EDGE_BINS)
+
+    # Coarse RGB histogram of the garment pixels (square-rooted so one dominant color doesn't swamp the rest)
+    quantized = (pixels[garment] // (256 // COLOR_BINS)).astype(int)
+    color_index = (quantized[:, 0] * COLOR_BINS + quantized[:, 1]) * COLOR_BINS + quantized[:, 2]
+    colors = np.sqrt(np.bincount(color_index, minlength=COLOR_BINS ** 3).astype(np.float32))
+
+    blocks = []
+    for block, weight in zip((silhouette, orientations, colors), BLOCK_WEIGHTS):
+        norm = np.linalg.norm(block)
+        blocks.append(block / norm * np.sqrt(weight) if norm > 0 else np.zeros_like(block))
+    embedding = np.concatenate(blocks).astype(np.float32)
+    return embedding / (np.linalg.norm(embedding) or 1.0)
+
+def embedding_to_bytes(embedding):
+    """
+    Pack an embedding for storage on a wardrobe item (float16, EMBEDDING_DIM * 2 bytes)
+    """
+    return np.asarray(embedding, dtype=np.float16).tobytes()
+
+def embedding_from_bytes(data):
+    """
+    Unpack a stored embedding
+
+    Returns:
+        numpy.ndarray: float32 vector, or None if the data isn't an embedding of the current layout
+    """
+    if not data or len(data) != EMBEDDING_DIM * 2:
+        return None
+    return np.frombuffer(bytes(data), dtype=np.float16).astype(np.float32)
@@ -0,0 +1,112 @@
+# utils/image_utils.py
+import io
+import os
+import hashlib
+from functools import lru_cache
+from PIL import Image
+
+# Uploaded files get a UUID name and are never rewritten, so they can be cached "forever"
+IMMUTABLE_MAX_AGE = 31536000  # One year, in seconds
+
+# Suffix appended to the original filename for the precompressed WebP variant
+WEBP_VARIANT_SUFFIX = ".webp"
+
+def read_image_bytes(image_source):
+    """
+    Get the raw bytes of an image given either a path or an in-memory buffer.
+    Buffers (bytes, bytearray, memoryview) are returned as-is without copying.
+
+    Args:
+        image_source (str, bytes, bytearray or memoryview): Image path or image data
+
+    Returns:
+        bytes-like: The image content
+    """
+    if isinstance(image_source, (bytes, bytearray, memoryview)):
+        return image_source
+    with open(image_source, "rb") as image_file:
+        return image_file.read()
+
+def get_webp_variant_key(key):
+    """
+    Get the storage key of the precompressed WebP variant for an uploaded image
+
+    Args:
+        key (str): Storage key (or path) of the original image
+
+    Returns:
+        str: Key where the WebP variant is (or would be) stored
+    """
+    return key + WEBP_VARIANT_SUFFIX
+
+def encode_webp_variant(image_source, original_size, quality=80):
+    """
+    Encode a precompressed WebP copy of an uploaded image.
+    The variant is only returned if it is actually smaller than the original file.
+
+    Args:
+        image_source (str or file-like): Path or file object of the original image
+        original_size (int): Size of the original image in bytes
+        quality (int): WebP quality setting (0-100)
+
+    Returns:
+        io.BytesIO: Encoded WebP data positioned at the start, or None if no variant is worthwhile
+    """
+    try:
+        with Image.open(image_source) as image:
+            if image.format == "WEBP":
+                return None
+            if image.mode not in ("RGB", "RGBA"):
+                image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+            variant = io.BytesIO()
+            image.save(variant, "WEBP", quality=quality, method=4)
+
+        # Keep the variant only if it saves bytes
+        if variant.tell() >= original_size:
+            return None
+        variant.seek(0)
+        return variant
+    except Exception as e:
+        print(f"Error creating WebP variant: {e}")
+        return None
+
+def select_image_variant(key, accept_header, storage_backend):
+    """
+    Choose which stored file to serve for an image request based on the Accept header.
+    Browsers that advertise WebP support get the precompressed variant when one exists.
+
+    Args:
+        key (str): Storage key of the original image
+        accept_header (str): Value of the request's Accept header
+        storage_backend: Storage backend holding the image
+
+    Returns:
+        tuple: (key, mimetype) where mimetype is None if it should be guessed from the key
+    """
+    if accept_header and "image/webp" in accept_header:
+        variant_key = get_webp_variant_key(key)
+        if storage_backend.exists(variant_key):
+            return variant_key, "image/webp"
+    return key, None
+
+def compute_file_etag(file_path):
+    """
+    Compute a strong ETag for a file based on its content.
+    The hash is cached per (path, size, mtime) so each file is only read once.
+
+    Args:
+        file_path (str): Path to the file
+
+    Returns:
+        str: Hex digest to be used as a strong ETag
+    """
+    stat = os.stat(file_path)
+    return _hash_file_content(file_path, stat.st_size, stat.st_mtime_ns)
+
+@lru_cache(maxsize=4096)
+def _hash_file_content(file_path, size, mtime_ns):
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:32]
@@ -0,0 +1,172 @@
+# utils/item_features.py
+from utils.color_utils import is_neutral_color, get_matching_colors
+from utils.perceptual_color import rgb_to_lab, perceptual_engine_enabled, perceptual_match_score
+
+# Bump when the feature layout or derivation changes; stale records are recomputed on read
+FEATURE_VERSION = 4
+
+# Every color name get_color_name can return, with a stable numeric ID
+COLOR_IDS = {
+    "black": 0, "white": 1, "gray": 2, "beige": 3, "brown": 4, "navy": 5, "blue": 6, "red": 7,
+    "pink": 8, "orange": 9, "yellow": 10, "green": 11, "purple": 12, "unknown": 13
+}
+NEUTRAL_COLORS = {"black", "white", "gray", "beige", "brown"}
+
+# Tag vocabularies produced by the Gemini analysis; each tag is one bit of a mask
+OCCASIONS = ["casual", "work/professional", "formal", "athletic/sport", "lounge/sleepwear"]
+TEMPERATURE_RANGES = ["cold", "cool", "warm", "hot"]
+WEATHER_CONDITIONS = ["sunny", "cloudy", "rain", "snow"]
+
+OCCASION_BITS = {occasion: 1 << index for index, occasion in enumerate(OCCASIONS)}
+TEMPERATURE_BITS = {temp_range: 1 << index for index, temp_range in enumerate(TEMPERATURE_RANGES)}
+WEATHER_BITS = {condition: 1 << index for index, condition in enumerate(WEATHER_CONDITIONS)}
+
+# Feature mask -> (bits of its vocabulary, feature listing the item's tags outside it)
+TAG_FIELDS = {
+    "occasions": (OCCASION_BITS, "other_occasions"),
+    "temperatures": (TEMPERATURE_BITS, "other_temperatures"),
+    "weather": (WEATHER_BITS, "other_weather")
+}
+
+# Occasions that keep a top or bottom out of weather outfits, and the one that excludes shoes
+EXCLUDED_TOP_BOTTOM_MASK = OCCASION_BITS["formal"] | OCCASION_BITS["lounge/sleepwear"]
+LOUNGE_MASK = OCCASION_BITS["lounge/sleepwear"]
+
+# Tops tagged only for cold/cool weather and for rain or snow are jackets and coats in practice;
+# used to find outer layers among items uploaded before the "outerwear" subcategory existed
+WARM_WEATHER_MASK = TEMPERATURE_BITS["warm"] | TEMPERATURE_BITS["hot"]
+WET_WEATHER_MASK = WEATHER_BITS["rain"] | WEATHER_BITS["snow"]
+
+def _dominant_color_pair_score(color1, color2):
+    # Same tiers as calculate_dominant_color_match_score, for a single pair of dominant colors
+    if color1 == color2:
+        return 0.95
+    if is_neutral_color(color1) or is_neutral_color(color2):
+        return 0.85
+    if color2 in get_matching_colors(color1) or color1 in get_matching_colors(color2):
+        return 0.80
+    return 0.3
+
+# Precomputed dominant color compatibility, indexed by color ID: COLOR_PAIR_SCORES[id1][id2]
+COLOR_PAIR_SCORES = [[_dominant_color_pair_score(color1, color2) for color2 in COLOR_IDS] for color1 in COLOR_IDS]
+
+def to_mask(tags, bits):
+    """
+    Pack a list of tags into a bitmask (tags outside the vocabulary are ignored)
+    """
+    mask = 0
+    for tag in tags or []:
+        mask |= bits.get(tag, 0)
+    return mask
+
+def other_tags(tags, bits):
+    """
+    List the tags outside a vocabulary, which a bitmask can't hold
+    """
+    return sorted({tag for tag in tags or [] if isinstance(tag, str) and tag not in bits})
+
+def has_tag(features, field, tag):
+    """
+    Check if a feature record has a tag: a mask bit for tags in the vocabulary, the raw tag otherwise
+
+    Args:
+        features (dict): Feature record from get_item_features
+        field (str): "occasions", "temperatures" or "weather"
+        tag (str): Tag to look for
+    """
+    bits, other_field = TAG_FIELDS[field]
+    bit = bits.get(tag)
+    if bit is None:
+        return tag in features[other_field]
+    return bool(features[field] & bit)
+
+def shares_tag(features1, features2, field):
+    """
+    Check if two feature records share at least one tag of a field (see has_tag)
+    """
+    other_field = TAG_FIELDS[field][1]
+    return bool(features1[field] & features2[field]) or not set(features1[other_field]).isdisjoint(features2[other_field])
+
+def compute_item_features(item):
+    """
+    Compute the compact feature record the outfit generators work from
+
+    Args:
+        item (dict): Wardrobe item with colors, occasions, temperature_range, weather_conditions
+
+    Returns:
+        dict: Feature record with:
+            - version: FEATURE_VERSION
+            - colors: lowercased color names, dominant first
+            - color_ids: numeric IDs of those colors (-1 for names outside COLOR_IDS)
+            - lab: CIELAB values of those colors, for the perceptual color engine
+            - dominant_color: first color name or None
+            - neutral: True if the item has colors and all of them are neutral
+            - occasions / temperatures / weather: bitmasks of the item's tags
+            - other_occasions / other_temperatures / other_weather: the item's tags outside those vocabularies
+            - complete_top: True for dresses, jumpsuits and other tops that need no bottom
+            - outerwear: True for jackets, coats and other tops worn over a base top
+    """
+    colors = [color_data['name'].lower() for color_data in item.get('colors') or []]
+    labs = [rgb_to_lab(color_data['rgb']) for color_data in item.get('colors') or [] if color_data.get('rgb')]
+    temperatures = to_mask(item.get('temperature_range'), TEMPERATURE_BITS)
+    weather = to_mask(item.get('weather_conditions'), WEATHER_BITS)
+    return {
+        "version": FEATURE_VERSION,
+        "colors": colors,
+        "color_ids": [COLOR_IDS.get(color, -1) for color in colors],
+        "lab": labs,
+        "dominant_color": colors[0] if colors else None,
+        "neutral": bool(colors) and all(color in NEUTRAL_COLORS for color in colors),
+        "occasions": to_mask(item.get('occasions'), OCCASION_BITS),
+        "temperatures": temperatures,
+        "weather": weather,
+        "other_occasions": other_tags(item.get('occasions'), OCCASION_BITS),
+        "other_temperatures": other_tags(item.get('temperature_range'), TEMPERATURE_BITS),
+        "other_weather": other_tags(item.get('weather_conditions'), WEATHER_BITS),
+        "complete_top": item.get("subcategory") == "complete",
+        "outerwear": item.get("subcategory") == "outerwear" or (
+            item.get("category") == "top" and item.get("subcategory") != "complete" and
+            bool(temperatures & TEMPERATURE_BITS["cold"]) and not temperatures & WARM_WEATHER_MASK and
+            bool(weather & WET_WEATHER_MASK)
+        )
+    }
+
+def get_item_features(item):
+    """
+    Get an item's feature record, computing it (and keeping it on the dict) if it is missing or stale.
+    Items uploaded before features existed are handled the same way, just without the precomputation.
+    """
+    features = item.get("features")
+    if not features or features.get("version") != FEATURE_VERSION:
+        features = compute_item_features(item)
+        item["features"] = features
+    return features
+
+def is_complete_top_item(item):
+    """
+    Check if an item is a complete top (dress, jumpsuit, etc.) that doesn't need a bottom
+    """
+    return get_item_features(item)["complete_top"]
+
+def is_outerwear_item(item):
+    """
+    Check if a top is an outer layer (jacket, coat, etc.) rather than a base top
+    """
+    return get_item_features(item)["outerwear"]
+
+def get_dominant_color_pair_score(item1, item2):
+    """
+    Look up the precomputed compatibility of two items' dominant colors
+    (scored in CIELAB instead when COLOR_ENGINE=perceptual)
+
+    Returns:
+        float: Score between 0 and 1 (0.5 if either item has no known dominant color)
+    """
+    if perceptual_engine_enabled():
+        return perceptual_match_score(get_item_features(item1)["lab"][:1], get_item_features(item2)["lab"][:1])
+    color_ids1 = get_item_features(item1)["color_ids"]
+    color_ids2 = get_item_features(item2)["color_ids"]
+    if not color_ids1 or not color_ids2 or color_ids1[0] < 0 or color_ids2[0] < 0:
+        return 0.5
+    return COLOR_PAIR_SCORES[color_ids1[0]][color_ids2[0]]
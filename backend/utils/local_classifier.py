@@ -0,0 +1,89 @@
+# utils/local_classifier.py
+import os
+import threading
+import numpy as np
+from cachetools import TTLCache
+from utils.image_embedding import embedding_from_bytes
+
+# Classify uploads on the server from the user's own labeled items before asking Gemini
+LOCAL_CLASSIFIER_ENABLED = os.environ.get("LOCAL_CLASSIFIER", "0").lower() in ("1", "true", "yes")
+# Neighbors that vote, and the share of the (similarity-weighted) vote the winning label needs
+LOCAL_CLASSIFIER_K = int(os.environ.get("LOCAL_CLASSIFIER_K", 5))
+LOCAL_CLASSIFIER_MIN_CONFIDENCE = float(os.environ.get("LOCAL_CLASSIFIER_MIN_CONFIDENCE", 0.8))
+# Labeled items a user needs before their wardrobe is used as a reference
+MIN_REFERENCE_ITEMS = 10
+# An upload this far from everything in the wardrobe (maybe not clothing at all) goes to Gemini
+MIN_NEIGHBOR_SIMILARITY = 0.6
+
+# Reference embeddings per (user, wardrobe version); any wardrobe change produces a new key
+_reference_cache = TTLCache(maxsize=int(os.environ.get("LOCAL_CLASSIFIER_CACHE_SIZE", 256)), ttl=60 * 60)
+_reference_cache_lock = threading.Lock()
+
+def load_reference_set(uploads_collection, user):
+    """
+    Get the embeddings and labels of a user's items, cached until their wardrobe changes.
+    Only items categorized by Gemini are references, so local mistakes can't reinforce themselves.
+
+    Args:
+        uploads_collection: MongoDB collection of wardrobe items
+        user (dict): User document
+
+    Returns:
+        tuple: (N x EMBEDDING_DIM float32 array, list of (category, subcategory) labels), or (None, []) if
+               the user has fewer than MIN_REFERENCE_ITEMS usable items
+    """
+    cache_key = (user["_id"], user.get("wardrobe_version", 0))
+    with _reference_cache_lock:
+        cached = _reference_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    embeddings, labels = [], []
+    for item in uploads_collection.find({"user_id": user["_id"], "embedding": {"$exists": True},
+                                         "category_source": {"$ne": "local"}},
+                                        {"embedding": 1, "category": 1, "subcategory": 1}):
+        embedding = embedding_from_bytes(item.get("embedding"))
+        if embedding is not None and item.get("category"):
+            embeddings.append(embedding)
+            labels.append((item["category"], item.get("subcategory")))
+
+    reference = (np.array(embeddings), labels) if len(labels) >= MIN_REFERENCE_ITEMS else (None, [])
+    with _reference_cache_lock:
+        _reference_cache[cache_key] = reference
+    return reference
+
+def classify_locally(uploads_collection, user, embedding):
+    """
+    Categorize an upload by a similarity-weighted vote of its nearest neighbors among the user's items
+
+    Args:
+        uploads_collection: MongoDB collection of wardrobe items
+        user (dict): User document
+        embedding (numpy.ndarray): Embedding of the upload
+
+    Returns:
+        tuple: (category, subcategory) if the vote is confident enough, otherwise None
+    """
+    if embedding is None:
+        return None
+    try:
+        references, labels = load_reference_set(uploads_collection, user)
+    except Exception as e:
+        print(f"Error loading local classifier references: {e}")
+        return None
+    if references is None:
+        return None
+
+    similarities = references @ embedding
+    nearest = np.argsort(-similarities)[:LOCAL_CLASSIFIER_K]
+    if similarities[nearest[0]] < MIN_NEIGHBOR_SIMILARITY:
+        return None
+
+    votes = {}
+    for index in nearest:
+        votes[labels[index]] = votes.get(labels[index], 0) + max(float(similarities[index]), 0)
+    label = max(votes, key=votes.get)
+    total = sum(votes.values())
+    if not total or votes[label] / total < LOCAL_CLASSIFIER_MIN_CONFIDENCE:
+        return None
+    return label
@@ -0,0 +1,221 @@
+# utils/metrics.py
+import os
+import time
+import uuid
+import cProfile
+import tempfile
+import threading
+import functools
+from bisect import bisect_left
+from contextlib import contextmanager
+from flask import g, request
+from pymongo import monitoring
+
+# Histogram buckets in seconds, from fast Mongo queries up to slow Gemini calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Every metric exposed on /metrics: name -> (type, help text)
+METRICS = {
+    "aesclo_http_requests_total": ("counter", "HTTP requests handled, by route, method and status"),
+    "aesclo_http_request_duration_seconds": ("histogram", "HTTP request latency by route and method"),
+    "aesclo_stage_duration_seconds": ("histogram", "Time spent in named stages of request handling"),
+    "aesclo_external_api_calls_total": ("counter", "Calls to external APIs (Gemini, OpenWeather, Vision) by outcome"),
+    "aesclo_external_api_duration_seconds": ("histogram", "External API call latency"),
+    "aesclo_cache_requests_total": ("counter", "Cache lookups by cache and result (hit/miss)"),
+    "aesclo_mongo_commands_total": ("counter", "MongoDB commands by command name and outcome"),
+    "aesclo_mongo_command_duration_seconds": ("histogram", "MongoDB command latency reported by command monitoring"),
+}
+
+# Opt-in per-request profiling: send "X-Profile: 1" to dump a cProfile trace of that request
+PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED", "").lower() in ("1", "true", "yes")
+PROFILE_DIR = os.environ.get("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "aesclo-profiles"))
+PROFILE_HEADER = "X-Profile"
+
+_lock = threading.Lock()
+_counters = {}    # (name, labels) -> value
+_histograms = {}  # (name, labels) -> [bucket counts..., +Inf count], sum
+
+def _label_key(labels):
+    return tuple(sorted(labels.items())) if labels else ()
+
+def increment(name, labels=None, amount=1):
+    """
+    Increment a counter
+
+    Args:
+        name (str): Metric name (must be listed in METRICS)
+        labels (dict): Label names and values
+        amount (float): Amount to add
+    """
+    key = (name, _label_key(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+def observe(name, value, labels=None):
+    """
+    Record one observation (usually a duration in seconds) in a histogram
+    """
+    key = (name, _label_key(labels))
+    bucket = bisect_left(DEFAULT_BUCKETS, value)
+    with _lock:
+        entry = _histograms.get(key)
+        if entry is None:
+            entry = _histograms[key] = [[0] * (len(DEFAULT_BUCKETS) + 1), 0.0]
+        entry[0][bucket] += 1
+        entry[1] += value
+
+@contextmanager
+def stage_timer(stage):
+    """
+    Time a block of code as a named stage, e.g. `with stage_timer("upload_store"):`
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe("aesclo_stage_duration_seconds", time.perf_counter() - start, {"stage": stage})
+
+def timed(stage):
+    """
+    Decorator that times every call of a function as a named stage
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage_timer(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def record_external_call(service, outcome, duration):
+    """
+    Record one call to an external API
+
+    Args:
+        service (str): API name, e.g. "gemini"
+        outcome (str): "success", "http_error" or "error"
+        duration (float): Call duration in seconds
+    """
+    increment("aesclo_external_api_calls_total", {"service": service, "outcome": outcome})
+    observe("aesclo_external_api_duration_seconds", duration, {"service": service})
+
+@contextmanager
+def track_external_call(service):
+    """
+    Time and count an external API call made inside the block; exceptions count as errors
+    """
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "success"
+    finally:
+        record_external_call(service, outcome, time.perf_counter() - start)
+
+def record_cache_lookup(cache, hit):
+    """
+    Count a cache hit or miss
+    """
+    increment("aesclo_cache_requests_total", {"cache": cache, "result": "hit" if hit else "miss"})
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """
+    PyMongo command listener that records the duration of every MongoDB command.
+    Pass an instance to the client with event_listeners=[MongoCommandMetrics()].
+    """
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._record(event, "success")
+
+    def failed(self, event):
+        self._record(event, "error")
+
+    def _record(self, event, outcome):
+        increment("aesclo_mongo_commands_total", {"command": event.command_name, "outcome": outcome})
+        observe("aesclo_mongo_command_duration_seconds", event.duration_micros / 1e6, {"command": event.command_name})
+
+def init_request_metrics(app):
+    """
+    Register hooks that time every request by route and handle opt-in profiling
+    """
+    @app.before_request
+    def _start_request_timer():
+        g.request_start_time = time.perf_counter()
+        if PROFILING_ENABLED and request.headers.get(PROFILE_HEADER):
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+                g.request_profiler = profiler
+            except ValueError:
+                # Another request on this process is already being profiled
+                print("Profiling skipped: another profiler is active")
+
+    @app.after_request
+    def _record_request_metrics(response):
+        profiler = g.pop("request_profiler", None)
+        if profiler is not None:
+            profiler.disable()
+            response.headers["X-Profile-File"] = save_profile(profiler, request.endpoint)
+
+        start = g.pop("request_start_time", None)
+        if start is not None:
+            route = request.url_rule.rule if request.url_rule else "unmatched"
+            labels = {"route": route, "method": request.method}
+            observe("aesclo_http_request_duration_seconds", time.perf_counter() - start, labels)
+            increment("aesclo_http_requests_total", dict(labels, status=str(response.status_code)))
+        return response
+
+def save_profile(profiler, endpoint):
+    """
+    Write a request's cProfile stats to PROFILE_DIR (open with snakeviz or pstats)
+
+    Returns:
+        str: Name of the written .prof file
+    """
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    filename = f"{int(time.time())}-{endpoint or 'unmatched'}-{uuid.uuid4().hex[:8]}.prof"
+    profiler.dump_stats(os.path.join(PROFILE_DIR, filename))
+    return filename
+
+def _format_labels(labels, extra=None):
+    pairs = list(labels) + (list(extra) if extra else [])
+    if not pairs:
+        return ""
+    escaped = []
+    for label, value in pairs:
+        value = str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+        escaped.append(f'{label}="{value}"')
+    return "{" + ",".join(escaped) + "}"
+
+def render_metrics():
+    """
+    Render every metric in the Prometheus text exposition format
+
+    Returns:
+        str: Metrics text for the /metrics endpoint
+    """
+    with _lock:
+        counters = dict(_counters)
+        histograms = {key: (list(entry[0]), entry[1]) for key, entry in _histograms.items()}
+
+    lines = []
+    for name, (metric_type, help_text) in METRICS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        if metric_type == "counter":
+            for (metric_name, labels), value in sorted(counters.items()):
+                if metric_name == name:
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+        else:
+            for (metric_name, labels), (buckets, total) in sorted(histograms.items()):
+                if metric_name != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(DEFAULT_BUCKETS + ("+Inf",), buckets):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {total}")
+                lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+    return "\n".join(lines) + "\n"
@@ -1,6 +1,10 @@
 # utils/outfit_generator.py
 import random
 from utils.color_utils import calculate_color_match_score, is_neutral_color, get_matching_colors
+from utils.metrics import timed
+from utils.item_features import get_item_features, is_complete_top_item, shares_tag
+from utils.perceptual_color import perceptual_engine_enabled, perceptual_match_score, perceptual_match_scores
+from utils.recent_suggestions import penalize_recent, choose_fresh_item
 
 def has_color(item, color_name):
     """
@@ -33,19 +37,7 @@ def is_item_neutral_color(item):
     Check if an item has ONLY neutral colors (black, white, gray, beige, brown)
     Returns True if ALL of the item's colors are neutral, False otherwise
     """
-    neutral_colors = ["black", "white", "gray", "beige", "brown"]
-    
-    if 'colors' in item and item['colors'] and len(item['colors']) > 0:
-        # Check all detected colors
-        for color_data in item['colors']:
-            color_name = color_data['name'].lower()
-            # If any non-neutral color is found, return False
-            if color_name not in neutral_colors:
-                return False
-        # If we've checked all colors and they're all neutral, return True
-        return True
-    
-    return False
+    return get_item_features(item)["neutral"]
 
 def filter_shoes_by_color_match(top, shoes):
     """
@@ -67,7 +59,7 @@ def filter_shoes_by_color_match(top, shoes):
         return shoes
     
     # Get ALL of the top's colors
-    top_colors = [color_data['name'].lower() for color_data in top['colors']] if top['colors'] else []
+    top_colors = get_item_features(top)["colors"]
     
     if not top_colors:
         return shoes
@@ -96,7 +88,7 @@ def filter_shoes_by_color_match(top, shoes):
             continue
             
         # Get ALL of the shoe's colors
-        shoe_colors = [color_data['name'].lower() for color_data in shoe['colors']]
+        shoe_colors = get_item_features(shoe)["colors"]
         
         # Check if ANY shoe color directly matches ANY top color
         has_direct_match = any(shoe_color in top_colors for shoe_color in shoe_colors)
@@ -163,15 +155,17 @@ def get_item_dominant_color(item):
     Get the dominant color of an item
     Returns the dominant color name or None if not available
     """
-    if 'colors' in item and item['colors'] and len(item['colors']) > 0:
-        return item['colors'][0]['name'].lower()
-    return None
+    return get_item_features(item)["dominant_color"]
 
 def calculate_dominant_color_match_score(item1, item2):
     """
     Calculate a color match score between two items, considering ONLY dominant colors
+    Uses the perceptual CIELAB engine instead of the color name table when COLOR_ENGINE=perceptual
     Returns a score between 0 and 1
     """
+    if perceptual_engine_enabled():
+        return perceptual_match_score(get_item_features(item1)["lab"], get_item_features(item2)["lab"])
+
     # Check if items have dominant color information
     has_item1_colors = ('colors' in item1 and item1['colors'])
     has_item2_colors = ('colors' in item2 and item2['colors'])
@@ -181,8 +175,8 @@ def calculate_dominant_color_match_score(item1, item2):
         return 0.5
     
     # Get dominant colors from both items
-    item1_colors = [c['name'].lower() for c in item1['colors']]
-    item2_colors = [c['name'].lower() for c in item2['colors']]
+    item1_colors = get_item_features(item1)["colors"]
+    item2_colors = get_item_features(item2)["colors"]
     
     if not item1_colors or not item2_colors:
         return 0.5
@@ -220,21 +214,26 @@ def calculate_dominant_color_match_score(item1, item2):
     else:
         return 0.3   # Low score for no match
 
+def calculate_dominant_color_match_scores(base_item, items):
+    """
+    Batch form of calculate_dominant_color_match_score: score one item against many.
+    The perceptual engine scores all candidates in one vectorized pass.
+
+    Returns:
+        list: One score between 0 and 1 per item, in order
+    """
+    if perceptual_engine_enabled():
+        base_labs = get_item_features(base_item)["lab"]
+        return perceptual_match_scores(base_labs, [get_item_features(item)["lab"] for item in items]).tolist()
+    return [calculate_dominant_color_match_score(base_item, item) for item in items]
+
 def has_matching_occasion(item1, item2):
     """
     Check if two items share at least one occasion tag
     Returns True if they share an occasion, False otherwise
     """
-    # If either item doesn't have occasion information, return False
-    if not item1.get('occasions') or not item2.get('occasions'):
-        return False
-    
-    # Check for common occasions
-    for occasion in item1['occasions']:
-        if occasion in item2['occasions']:
-            return True
-    
-    return False
+    # Items without occasion information never match
+    return shares_tag(get_item_features(item1), get_item_features(item2), "occasions")
 
 def is_color_match_suitable(top_color, bottom_color):
     """
@@ -265,13 +264,15 @@ def is_color_match_suitable(top_color, bottom_color):
     # Check if colors are complementary
     return is_complementary_color(top_color, bottom_color)
 
-def generate_color_coordinated_outfit(tops, bottoms, shoes, base_color=None):
+@timed("generate_color_coordinated_outfit")
+def generate_color_coordinated_outfit(tops, bottoms, shoes, base_color=None, recent_item_ids=None):
     """
     Generate a color-coordinated outfit from the given items
     If base_color is provided, ALWAYS include a top with that color
     Ensures that chosen items share at least one occasion tag and temperature range
     Ensures bottoms are same color as top, neutral, or complementary
     Increases chance of shoes matching top color
+    Items in recent_item_ids (recently suggested to the user) are down-weighted
     Returns a tuple of (top, bottom, shoes) where bottom may be None for complete tops
     """
     if not tops or not shoes:
@@ -299,13 +300,13 @@ def generate_color_coordinated_outfit(tops, bottoms, shoes, base_color=None):
             valid_tops = matching_tops
             
         # Select a random top with the selected color from valid tops
-        selected_top = random.choice(valid_tops)
+        selected_top = choose_fresh_item(valid_tops, recent_item_ids)
         
         # Get the dominant color of the selected top
         top_dominant_color = get_item_dominant_color(selected_top)
         
         # Check if the selected top is a "complete" top (dress, jumpsuit, etc.)
-        is_complete_top = selected_top.get("subcategory") == "complete"
+        is_complete_top = is_complete_top_item(selected_top)
         
         # If it's a complete top, skip bottom selection
         if is_complete_top:
@@ -409,6 +410,7 @@ def generate_color_coordinated_outfit(tops, bottoms, shoes, base_color=None):
                 scored_shoes.append((shoe, final_score))
             
             # Sort by score and get top matches
+            penalize_recent(scored_shoes, recent_item_ids)
             scored_shoes.sort(key=lambda x: x[1], reverse=True)
             top_shoes = scored_shoes[:min(3, len(scored_shoes))]
             if not top_shoes:
@@ -506,6 +508,7 @@ def generate_color_coordinated_outfit(tops, bottoms, shoes, base_color=None):
             scored_bottoms.append((bottom, final_score))
         
         # Sort by score and get top matches
+        penalize_recent(scored_bottoms, recent_item_ids)
         scored_bottoms.sort(key=lambda x: x[1], reverse=True)
         top_bottoms = scored_bottoms[:min(3, len(scored_bottoms))]  # Using top 3 candidates
         
@@ -691,6 +694,7 @@ def generate_color_coordinated_outfit(tops, bottoms, shoes, base_color=None):
             scored_shoes.append((shoe, final_score))
         
         # Sort by score and get top matches
+        penalize_recent(scored_shoes, recent_item_ids)
         scored_shoes.sort(key=lambda x: x[1], reverse=True)
         top_shoes = scored_shoes[:min(3, len(scored_shoes))]
         
@@ -706,8 +710,8 @@ def generate_color_coordinated_outfit(tops, bottoms, shoes, base_color=None):
         return selected_top, best_bottom, best_shoe
     
     # Choose a random top and check if it's complete
-    base_item = random.choice(tops)
-    is_complete_top = base_item.get("subcategory") == "complete"
+    base_item = choose_fresh_item(tops, recent_item_ids)
+    is_complete_top = is_complete_top_item(base_item)
     
     # Get the dominant color of the selected top
     top_dominant_color = get_item_dominant_color(base_item)
@@ -793,6 +797,7 @@ def generate_color_coordinated_outfit(tops, bottoms, shoes, base_color=None):
             scored_shoes.append((shoe, final_score))
         
         # Sort by score and select top matches
+        penalize_recent(scored_shoes, recent_item_ids)
         scored_shoes.sort(key=lambda x: x[1], reverse=True)
         top_shoes = scored_shoes[:min(3, len(scored_shoes))]
         
@@ -864,6 +869,7 @@ def generate_color_coordinated_outfit(tops, bottoms, shoes, base_color=None):
             scored_bottoms.append((bottom, final_score))
             
         # Sort by score and get top matches
+        penalize_recent(scored_bottoms, recent_item_ids)
         scored_bottoms.sort(key=lambda x: x[1], reverse=True)
         top_bottoms = scored_bottoms[:min(3, len(scored_bottoms))]
         
@@ -983,6 +989,7 @@ def generate_color_coordinated_outfit(tops, bottoms, shoes, base_color=None):
             scored_shoes.append((shoe, final_score))
             
         # Sort by score and select top matches
+        penalize_recent(scored_shoes, recent_item_ids)
         scored_shoes.sort(key=lambda x: x[1], reverse=True)
         top_shoes = scored_shoes[:min(3, len(scored_shoes))]
         
@@ -1003,10 +1010,7 @@ def select_matching_shoes_for_complete_top(top, shoes):
     Returns the best matching shoe
     """
     scored_shoes = []
-    for shoe in shoes:
-        # Calculate color match score
-        color_score = calculate_dominant_color_match_score(top, shoe)
-        
+    for shoe, color_score in zip(shoes, calculate_dominant_color_match_scores(top, shoes)):
         # Apply occasion bonus if items have matching occasions
         occasion_bonus = 0.35 if has_matching_occasion(top, shoe) else 0
         
@@ -1039,10 +1043,7 @@ def select_matching_items(base_item, item_list1, item_list2):
     """
     # Find matching items for the first list (typically bottoms)
     scored_items1 = []
-    for item in item_list1:
-        # Calculate color match score
-        color_score = calculate_dominant_color_match_score(base_item, item)
-        
+    for item, color_score in zip(item_list1, calculate_dominant_color_match_scores(base_item, item_list1)):
         # Apply occasion bonus if items have matching occasions (increased from 0.2 to 0.35)
         occasion_bonus = 0.35 if has_matching_occasion(base_item, item) else 0
         
@@ -1070,10 +1071,10 @@ def select_matching_items(base_item, item_list1, item_list2):
     
     # Find matching items for the second list (typically shoes)
     scored_items2 = []
-    for item in item_list2:
-        # Calculate color match scores with both base item and first selected item
-        base_color_score = calculate_dominant_color_match_score(base_item, item)
-        item1_color_score = calculate_dominant_color_match_score(best_item1, item)
+    # Color match scores with both the base item and the first selected item
+    base_color_scores = calculate_dominant_color_match_scores(base_item, item_list2)
+    item1_color_scores = calculate_dominant_color_match_scores(best_item1, item_list2)
+    for item, base_color_score, item1_color_score in zip(item_list2, base_color_scores, item1_color_scores):
         avg_color_score = (base_color_score + item1_color_score) / 2
         
         # Calculate occasion match bonus - increased values
@@ -1110,18 +1111,11 @@ def has_matching_temperature_range(item1, item2):
     Check if two items share at least one temperature range tag
     Returns True if they share a temperature range, False otherwise
     """
-    # If either item doesn't have temperature range information, return False
-    if not item1.get('temperature_range') or not item2.get('temperature_range'):
-        return False
-    
-    # Check for common temperature ranges
-    for temp_range in item1['temperature_range']:
-        if temp_range in item2['temperature_range']:
-            return True
-    
-    return False
+    # Items without temperature range information never match
+    return shares_tag(get_item_features(item1), get_item_features(item2), "temperatures")
 
-def generate_occasion_based_outfit(tops, bottoms, shoes, target_occasion="casual"):
+@timed("generate_occasion_based_outfit")
+def generate_occasion_based_outfit(tops, bottoms, shoes, target_occasion="casual", recent_item_ids=None):
     """
     Generate an outfit appropriate for a specific occasion from the given items
     with enhanced color coordination and temperature range matching to ensure visual
@@ -1134,6 +1128,7 @@ def generate_occasion_based_outfit(tops, bottoms, shoes, target_occasion="casual
         target_occasion (str): The target occasion for the outfit. 
                                Options: "casual", "work/professional", "formal", 
                                         "athletic/sport", "lounge/sleepwear"
+        recent_item_ids (set): IDs of items recently suggested to the user, which are down-weighted
     
     Returns:
         tuple: (top, bottom, shoes) where bottom may be None for complete tops
@@ -1166,7 +1161,7 @@ def generate_occasion_based_outfit(tops, bottoms, shoes, target_occasion="casual
     # Check if we have bottoms when needed
     if not bottoms_matching_occasion:
         # Check if all tops are "complete" (don't need bottoms)
-        all_complete_tops = all(top.get("subcategory") == "complete" for top in tops_matching_occasion)
+        all_complete_tops = all(is_complete_top_item(top) for top in tops_matching_occasion)
         if not all_complete_tops:
             # We need bottoms for standard tops
             bottoms_matching_occasion = bottoms
@@ -1183,7 +1178,7 @@ def generate_occasion_based_outfit(tops, bottoms, shoes, target_occasion="casual
         valid_tops = tops_matching_occasion
     
     # Select a random top for this occasion from valid tops
-    selected_top = random.choice(valid_tops)
+    selected_top = choose_fresh_item(valid_tops, recent_item_ids)
     
     # Get the dominant color of the selected top
     top_dominant_color = get_item_dominant_color(selected_top)
@@ -1192,7 +1187,7 @@ def generate_occasion_based_outfit(tops, bottoms, shoes, target_occasion="casual
     top_temp_ranges = selected_top.get('temperature_range', [])
     
     # Check if the selected top is a "complete" top (dress, jumpsuit, etc.)
-    is_complete_top = selected_top.get("subcategory") == "complete"
+    is_complete_top = is_complete_top_item(selected_top)
     
     if is_complete_top:
         # For complete tops, skip bottom selection and directly match with shoes
@@ -1285,6 +1280,7 @@ def generate_occasion_based_outfit(tops, bottoms, shoes, target_occasion="casual
             scored_shoes.append((shoe, final_score))
         
         # Sort by score and get top matches
+        penalize_recent(scored_shoes, recent_item_ids)
         scored_shoes.sort(key=lambda x: x[1], reverse=True)
         top_shoes = scored_shoes[:min(3, len(scored_shoes))]
         
@@ -1376,6 +1372,7 @@ def generate_occasion_based_outfit(tops, bottoms, shoes, target_occasion="casual
         # If we have no bottoms for standard tops, we can't create an outfit
         return None, None, None
         
+    penalize_recent(scored_bottoms, recent_item_ids)
     scored_bottoms.sort(key=lambda x: x[1], reverse=True)
     top_bottoms = scored_bottoms[:min(3, len(scored_bottoms))]
     best_bottom = random.choices(
@@ -1512,6 +1509,7 @@ def generate_occasion_based_outfit(tops, bottoms, shoes, target_occasion="casual
         scored_shoes.append((shoe, final_score))
     
     # Sort by score and get top matches
+    penalize_recent(scored_shoes, recent_item_ids)
     scored_shoes.sort(key=lambda x: x[1], reverse=True)
     top_shoes = scored_shoes[:min(3, len(scored_shoes))]
     
@@ -0,0 +1,331 @@
+# utils/outfit_planner.py
+import time
+import random
+from datetime import date, timedelta
+from utils.item_features import (get_item_features, is_complete_top_item, is_outerwear_item, get_dominant_color_pair_score,
+                                 has_tag, shares_tag, OCCASIONS, TEMPERATURE_BITS, WEATHER_BITS, TEMPERATURE_RANGES, LOUNGE_MASK)
+from utils.weather_outfit_generator import (get_temperature_range, is_temp_range_compatible, LAYERING_TEMP_RANGES,
+                                            MIN_OPTIONAL_LAYER_SCORE)
+from utils.metrics import timed
+
+DEFAULT_MAX_ITEM_USES = 2
+DEFAULT_PLAN_DAYS = 7
+MAX_PLAN_DAYS = 14
+VALID_WEATHER_CONDITIONS = ["sunny", "cloudy", "rain", "snow", "other"]
+DEFAULT_PLAN_TIME_BUDGET = 1.5  # seconds
+MAX_PLAN_TIME_BUDGET = 5.0
+
+# Candidate outfits kept per day, and the items per category they are built from
+DAY_CANDIDATES = 30
+ITEMS_PER_CATEGORY = 20
+# (top, bottom) pairs kept before shoes are added
+PAIRS_PER_DAY = 60
+# Times one item may appear among a day's candidates, so tight usage limits still leave alternatives
+MAX_CANDIDATES_PER_ITEM = 3
+# Partial plans kept after each day
+BEAM_WIDTH = 24
+
+# Score lost for each item worn again the day after, and for a day left without an outfit
+CONSECUTIVE_REPEAT_PENALTY = 0.25
+MISSING_DAY_PENALTY = 1.0
+
+# Temperature ranges an item can be worn in, per current range (same rules as is_temp_range_compatible)
+TEMPERATURE_FIT_MASKS = {
+    current: sum(TEMPERATURE_BITS[temp_range] for temp_range in TEMPERATURE_RANGES
+                 if is_temp_range_compatible([temp_range], current))
+    for current in TEMPERATURE_RANGES
+}
+
+def build_plan_days(data):
+    """
+    Build the per-day constraints of a plan request
+
+    Days come either from "days" (a list of dicts with date and optional occasion, temperature and
+    weather_condition) or from start_date/end_date (default: trip_length days, a week unless given) with the same options
+    at the top level applying to every day. Options at the top level also fill in what a listed day leaves out.
+
+    Returns:
+        tuple: (days, error_message) - days is a list of dicts with date (datetime.date), occasion,
+               temperature and weather_condition; error_message is set instead when the request is invalid
+    """
+    defaults = {key: data.get(key) for key in ("occasion", "temperature", "weather_condition")}
+    try:
+        if data.get("days"):
+            requested = [dict(defaults, **{key: value for key, value in day.items() if value is not None})
+                         for day in data["days"]]
+            for day in requested:
+                day["date"] = date.fromisoformat(day["date"])
+        else:
+            start = date.fromisoformat(data["start_date"]) if data.get("start_date") else date.today()
+            if data.get("end_date"):
+                end = date.fromisoformat(data["end_date"])
+            else:
+                end = start + timedelta(days=int(data.get("trip_length", DEFAULT_PLAN_DAYS)) - 1)
+            if end < start:
+                return None, "end_date must not be before start_date."
+            if (end - start).days >= MAX_PLAN_DAYS:
+                return None, f"Plans can cover at most {MAX_PLAN_DAYS} days."
+            requested = [dict(defaults, date=start + timedelta(days=offset)) for offset in range((end - start).days + 1)]
+    except (KeyError, TypeError, ValueError, AttributeError):
+        return None, "Dates must be given as YYYY-MM-DD."
+
+    if not requested or len(requested) > MAX_PLAN_DAYS:
+        return None, f"Plans must cover between 1 and {MAX_PLAN_DAYS} days."
+
+    for day in requested:
+        if day.get("occasion") and day["occasion"] not in OCCASIONS:
+            return None, f"Invalid occasion. Valid options are: {', '.join(OCCASIONS)}"
+        if day.get("weather_condition") and day["weather_condition"] not in VALID_WEATHER_CONDITIONS:
+            return None, f"Invalid weather condition. Valid options are: {', '.join(VALID_WEATHER_CONDITIONS)}"
+        if day.get("temperature") is not None:
+            try:
+                day["temperature"] = float(day["temperature"])
+            except (TypeError, ValueError):
+                return None, "Temperature must be a number."
+
+    return requested, None
+
+def pair_score(cache, item1, item2):
+    """
+    Score how well two items go together, memoized in cache (the plan's pairwise score graph)
+
+    Dominant color compatibility counts for 70% and a shared occasion for 30%.
+
+    Args:
+        cache (dict): (item_id, item_id) -> score, shared by every day of the plan
+        item1, item2 (dict): Wardrobe items
+
+    Returns:
+        float: Score between 0 and 1
+    """
+    key = (item1["item_id"], item2["item_id"]) if item1["item_id"] <= item2["item_id"] else (item2["item_id"], item1["item_id"])
+    score = cache.get(key)
+    if score is None:
+        shared_occasion = shares_tag(get_item_features(item1), get_item_features(item2), "occasions")
+        score = 0.7 * get_dominant_color_pair_score(item1, item2) + (0.3 if shared_occasion else 0)
+        cache[key] = score
+    return score
+
+def item_day_fit(item, day):
+    """
+    Score how well an item suits one day's constraints
+
+    Args:
+        item (dict): Wardrobe item
+        day (dict): Day constraints with optional occasion, temperature and weather_condition
+
+    Returns:
+        float: Score between 0 and 1, or None if the item doesn't suit the day at all
+    """
+    features = get_item_features(item)
+    components = []
+
+    occasion = day.get("occasion")
+    if occasion:
+        if not has_tag(features, "occasions", occasion):
+            return None
+        components.append(1.0)
+    elif features["occasions"] & LOUNGE_MASK and not features["occasions"] & ~LOUNGE_MASK and not features["other_occasions"]:
+        # Sleepwear only shows up when the day asks for it
+        return None
+
+    temperature = day.get("temperature")
+    if temperature is not None:
+        current_temp_range = get_temperature_range(temperature)
+        if not features["temperatures"]:
+            components.append(0.5)
+        elif features["temperatures"] & TEMPERATURE_BITS[current_temp_range]:
+            components.append(1.0)
+        elif features["temperatures"] & TEMPERATURE_FIT_MASKS[current_temp_range]:
+            components.append(0.6)
+        else:
+            return None
+
+    weather_condition = day.get("weather_condition")
+    if weather_condition in WEATHER_BITS:
+        if features["weather"] & WEATHER_BITS[weather_condition]:
+            components.append(1.0)
+        elif weather_condition in ["rain", "snow"] and features["weather"]:
+            components.append(0.2)
+        else:
+            components.append(0.5)
+
+    return sum(components) / len(components) if components else 0.75
+
+def _fitting_items(items, day, rng):
+    # Best-fitting items for the day; shuffled first so ties break differently on every plan
+    items = list(items)
+    rng.shuffle(items)
+    fitted = [(item, fit) for item, fit in ((item, item_day_fit(item, day)) for item in items) if fit is not None]
+    fitted.sort(key=lambda x: x[1], reverse=True)
+    return fitted[:ITEMS_PER_CATEGORY]
+
+def score_planned_outfit(cache, top, bottom, shoe, fits):
+    """
+    Score one candidate outfit: 60% the mean pair score of its items, 40% their mean fit to the day
+    """
+    pairs = [(top, bottom), (bottom, shoe), (top, shoe)] if bottom else [(top, shoe)]
+    pair_mean = sum(pair_score(cache, a, b) for a, b in pairs) / len(pairs)
+    return 0.6 * pair_mean + 0.4 * (sum(fits) / len(fits))
+
+def build_day_candidates(day, tops, bottoms, shoes, cache, rng):
+    """
+    Build the best candidate outfits for one day
+
+    Items are narrowed to the best fits per category, (top, bottom) pairs are ranked before shoes are
+    added, and only the best outfits are kept, so the global search works on a small candidate set.
+
+    Returns:
+        list: (score, top, bottom, shoes) tuples, best first
+    """
+    fitted_tops = _fitting_items(tops, day, rng)
+    fitted_bottoms = _fitting_items(bottoms, day, rng)
+    fitted_shoes = _fitting_items(shoes, day, rng)
+
+    pairs = []
+    for top, top_fit in fitted_tops:
+        if is_complete_top_item(top):
+            pairs.append((top_fit, top, None, [top_fit]))
+            continue
+        for bottom, bottom_fit in fitted_bottoms:
+            pairs.append((pair_score(cache, top, bottom) * 0.6 + (top_fit + bottom_fit) * 0.2, top, bottom, [top_fit, bottom_fit]))
+    pairs.sort(key=lambda x: x[0], reverse=True)
+
+    candidates = []
+    for _, top, bottom, fits in _diverse(pairs, PAIRS_PER_DAY, 2):
+        for shoe, shoe_fit in fitted_shoes:
+            candidates.append((score_planned_outfit(cache, top, bottom, shoe, fits + [shoe_fit]), top, bottom, shoe))
+    candidates.sort(key=lambda x: x[0], reverse=True)
+    return _diverse(candidates, DAY_CANDIDATES, 3)
+
+def _diverse(scored_outfits, limit, item_slots):
+    # Best (score, item, ...) tuples first, skipping any that would put an item in the list more than
+    # MAX_CANDIDATES_PER_ITEM times; item_slots is how many items follow the score
+    selected = []
+    appearances = {}
+    for outfit in scored_outfits:
+        item_ids = [item["item_id"] for item in outfit[1:1 + item_slots] if item]
+        if any(appearances.get(item_id, 0) >= MAX_CANDIDATES_PER_ITEM for item_id in item_ids):
+            continue
+        selected.append(outfit)
+        for item_id in item_ids:
+            appearances[item_id] = appearances.get(item_id, 0) + 1
+        if len(selected) >= limit:
+            break
+    return selected
+
+def _extend_state(state, candidate, max_uses):
+    # Add one day's outfit to a partial plan, or return None if it would break a usage limit
+    total, outfits, usage, previous_ids = state
+    score, top, bottom, shoe = candidate
+    item_ids = [item["item_id"] for item in (top, bottom, shoe) if item]
+    if any(usage.get(item_id, 0) >= max_uses for item_id in item_ids):
+        return None
+    repeats = sum(1 for item_id in item_ids if item_id in previous_ids)
+    new_usage = dict(usage)
+    for item_id in item_ids:
+        new_usage[item_id] = new_usage.get(item_id, 0) + 1
+    return (total + score - repeats * CONSECUTIVE_REPEAT_PENALTY, outfits + [candidate], new_usage, frozenset(item_ids))
+
+@timed("plan_outfits")
+def plan_outfits(days, tops, bottoms, shoes, max_uses=DEFAULT_MAX_ITEM_USES, time_budget=DEFAULT_PLAN_TIME_BUDGET, rng=None):
+    """
+    Plan one outfit per day that maximizes the total score of the whole plan
+
+    Each day gets a short list of candidate outfits scored on the shared pairwise score graph. A beam search
+    then walks the days in order, keeping the BEAM_WIDTH best partial plans: no item is used more than
+    max_uses times, and wearing an item again the next day costs CONSECUTIVE_REPEAT_PENALTY. If the time
+    budget runs out, the remaining days are filled greedily from the best partial plan.
+
+    Unavailable items are never planned. Outerwear is kept out of the base tops (when there are other tops)
+    and added afterwards as an outer layer on cold and cool days.
+
+    Args:
+        days (list): Per-day constraint dicts with optional occasion, temperature and weather_condition
+        tops, bottoms, shoes (list): Wardrobe snapshot split by category
+        max_uses (int): Maximum number of days an item can be planned
+        time_budget (float): Seconds the search may take
+        rng (random.Random): Random source (tie-breaking only)
+
+    Returns:
+        dict: Plan with:
+            - days: per day, a dict with score, top, bottom, shoes and outer_layer (top and shoes None if
+              no outfit fits the day)
+            - total_score: sum of the daily scores minus the repeat penalties
+            - complete: False if the time budget cut the search short
+    """
+    rng = rng or random.Random()
+    deadline = time.perf_counter() + time_budget
+    cache = {}
+
+    tops = [item for item in tops if not item.get("unavailable")]
+    bottoms = [item for item in bottoms if not item.get("unavailable")]
+    shoes = [item for item in shoes if not item.get("unavailable")]
+    outer_layers = [top for top in tops if is_outerwear_item(top)]
+    base_tops = [top for top in tops if not is_outerwear_item(top)] or tops
+
+    beam = [(0.0, [], {}, frozenset())]
+    complete = True
+    for day in days:
+        candidates = build_day_candidates(day, base_tops, bottoms, shoes, cache, rng)
+        next_beam = []
+        for state in beam:
+            extended = False
+            for candidate in candidates:
+                new_state = _extend_state(state, candidate, max_uses)
+                if new_state is None:
+                    continue
+                next_beam.append(new_state)
+                extended = True
+                # Out of time: take the first (best scoring) feasible outfit for each remaining day
+                if not complete:
+                    break
+            if not extended:
+                total, outfits, usage, _ = state
+                next_beam.append((total - MISSING_DAY_PENALTY, outfits + [None], usage, frozenset()))
+        next_beam.sort(key=lambda s: s[0], reverse=True)
+        if complete and time.perf_counter() >= deadline:
+            complete = False
+        beam = next_beam[:BEAM_WIDTH if complete else 1]
+
+    total, outfits, usage, _ = beam[0]
+    usage = dict(usage)
+    planned_days = []
+    for day, outfit in zip(days, outfits):
+        if outfit is None:
+            planned_days.append({"score": 0.0, "top": None, "bottom": None, "shoes": None, "outer_layer": None})
+            continue
+        score, top, bottom, shoe = outfit
+        outer_layer = _choose_outer_layer(day, top, bottom, outer_layers, usage, max_uses, cache)
+        if outer_layer:
+            usage[outer_layer["item_id"]] = usage.get(outer_layer["item_id"], 0) + 1
+        planned_days.append({"score": round(score, 3), "top": top, "bottom": bottom, "shoes": shoe, "outer_layer": outer_layer})
+
+    return {"days": planned_days, "total_score": round(total, 3), "complete": complete}
+
+def _choose_outer_layer(day, top, bottom, outer_layers, usage, max_uses, cache):
+    # Best-matching outer layer for a cold or cool day (only a good match on cool days), within the usage limits
+    temperature = day.get("temperature")
+    if temperature is None or not outer_layers:
+        return None
+    current_temp_range = get_temperature_range(temperature)
+    if current_temp_range not in LAYERING_TEMP_RANGES:
+        return None
+
+    best_layer, best_score = None, 0
+    for layer in outer_layers:
+        if usage.get(layer["item_id"], 0) >= max_uses or layer is top:
+            continue
+        fit = item_day_fit(layer, day)
+        if fit is None:
+            continue
+        color_score = pair_score(cache, layer, top)
+        if bottom:
+            color_score = (color_score + pair_score(cache, layer, bottom)) / 2
+        score = 0.5 * fit + 0.5 * color_score
+        if score > best_score:
+            best_layer, best_score = layer, score
+
+    if current_temp_range == "cool" and best_score < MIN_OPTIONAL_LAYER_SCORE:
+        return None
+    return best_layer
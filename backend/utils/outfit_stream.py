@@ -0,0 +1,212 @@
+# utils/outfit_stream.py
+import json
+import time
+from utils.outfit_generator import (generate_color_coordinated_outfit, generate_occasion_based_outfit,
+                                    calculate_dominant_color_match_score, has_matching_occasion)
+from utils.weather_outfit_generator import (generate_weather_based_outfit, calculate_weather_tag_match_score,
+                                            get_temperature_range)
+from utils.item_features import get_item_features, is_complete_top_item, OCCASIONS
+from utils.recent_suggestions import choose_fresh_item
+from utils.metrics import observe
+
+STREAM_MODES = ["color", "occasion", "weather"]
+VALID_WEATHER_CONDITIONS = ["sunny", "cloudy", "rain", "snow", "other"]
+STREAM_FORMATS = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+
+DEFAULT_STREAM_LIMIT = 10
+MAX_STREAM_LIMIT = 50
+DEFAULT_TIME_BUDGET = 2.0  # seconds
+MAX_TIME_BUDGET = 10.0
+
+# Search rounds grow from a single candidate (so the first suggestion goes out right away) up to this size
+MAX_ROUND_SIZE = 16
+# Stop once this many rounds in a row turn up nothing new: the generators have run out of combinations
+MAX_STALE_ROUNDS = 3
+
+def build_candidate_source(mode, tops, bottoms, shoes, options, recent_item_ids=None):
+    """
+    Build the candidate generator and scorer for one stream from the wardrobe snapshot
+
+    Args:
+        mode (str): "color", "occasion" or "weather"
+        tops, bottoms, shoes (list): Wardrobe snapshot split by category
+        options (dict): Request options (base_color, occasion, temperature, weather_condition)
+        recent_item_ids (set): IDs of items recently suggested to the user, passed on to the generators
+
+    Returns:
+        tuple: (source, score, error_message) - source() returns one (top, bottom, shoes) candidate,
+               score(top, bottom, shoes) rates it between 0 and 1; error_message is set instead when
+               the request can't produce any outfit
+    """
+    if mode == "color":
+        base_color = (options.get("base_color") or "random").lower()
+        if base_color == "random":
+            def source():
+                # A new random top (and its dominant color) on every attempt, like the random color button
+                top = choose_fresh_item(tops, recent_item_ids)
+                top_color = get_item_features(top)["dominant_color"] or "black"
+                return generate_color_coordinated_outfit([top], bottoms, shoes, top_color, recent_item_ids)
+        else:
+            tops_with_color = [top for top in tops if base_color in get_item_features(top)["colors"]]
+            if not tops_with_color:
+                return None, None, f"No tops found with {base_color} color. Please try another color or upload more items."
+            def source():
+                return generate_color_coordinated_outfit(tops_with_color, bottoms, shoes, base_color, recent_item_ids)
+        return source, score_color_outfit, None
+
+    if mode == "occasion":
+        target_occasion = options.get("occasion", "casual")
+        if target_occasion not in OCCASIONS:
+            return None, None, f"Invalid occasion. Valid options are: {', '.join(OCCASIONS)}"
+        tops_matching = [item for item in tops if target_occasion in (item.get("occasions") or [])]
+        bottoms_matching = [item for item in bottoms if target_occasion in (item.get("occasions") or [])]
+        shoes_matching = [item for item in shoes if target_occasion in (item.get("occasions") or [])]
+        if not tops_matching and not shoes_matching:
+            return None, None, f"No items found for the '{target_occasion}' occasion. Try uploading more items or selecting a different occasion."
+        def source():
+            return generate_occasion_based_outfit(tops_matching, bottoms_matching, shoes_matching, target_occasion,
+                                                  recent_item_ids)
+        return source, score_occasion_outfit, None
+
+    if mode == "weather":
+        temperature = options.get("temperature")
+        weather_condition = options.get("weather_condition")
+        if temperature is None or not weather_condition:
+            return None, None, "Temperature and weather condition are required."
+        if weather_condition not in VALID_WEATHER_CONDITIONS:
+            return None, None, f"Invalid weather condition. Valid options are: {', '.join(VALID_WEATHER_CONDITIONS)}"
+        try:
+            temperature = float(temperature)
+        except (TypeError, ValueError):
+            return None, None, "Temperature must be a number."
+        current_temp_range = get_temperature_range(temperature)
+        def source():
+            return generate_weather_based_outfit(tops, bottoms, shoes, temperature, weather_condition, recent_item_ids)
+        def score(top, bottom, shoe):
+            return score_weather_outfit(top, bottom, shoe, current_temp_range, weather_condition)
+        return source, score, None
+
+    return None, None, f"Invalid mode. Valid options are: {', '.join(STREAM_MODES)}"
+
+def _outfit_pairs(top, bottom, shoe):
+    return [(top, bottom), (bottom, shoe), (top, shoe)] if bottom else [(top, shoe)]
+
+def score_color_outfit(top, bottom, shoe):
+    """
+    Score an outfit by the dominant color match of each pair of its items
+    """
+    pairs = _outfit_pairs(top, bottom, shoe)
+    return sum(calculate_dominant_color_match_score(a, b) for a, b in pairs) / len(pairs)
+
+def score_occasion_outfit(top, bottom, shoe):
+    """
+    Score an outfit by color match, with the shared-occasion pairs weighted in
+    """
+    pairs = _outfit_pairs(top, bottom, shoe)
+    occasion_score = sum(1 for a, b in pairs if has_matching_occasion(a, b)) / len(pairs)
+    return 0.7 * score_color_outfit(top, bottom, shoe) + 0.3 * occasion_score
+
+def score_weather_outfit(top, bottom, shoe, current_temp_range, weather_condition):
+    """
+    Score an outfit by the weather tag match of each pair of its items, then by color
+    """
+    pairs = _outfit_pairs(top, bottom, shoe)
+    weather_score = sum(calculate_weather_tag_match_score(a, b, current_temp_range, weather_condition)
+                        for a, b in pairs) / len(pairs)
+    return 0.6 * weather_score + 0.4 * score_color_outfit(top, bottom, shoe)
+
+def iter_outfit_suggestions(source, score, limit=DEFAULT_STREAM_LIMIT, time_budget=DEFAULT_TIME_BUDGET):
+    """
+    Search for distinct outfits and yield them as they are found, best first within each search round.
+    The first round is a single candidate so the client sees a suggestion immediately; later rounds
+    double in size, and each round's new outfits are sorted by score before they go out.
+
+    Args:
+        source (callable): Returns one (top, bottom, shoes) candidate per call
+        score (callable): Rates a candidate between 0 and 1
+        limit (int): Maximum number of suggestions
+        time_budget (float): Seconds to keep searching
+
+    Yields:
+        dict: Suggestion with score, top, bottom and shoes
+    """
+    deadline = time.perf_counter() + time_budget
+    seen = set()
+    sent = 0
+    round_size = 1
+    stale_rounds = 0
+
+    while sent < limit and time.perf_counter() < deadline and stale_rounds < MAX_STALE_ROUNDS:
+        found = []
+        for _ in range(round_size):
+            if time.perf_counter() >= deadline:
+                break
+            try:
+                top, bottom, shoe = source()
+            except Exception as e:
+                # Small or lopsided wardrobes make the generators fail now and then; keep searching
+                print(f"Error generating streamed outfit candidate: {e}")
+                continue
+            # Complete tops (dresses, jumpsuits) are worn without a bottom
+            if not top or not shoe or (not bottom and not is_complete_top_item(top)):
+                continue
+            key = (top["item_id"], bottom["item_id"] if bottom else None, shoe["item_id"])
+            if key in seen:
+                continue
+            seen.add(key)
+            found.append((score(top, bottom, shoe), top, bottom, shoe))
+
+        stale_rounds = 0 if found else stale_rounds + 1
+        found.sort(key=lambda candidate: candidate[0], reverse=True)
+        for outfit_score, top, bottom, shoe in found[:limit - sent]:
+            sent += 1
+            yield {"score": round(outfit_score, 3), "top": top, "bottom": bottom, "shoes": shoe}
+        round_size = min(round_size * 2, MAX_ROUND_SIZE)
+
+def _serialize_stream_item(item):
+    return {
+        "id": item["item_id"],
+        "image_url": item["image_url"],
+        "colors": item.get("colors", []),
+        "occasions": item.get("occasions", []),
+        "weather_conditions": item.get("weather_conditions", []),
+        "temperature_range": item.get("temperature_range", []),
+        "unavailable": item.get("unavailable", False)
+    }
+
+def format_stream_event(event_type, payload, stream_format):
+    """
+    Encode one stream event as an NDJSON line or a Server-Sent Event
+    """
+    if stream_format == "sse":
+        return f"event: {event_type}\ndata: {json.dumps(payload)}\n\n"
+    return json.dumps(dict(payload, type=event_type)) + "\n"
+
+def stream_outfit_events(source, score, stream_format, limit=DEFAULT_STREAM_LIMIT, time_budget=DEFAULT_TIME_BUDGET):
+    """
+    Encode the suggestions for one stream, ending with a "done" event.
+    Runs entirely on the wardrobe snapshot captured by source and score, so it needs no request context.
+    If the client disconnects, the server closes this generator and the search stops.
+
+    Yields:
+        str: Encoded "outfit" events, then one "done" event
+    """
+    start = time.perf_counter()
+    count = 0
+    for suggestion in iter_outfit_suggestions(source, score, limit, time_budget):
+        if count == 0:
+            observe("aesclo_stage_duration_seconds", time.perf_counter() - start, {"stage": "outfit_stream_first_suggestion"})
+        count += 1
+        top, bottom = suggestion["top"], suggestion["bottom"]
+        yield format_stream_event("outfit", {
+            "rank": count,
+            "score": suggestion["score"],
+            "top": _serialize_stream_item(top),
+            "bottom": _serialize_stream_item(bottom) if bottom else None,
+            "shoes": _serialize_stream_item(suggestion["shoes"]),
+            "is_complete_top": bottom is None
+        }, stream_format)
+
+    elapsed = time.perf_counter() - start
+    observe("aesclo_stage_duration_seconds", elapsed, {"stage": "outfit_stream"})
+    yield format_stream_event("done", {"count": count, "elapsed_ms": round(elapsed * 1000, 1)}, stream_format)
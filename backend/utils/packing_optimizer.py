@@ -0,0 +1,350 @@
+# utils/packing_optimizer.py
+import time
+from itertools import combinations
+from utils.outfit_generator import calculate_dominant_color_match_score
+from utils.item_features import is_complete_top_item, is_outerwear_item
+from utils.outfit_planner import item_day_fit
+from utils.weather_outfit_generator import get_temperature_range, LAYERING_TEMP_RANGES
+from utils.metrics import timed
+
+DEFAULT_PACKING_TIME_BUDGET = 2.0  # seconds
+MAX_PACKING_TIME_BUDGET = 10.0
+
+# Two packed items can be worn together when their dominant colors match, are neutral or harmonize
+MIN_PAIR_SCORE = 0.8
+# Items per category and kind of trip day the search chooses from (the most widely pairable ones)
+CANDIDATES_PER_GROUP = 8
+
+def group_trip_days(days):
+    """
+    Group trip days that need the same kind of outfit (same occasion, temperature range and weather)
+
+    Args:
+        days (list): Per-day constraint dicts from build_plan_days
+
+    Returns:
+        list: Groups with "constraints" (the coldest day's constraints), "count" and "days" (indexes into days)
+    """
+    groups = {}
+    for day_index, day in enumerate(days):
+        temperature = day.get("temperature")
+        key = (day.get("occasion"), get_temperature_range(temperature) if temperature is not None else None,
+               day.get("weather_condition"))
+        group = groups.setdefault(key, {"constraints": day, "count": 0, "days": []})
+        group["count"] += 1
+        group["days"].append(day_index)
+        if temperature is not None and temperature < group["constraints"]["temperature"]:
+            group["constraints"] = day
+    return list(groups.values())
+
+class PackingSearch:
+    """
+    Memoized fit and pair checks shared by every step of one packing search
+    """
+    def __init__(self, groups):
+        self.groups = groups
+        self._fits = {}
+        self._pairs = {}
+
+    def fit_mask(self, item):
+        """
+        Bitmask of the groups an item can be worn for
+        """
+        mask = self._fits.get(item["item_id"])
+        if mask is None:
+            mask = 0
+            for index, group in enumerate(self.groups):
+                if item_day_fit(item, group["constraints"]) is not None:
+                    mask |= 1 << index
+            self._fits[item["item_id"]] = mask
+        return mask
+
+    def pair_score(self, item1, item2):
+        """
+        calculate_dominant_color_match_score for two items, memoized
+        """
+        key = (item1["item_id"], item2["item_id"])
+        score = self._pairs.get(key)
+        if score is None:
+            score = calculate_dominant_color_match_score(item1, item2)
+            self._pairs[key] = self._pairs[(item2["item_id"], item1["item_id"])] = score
+        return score
+
+    def pair_ok(self, item1, item2):
+        return self.pair_score(item1, item2) >= MIN_PAIR_SCORE
+
+    def valid_outfits(self, tops, bottoms, shoes):
+        """
+        Every valid outfit that can be formed from a set of packed items
+
+        Returns:
+            list: (score, top, bottom, shoes, group_mask) tuples; bottom is None for complete tops
+        """
+        outfits = []
+        for top in tops:
+            if is_complete_top_item(top):
+                bases = [(None, self.fit_mask(top))]
+            else:
+                bases = [(bottom, self.fit_mask(top) & self.fit_mask(bottom)) for bottom in bottoms
+                         if self.pair_ok(top, bottom)]
+            for bottom, base_mask in bases:
+                if not base_mask:
+                    continue
+                for shoe in shoes:
+                    mask = base_mask & self.fit_mask(shoe)
+                    if not mask or not self.pair_ok(top, shoe) or (bottom and not self.pair_ok(bottom, shoe)):
+                        continue
+                    pairs = [(top, bottom), (bottom, shoe), (top, shoe)] if bottom else [(top, shoe)]
+                    score = sum(self.pair_score(a, b) for a, b in pairs) / len(pairs)
+                    outfits.append((score, top, bottom, shoe, mask))
+        return outfits
+
+    def assign(self, outfits):
+        """
+        Give every trip day its own outfit with a maximum bipartite matching between the days and the
+        outfits (augmenting paths), so a packing list is rejected only if no assignment exists at all.
+        Days try outfits best score first, which keeps the higher-scoring outfits where they fit.
+
+        Returns:
+            list: Outfits per group (None if some day can't be covered)
+        """
+        ranked = sorted(outfits, key=lambda outfit: outfit[0], reverse=True)
+        slots = [index for index, group in enumerate(self.groups) for _ in range(group["count"])]
+        candidates = [[position for position, outfit in enumerate(ranked) if outfit[4] >> index & 1] for index in slots]
+        if len(ranked) < len(slots) or not all(candidates):
+            return None
+        owner = {}  # outfit position -> slot
+
+        def augment(slot, visited):
+            for position in candidates[slot]:
+                if position in visited:
+                    continue
+                visited.add(position)
+                if position not in owner or augment(owner[position], visited):
+                    owner[position] = slot
+                    return True
+            return False
+
+        for slot in range(len(slots)):
+            if not augment(slot, set()):
+                return None
+
+        assigned = [[] for _ in self.groups]
+        for position in sorted(owner):
+            assigned[slots[owner[position]]].append(ranked[position])
+        return assigned
+
+def _select_candidates(search, items, others):
+    # Per group, the items that fit it and pair with the most other items fitting it, so a trip with very
+    # different days still gets candidates for each kind of day
+    selected = {}
+    for index in range(len(search.groups)):
+        bit = 1 << index
+        fitting = [item for item in items if search.fit_mask(item) & bit]
+        fitting_others = [other for other in others if search.fit_mask(other) & bit]
+        fitting.sort(key=lambda item: sum(1 for other in fitting_others if search.pair_ok(item, other)), reverse=True)
+        for item in fitting[:CANDIDATES_PER_GROUP]:
+            selected.setdefault(item["item_id"], item)
+    return list(selected.values())
+
+def _coverage(search, outfits):
+    # Trip days that could get an outfit if outfits didn't have to be distinct across groups
+    return sum(min(group["count"], sum(1 for outfit in outfits if outfit[4] >> index & 1))
+               for index, group in enumerate(search.groups))
+
+def _greedy_packing(search, outfits_needed, top_candidates, bottom_candidates, shoe_candidates):
+    """
+    Build a packing list greedily: start from the best outfit for each group (reusing packed items where
+    possible), add the item that covers the most trip days until every day has a distinct outfit, then
+    drop items that turned out to be redundant
+
+    Returns:
+        tuple: (tops, bottoms, shoes, assignment) or None if the candidates can't cover the trip
+    """
+    packed = {"top": [], "bottom": [], "shoes": []}
+    all_outfits = search.valid_outfits(top_candidates, bottom_candidates, shoe_candidates)
+    for index in range(len(search.groups)):
+        group_outfits = [outfit for outfit in all_outfits if outfit[4] >> index & 1]
+        if not group_outfits:
+            return None
+        packed_ids = {item["item_id"] for items in packed.values() for item in items}
+        _, top, bottom, shoe, _ = max(group_outfits, key=lambda outfit: (
+            sum(1 for item in outfit[1:4] if item and item["item_id"] in packed_ids), outfit[0]))
+        for category, item in (("top", top), ("bottom", bottom), ("shoes", shoe)):
+            if item and item["item_id"] not in packed_ids:
+                packed[category].append(item)
+
+    candidates = {"top": top_candidates, "bottom": bottom_candidates, "shoes": shoe_candidates}
+    while True:
+        outfits = search.valid_outfits(packed["top"], packed["bottom"], packed["shoes"])
+        if len(outfits) >= outfits_needed and search.assign(outfits):
+            break
+        best_addition, best_gain = None, None
+        for category, items in candidates.items():
+            for item in items:
+                if item in packed[category]:
+                    continue
+                trial = dict(packed, **{category: packed[category] + [item]})
+                trial_outfits = search.valid_outfits(trial["top"], trial["bottom"], trial["shoes"])
+                gain = (_coverage(search, trial_outfits), len(trial_outfits))
+                if best_gain is None or gain > best_gain:
+                    best_addition, best_gain = (category, item), gain
+        if best_addition is None:
+            return None
+        packed[best_addition[0]] = packed[best_addition[0]] + [best_addition[1]]
+
+    # Drop items the final list can do without, most recently added first
+    for category in ("shoes", "bottom", "top"):
+        for item in reversed(list(packed[category])):
+            trial = dict(packed, **{category: [other for other in packed[category] if other is not item]})
+            if not trial["top"] or not trial["shoes"]:
+                continue
+            trial_outfits = search.valid_outfits(trial["top"], trial["bottom"], trial["shoes"])
+            if len(trial_outfits) >= outfits_needed and search.assign(trial_outfits):
+                packed = trial
+
+    outfits = search.valid_outfits(packed["top"], packed["bottom"], packed["shoes"])
+    return packed["top"], packed["bottom"], packed["shoes"], search.assign(outfits)
+
+def _lower_bound(outfits_needed, max_tops, max_bottoms, max_shoes, has_complete_tops):
+    # Fewest items that could possibly form enough outfits: t tops, b bottoms and s shoes make at most
+    # t * b * s outfits (t * s when every top is complete)
+    best = None
+    for tops in range(1, max_tops + 1):
+        for shoes in range(1, max_shoes + 1):
+            for bottoms in range(0 if has_complete_tops else 1, max_bottoms + 1):
+                if tops * max(bottoms, 1) * shoes >= outfits_needed:
+                    total = tops + bottoms + shoes
+                    best = total if best is None else min(best, total)
+                    break
+    return best
+
+@timed("optimize_packing")
+def optimize_packing(days, tops, bottoms, shoes, time_budget=DEFAULT_PACKING_TIME_BUDGET):
+    """
+    Find the smallest set of items from which every trip day gets its own valid outfit
+
+    Days needing the same kind of outfit are grouped. An outfit is valid for a group when every item fits
+    the group's occasion and weather and every pair of items scores at least MIN_PAIR_SCORE with
+    calculate_dominant_color_match_score. The search:
+        1. keeps, per category and group, the CANDIDATES_PER_GROUP items that pair with the most others,
+        2. builds a greedy packing list (see _greedy_packing) to get an upper bound on its size,
+        3. tries every smaller size from a counting lower bound upwards, enumerating item combinations
+           category by category and skipping (top, bottom) sets that can't reach enough outfits with
+           the given number of shoes, until a packing list is found or the time budget runs out.
+    On cold or cool trips the best matching outer layer is packed as well.
+
+    Args:
+        days (list): Per-day constraint dicts from build_plan_days
+        tops, bottoms, shoes (list): Wardrobe snapshot split by category
+        time_budget (float): Seconds the search may take
+
+    Returns:
+        dict: Result with:
+            - items: packed tops, bottoms and shoes (empty if no packing list covers the trip)
+            - outer_layer: packed outer layer or None
+            - days: per trip day, its (score, top, bottom, shoes, outer_layer) outfit
+            - lower_bound: fewest items any packing list could have
+            - optimal: True if no smaller packing list exists among the candidates
+    """
+    deadline = time.perf_counter() + time_budget
+    groups = group_trip_days(days)
+    search = PackingSearch(groups)
+    outfits_needed = len(days)
+
+    tops = [item for item in tops if not item.get("unavailable")]
+    bottoms = [item for item in bottoms if not item.get("unavailable")]
+    shoes = [item for item in shoes if not item.get("unavailable")]
+    outer_layers = [top for top in tops if is_outerwear_item(top)]
+    tops = [top for top in tops if not is_outerwear_item(top)] or tops
+
+    top_candidates = _select_candidates(search, tops, bottoms + shoes)
+    bottom_candidates = _select_candidates(search, bottoms, tops + shoes)
+    shoe_candidates = _select_candidates(search, shoes, tops + bottoms)
+
+    result = {"items": [], "outer_layer": None, "days": [], "lower_bound": None, "optimal": False}
+    if not top_candidates or not shoe_candidates:
+        return result
+
+    best = _greedy_packing(search, outfits_needed, top_candidates, bottom_candidates, shoe_candidates)
+    if best is None:
+        return result
+
+    lower_bound = _lower_bound(outfits_needed, len(top_candidates), len(bottom_candidates), len(shoe_candidates),
+                               any(is_complete_top_item(top) for top in top_candidates)) or 1
+    best_size = len(best[0]) + len(best[1]) + len(best[2])
+    optimal = best_size == lower_bound
+    for size in range(lower_bound, best_size):
+        found = _search_size(search, size, outfits_needed, top_candidates, bottom_candidates, shoe_candidates, deadline)
+        if found == "timeout":
+            break
+        if found:
+            best, optimal = found, True
+            break
+    else:
+        optimal = True
+
+    packed_tops, packed_bottoms, packed_shoes, assignment = best
+    outer_layer = _choose_packed_outer_layer(search, outer_layers, packed_tops)
+
+    day_outfits = [None] * len(days)
+    for group, outfits in zip(groups, assignment):
+        layered = outer_layer is not None and _needs_layer(group)
+        for day_index, outfit in zip(group["days"], outfits):
+            day_outfits[day_index] = outfit[:4] + (outer_layer if layered else None,)
+    result.update({
+        "items": packed_tops + packed_bottoms + packed_shoes,
+        "outer_layer": outer_layer,
+        "days": day_outfits,
+        "lower_bound": lower_bound,
+        "optimal": optimal
+    })
+    return result
+
+def _search_size(search, size, outfits_needed, top_candidates, bottom_candidates, shoe_candidates, deadline):
+    # Look for a packing list of exactly size items; returns (tops, bottoms, shoes, assignment), None or "timeout"
+    for top_count in range(1, min(size - 1, len(top_candidates)) + 1):
+        for shoe_count in range(1, min(size - top_count, len(shoe_candidates)) + 1):
+            bottom_count = size - top_count - shoe_count
+            if bottom_count > len(bottom_candidates) or top_count * max(bottom_count, 1) * shoe_count < outfits_needed:
+                continue
+            for packed_tops in combinations(top_candidates, top_count):
+                if bottom_count == 0 and not all(is_complete_top_item(top) for top in packed_tops):
+                    continue
+                for packed_bottoms in combinations(bottom_candidates, bottom_count):
+                    if time.perf_counter() >= deadline:
+                        return "timeout"
+                    # Prune: each shoe adds at most one outfit per wearable (top, bottom) pair
+                    bases = sum(1 if is_complete_top_item(top) else
+                                sum(1 for bottom in packed_bottoms if search.pair_ok(top, bottom)
+                                    and search.fit_mask(top) & search.fit_mask(bottom))
+                                for top in packed_tops)
+                    if bases * shoe_count < outfits_needed:
+                        continue
+                    for packed_shoes in combinations(shoe_candidates, shoe_count):
+                        outfits = search.valid_outfits(packed_tops, packed_bottoms, packed_shoes)
+                        if len(outfits) < outfits_needed:
+                            continue
+                        assignment = search.assign(outfits)
+                        if assignment:
+                            return list(packed_tops), list(packed_bottoms), list(packed_shoes), assignment
+    return None
+
+def _needs_layer(group):
+    temperature = group["constraints"].get("temperature")
+    return temperature is not None and get_temperature_range(temperature) in LAYERING_TEMP_RANGES
+
+def _choose_packed_outer_layer(search, outer_layers, packed_tops):
+    # One outer layer for the trip's cold and cool days: fits the most of those days, then matches the most tops
+    layered_groups = [index for index, group in enumerate(search.groups) if _needs_layer(group)]
+    if not layered_groups or not outer_layers:
+        return None
+    layered_mask = sum(1 << index for index in layered_groups)
+
+    def layer_score(layer):
+        covered = bin(search.fit_mask(layer) & layered_mask).count("1")
+        matching = sum(1 for top in packed_tops if search.pair_ok(layer, top))
+        return covered, matching
+
+    best_layer = max(outer_layers, key=layer_score)
+    return best_layer if layer_score(best_layer)[0] else None
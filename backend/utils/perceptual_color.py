@@ -0,0 +1,195 @@
+# utils/perceptual_color.py
+"""
+Perceptual color matching in CIELAB.
+
+Item colors are converted from sRGB to CIELAB (D65) once, when the item's feature record is computed, and
+matched with CIEDE2000 differences and Lab hue angles instead of the color name lookup table. The scores use
+the same tiers as calculate_dominant_color_match_score, so either engine can back the outfit generators:
+
+    0.95  a color of one item is perceptually the same as a color of the other (small CIEDE2000 difference)
+    0.85  either item's dominant color is neutral (low chroma, or a muted warm tone such as beige or brown)
+    0.80  a pair of colors is harmonious: analogous, complementary or triadic hues, or one of them neutral
+    0.30  no match
+
+Select the engine with COLOR_ENGINE=names (default) or COLOR_ENGINE=perceptual.
+"""
+import os
+import functools
+import numpy as np
+
+COLOR_ENGINE = os.environ.get("COLOR_ENGINE", "names").lower()
+
+# CIEDE2000 difference under which two colors count as the same color
+SAME_COLOR_DELTA_E = 10.0
+# Chroma under which a color is a neutral (black, white, gray)
+NEUTRAL_CHROMA = 12.0
+# Muted warm colors (beige, tan, brown) are neutrals too: hues in this range below EARTH_TONE_CHROMA
+EARTH_TONE_HUES = (20.0, 95.0)
+EARTH_TONE_CHROMA = 40.0
+# Hue angle tolerances (degrees) for the harmony rules
+ANALOGOUS_HUE = 40.0
+COMPLEMENTARY_HUE = 30.0
+TRIADIC_HUE = 20.0
+
+SAME_COLOR_SCORE = 0.95
+NEUTRAL_SCORE = 0.85
+HARMONY_SCORE = 0.80
+NO_MATCH_SCORE = 0.3
+MISSING_COLOR_SCORE = 0.5
+
+# D65 reference white
+_WHITE = (0.95047, 1.0, 1.08883)
+
+def perceptual_engine_enabled():
+    """
+    Check whether outfit scoring should use the perceptual engine
+    """
+    return COLOR_ENGINE == "perceptual"
+
+def rgb_to_lab(rgb):
+    """
+    Convert an sRGB color to CIELAB (D65)
+
+    Args:
+        rgb (list): [r, g, b] values between 0 and 255
+
+    Returns:
+        list: [L, a, b] rounded to 2 decimals
+    """
+    def linearize(channel):
+        channel /= 255.0
+        return channel / 12.92 if channel <= 0.04045 else ((channel + 0.055) / 1.055) ** 2.4
+
+    def f(t):
+        return t ** (1 / 3) if t > (6 / 29) ** 3 else t / (3 * (6 / 29) ** 2) + 4 / 29
+
+    r, g, b = (linearize(float(channel)) for channel in rgb)
+    x = (0.4124564 * r + 0.3575761 * g + 0.1804375 * b) / _WHITE[0]
+    y = (0.2126729 * r + 0.7151522 * g + 0.0721750 * b) / _WHITE[1]
+    z = (0.0193339 * r + 0.1191920 * g + 0.9503041 * b) / _WHITE[2]
+    fx, fy, fz = f(x), f(y), f(z)
+    return [round(116 * fy - 16, 2), round(500 * (fx - fy), 2), round(200 * (fy - fz), 2)]
+
+def ciede2000(lab1, lab2):
+    """
+    CIEDE2000 color difference, vectorized over any broadcastable shapes
+
+    Args:
+        lab1, lab2 (array-like): Lab colors with the last axis (L, a, b)
+
+    Returns:
+        numpy.ndarray: Differences with the broadcast shape minus the last axis
+    """
+    lab1 = np.asarray(lab1, dtype=float)
+    lab2 = np.asarray(lab2, dtype=float)
+    L1, a1, b1 = lab1[..., 0], lab1[..., 1], lab1[..., 2]
+    L2, a2, b2 = lab2[..., 0], lab2[..., 1], lab2[..., 2]
+
+    mean_c = (np.hypot(a1, b1) + np.hypot(a2, b2)) / 2
+    g = 0.5 * (1 - np.sqrt(mean_c ** 7 / (mean_c ** 7 + 25.0 ** 7)))
+    a1p, a2p = a1 * (1 + g), a2 * (1 + g)
+    c1p, c2p = np.hypot(a1p, b1), np.hypot(a2p, b2)
+    h1p = np.degrees(np.arctan2(b1, a1p)) % 360
+    h2p = np.degrees(np.arctan2(b2, a2p)) % 360
+
+    delta_l = L2 - L1
+    delta_c = c2p - c1p
+    chroma_product = c1p * c2p
+    delta_h = h2p - h1p
+    delta_h = np.where(delta_h > 180, delta_h - 360, np.where(delta_h < -180, delta_h + 360, delta_h))
+    delta_h = np.where(chroma_product == 0, 0, delta_h)
+    delta_big_h = 2 * np.sqrt(chroma_product) * np.sin(np.radians(delta_h) / 2)
+
+    mean_l = (L1 + L2) / 2
+    mean_cp = (c1p + c2p) / 2
+    hue_sum = h1p + h2p
+    mean_h = np.where(np.abs(h1p - h2p) <= 180, hue_sum / 2,
+                      np.where(hue_sum < 360, (hue_sum + 360) / 2, (hue_sum - 360) / 2))
+    mean_h = np.where(chroma_product == 0, hue_sum, mean_h)
+
+    t = (1 - 0.17 * np.cos(np.radians(mean_h - 30)) + 0.24 * np.cos(np.radians(2 * mean_h))
+         + 0.32 * np.cos(np.radians(3 * mean_h + 6)) - 0.20 * np.cos(np.radians(4 * mean_h - 63)))
+    delta_theta = 30 * np.exp(-(((mean_h - 275) / 25) ** 2))
+    r_c = 2 * np.sqrt(mean_cp ** 7 / (mean_cp ** 7 + 25.0 ** 7))
+    s_l = 1 + 0.015 * (mean_l - 50) ** 2 / np.sqrt(20 + (mean_l - 50) ** 2)
+    s_c = 1 + 0.045 * mean_cp
+    s_h = 1 + 0.015 * mean_cp * t
+    r_t = -np.sin(np.radians(2 * delta_theta)) * r_c
+
+    return np.sqrt((delta_l / s_l) ** 2 + (delta_c / s_c) ** 2 + (delta_big_h / s_h) ** 2
+                   + r_t * (delta_c / s_c) * (delta_big_h / s_h))
+
+def _chroma_and_hue(labs):
+    chroma = np.hypot(labs[..., 1], labs[..., 2])
+    hue = np.degrees(np.arctan2(labs[..., 2], labs[..., 1])) % 360
+    return chroma, hue
+
+def _is_neutral(chroma, hue):
+    return (chroma < NEUTRAL_CHROMA) | ((chroma < EARTH_TONE_CHROMA) & (hue >= EARTH_TONE_HUES[0]) & (hue <= EARTH_TONE_HUES[1]))
+
+def _pad_labs(lab_lists):
+    # Stack per-item color lists into an N x K x 3 array, NaN-padded, plus the count of colors per item
+    width = max((len(labs) for labs in lab_lists), default=0) or 1
+    stacked = np.full((len(lab_lists), width, 3), np.nan)
+    for index, labs in enumerate(lab_lists):
+        if labs:
+            stacked[index, :len(labs)] = labs
+    return stacked, np.array([len(labs) for labs in lab_lists])
+
+def perceptual_match_scores(labs, candidate_labs):
+    """
+    Score one item's colors against many candidates' colors at once
+
+    Args:
+        labs (list): Lab colors of the base item, dominant first
+        candidate_labs (list): One list of Lab colors per candidate, dominant first
+
+    Returns:
+        numpy.ndarray: One score per candidate (MISSING_COLOR_SCORE where either side has no colors)
+    """
+    scores = np.full(len(candidate_labs), MISSING_COLOR_SCORE)
+    if not labs or not candidate_labs:
+        return scores
+
+    base = np.asarray(labs, dtype=float)                   # K1 x 3
+    others, counts = _pad_labs(candidate_labs)             # N x K2 x 3
+    valid = ~np.isnan(others[..., 0])                      # N x K2
+
+    base_chroma, base_hue = _chroma_and_hue(base)
+    other_chroma, other_hue = _chroma_and_hue(others)
+    base_neutral = _is_neutral(base_chroma, base_hue)      # K1
+    other_neutral = _is_neutral(other_chroma, other_hue)   # N x K2
+
+    # Every base color against every candidate color: N x K1 x K2
+    pair_valid = valid[:, None, :]
+    same = (ciede2000(base[None, :, None, :], others[:, None, :, :]) < SAME_COLOR_DELTA_E) & pair_valid
+
+    hue_gap = np.abs(base_hue[None, :, None] - other_hue[:, None, :]) % 360
+    hue_gap = np.minimum(hue_gap, 360 - hue_gap)
+    harmonious = ((hue_gap <= ANALOGOUS_HUE) | (np.abs(hue_gap - 180) <= COMPLEMENTARY_HUE)
+                  | (np.abs(hue_gap - 120) <= TRIADIC_HUE)
+                  | base_neutral[None, :, None] | other_neutral[:, None, :]) & pair_valid
+
+    dominant_neutral = base_neutral[0] | other_neutral[:, 0]
+    tiers = np.where(same.any(axis=(1, 2)), SAME_COLOR_SCORE,
+                     np.where(dominant_neutral, NEUTRAL_SCORE,
+                              np.where(harmonious.any(axis=(1, 2)), HARMONY_SCORE, NO_MATCH_SCORE)))
+    return np.where(counts > 0, tiers, scores)
+
+@functools.lru_cache(maxsize=4096)
+def _cached_match_score(labs1, labs2):
+    return float(perceptual_match_scores(list(labs1), [list(labs2)])[0])
+
+def perceptual_match_score(labs1, labs2):
+    """
+    Score a single pair of items' colors (memoized, since wardrobes repeat the same colors)
+
+    Args:
+        labs1, labs2 (list): Lab colors of each item, dominant first
+
+    Returns:
+        float: Score between 0 and 1
+    """
+    if not labs1 or not labs2:
+        return MISSING_COLOR_SCORE
+    return _cached_match_score(tuple(map(tuple, labs1)), tuple(map(tuple, labs2)))
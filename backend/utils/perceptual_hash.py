@@ -0,0 +1,145 @@
+# utils/perceptual_hash.py
+import io
+import os
+from itertools import combinations
+from PIL import Image
+
+# Uploads whose difference hashes differ in at most this many of their 64 bits, and whose centers have about
+# the same color, are treated as the same photo (re-compressions, resizes, slight crops)
+NEAR_DUPLICATE_DISTANCE = int(os.environ.get("NEAR_DUPLICATE_DISTANCE", 10))
+# Mean per-channel difference (0-255) allowed between the center colors of near-duplicates. The grayscale
+# hash can't tell a navy garment from a pink one shot on the same backdrop; this can.
+NEAR_DUPLICATE_COLOR_DISTANCE = float(os.environ.get("NEAR_DUPLICATE_COLOR_DISTANCE", 10))
+
+HASH_SIZE = 8
+# Multi-index hashing: the 64-bit hash is stored as 4 indexed 16-bit bands. Two hashes within d bits of each
+# other have at least one band within d // 4 bits (pigeonhole), so a lookup only needs the items with a band
+# equal to one of the few values that close to the new hash's bands, then checks their full distance.
+HASH_BANDS = 4
+BAND_BITS = HASH_SIZE * HASH_SIZE // HASH_BANDS
+# Largest distance supported (a band radius above 2 would mean thousands of lookup keys)
+MAX_NEAR_DUPLICATE_DISTANCE = HASH_BANDS * 3 - 1
+
+# Fields fetched for near-duplicate candidates: the fingerprint, plus the analysis a duplicate upload reuses
+NEAR_DUPLICATE_PROJECTION = {field: 1 for field in ("item_id", "dhash", "color_signature", "category", "subcategory", "colors",
+                                                    "occasions", "weather_conditions", "temperature_range",
+                                                    "category_source")}
+
+def compute_image_fingerprint(image_bytes):
+    """
+    Compute the perceptual fingerprint of an image: its 64-bit difference hash (dHash), made by shrinking it
+    to a 9x8 grayscale thumbnail and recording whether each pixel is brighter than its right-hand neighbour,
+    and the mean colors of the 2x2 quadrants of its central area
+
+    Args:
+        image_bytes (bytes): Image content
+
+    Returns:
+        tuple: (dhash, color_signature) where color_signature is a list of 12 RGB values, or (None, None)
+               if the image can't be decoded
+    """
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as image:
+            # JPEG decoders can downscale while decoding, which skips most of the work for large photos
+            image.draft("RGB", (HASH_SIZE * 8, HASH_SIZE * 8))
+            image = image.convert("RGB")
+            pixels = list(image.convert("L").resize((HASH_SIZE + 1, HASH_SIZE), Image.Resampling.LANCZOS).getdata())
+            width, height = image.size
+            center = image.crop((width // 4, height // 4, width * 3 // 4, height * 3 // 4))
+            color_signature = list(center.resize((2, 2), Image.Resampling.BOX).tobytes())
+    except Exception as e:
+        print(f"Error computing perceptual hash: {e}")
+        return None, None
+
+    dhash = 0
+    for row in range(HASH_SIZE):
+        for col in range(HASH_SIZE):
+            left = pixels[row * (HASH_SIZE + 1) + col]
+            right = pixels[row * (HASH_SIZE + 1) + col + 1]
+            dhash = (dhash << 1) | (1 if left > right else 0)
+    return dhash, color_signature
+
+def dhash_to_hex(dhash):
+    """
+    Format a hash as the 16-digit hex string stored on wardrobe items (MongoDB integers are signed 64-bit)
+    """
+    return f"{dhash:016x}"
+
+def _split_bands(dhash):
+    mask = (1 << BAND_BITS) - 1
+    return [(dhash >> (band * BAND_BITS)) & mask for band in range(HASH_BANDS)]
+
+def get_hash_bands(dhash):
+    """
+    Get the indexed band keys of a hash: each band's value tagged with its position (band << 16 | value)
+
+    Returns:
+        list: HASH_BANDS integers
+    """
+    return [(band << BAND_BITS) | value for band, value in enumerate(_split_bands(dhash))]
+
+def get_band_lookup_keys(dhash, max_distance):
+    """
+    Get every band key within max_distance // HASH_BANDS bits of one of the hash's bands
+
+    Returns:
+        list: Band keys to look up
+    """
+    radius = max_distance // HASH_BANDS
+    keys = []
+    for band, value in enumerate(_split_bands(dhash)):
+        for flips in range(radius + 1):
+            for bits in combinations(range(BAND_BITS), flips):
+                flipped = value
+                for bit in bits:
+                    flipped ^= 1 << bit
+                keys.append((band << BAND_BITS) | flipped)
+    return keys
+
+def hamming_distance(hash1, hash2):
+    """
+    Count the bits that differ between two hashes
+    """
+    return bin(hash1 ^ hash2).count("1")
+
+def color_signature_distance(signature1, signature2):
+    """
+    Mean absolute difference between two color signatures (0-255)
+    """
+    return sum(abs(a - b) for a, b in zip(signature1, signature2)) / len(signature1)
+
+def find_near_duplicate(uploads_collection, user_id, dhash, color_signature, max_distance=NEAR_DUPLICATE_DISTANCE):
+    """
+    Find the user's item whose image is closest to a fingerprint, if it is a near-duplicate
+
+    Only items with a band close to one of the hash's bands are fetched (an index lookup on user_id and
+    dhash_bands), then checked on their exact Hamming distance and center colors.
+
+    Args:
+        uploads_collection: MongoDB collection of wardrobe items
+        user_id: The user's _id
+        dhash (int): Hash of the new upload
+        color_signature (list): Center colors of the new upload
+        max_distance (int): Largest Hamming distance that counts as a near-duplicate
+
+    Returns:
+        tuple: (item, distance), or (None, None) if no item is close enough or the lookup failed
+    """
+    max_distance = min(max_distance, MAX_NEAR_DUPLICATE_DISTANCE)
+    try:
+        candidates = uploads_collection.find(
+            {"user_id": user_id, "dhash_bands": {"$in": get_band_lookup_keys(dhash, max_distance)}},
+            NEAR_DUPLICATE_PROJECTION
+        )
+        best_item, best_distance = None, None
+        for item in candidates:
+            distance = hamming_distance(dhash, int(item["dhash"], 16))
+            if distance > max_distance or (best_distance is not None and distance >= best_distance):
+                continue
+            if color_signature_distance(color_signature, item.get("color_signature") or color_signature) > NEAR_DUPLICATE_COLOR_DISTANCE:
+                continue
+            best_item, best_distance = item, distance
+        return best_item, best_distance
+    except Exception as e:
+        print(f"Error looking up near-duplicate uploads: {e}")
+        return None, None
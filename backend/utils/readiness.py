@@ -0,0 +1,63 @@
+# utils/readiness.py
+import time
+import threading
+
+class Warmup:
+    """
+    Runs named warm-up tasks once on a background thread and tracks their state for /readyz.
+    Each task is a callable; it is "ok" when it returns without raising (or the status string it returns).
+    Tasks that fail are retried with a growing delay until they succeed.
+    """
+    def __init__(self, tasks, retry_delay=2.0, max_retry_delay=30.0):
+        self.tasks = dict(tasks)
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.status = {name: "pending" for name in self.tasks}
+        self.started_at = None
+        self.ready_at = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        """
+        Start the warm-up thread (no-op if it is already running or done)
+        """
+        with self._lock:
+            if self._thread is not None:
+                return
+            self.started_at = time.time()
+            self._thread = threading.Thread(target=self._run, name="warmup", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        delay = self.retry_delay
+        pending = list(self.tasks)
+        while pending:
+            for name in list(pending):
+                try:
+                    result = self.tasks[name]()
+                    self.status[name] = result if isinstance(result, str) else "ok"
+                    pending.remove(name)
+                except Exception as e:
+                    self.status[name] = f"error: {e}"
+                    print(f"Warm-up task '{name}' failed: {e}")
+            if pending:
+                time.sleep(delay)
+                delay = min(delay * 2, self.max_retry_delay)
+        self.ready_at = time.time()
+
+    @property
+    def ready(self):
+        return self.ready_at is not None
+
+    def report(self):
+        """
+        Get the readiness report returned by /readyz
+
+        Returns:
+            dict: ready flag, per-task status and warm-up duration once ready
+        """
+        report = {"ready": self.ready, "checks": dict(self.status)}
+        if self.ready:
+            report["warmup_seconds"] = round(self.ready_at - self.started_at, 3)
+        return report
@@ -0,0 +1,88 @@
+# utils/recent_suggestions.py
+import os
+import random
+from datetime import datetime
+from pymongo import ASCENDING
+
+# How many recently suggested item IDs to remember per user (about the last 8 outfits)
+RECENT_SUGGESTIONS_SIZE = int(os.environ.get("RECENT_SUGGESTIONS_SIZE", 24))
+# Forget a user's suggestions after this many seconds without a new one
+RECENT_SUGGESTIONS_TTL = int(os.environ.get("RECENT_SUGGESTIONS_TTL", 6 * 60 * 60))
+# Score multiplier for items that were suggested recently (1.0 turns the down-weighting off)
+RECENT_ITEM_PENALTY = float(os.environ.get("RECENT_ITEM_PENALTY", 0.35))
+
+def ensure_recent_suggestion_indexes(recent_collection):
+    """
+    Create the per-user lookup index and the TTL index that expires idle suggestion memories
+    """
+    try:
+        recent_collection.create_index([("user_id", ASCENDING)], unique=True)
+        recent_collection.create_index([("updated_at", ASCENDING)], expireAfterSeconds=RECENT_SUGGESTIONS_TTL)
+    except Exception as e:
+        print(f"Error creating recent suggestion indexes: {e}")
+
+def get_recent_item_ids(recent_collection, user_id):
+    """
+    Get the IDs of the items recently suggested to a user
+
+    Returns:
+        set: Item IDs (empty if there are none or the lookup failed)
+    """
+    try:
+        doc = recent_collection.find_one({"user_id": user_id}, {"item_ids": 1})
+    except Exception as e:
+        print(f"Error reading recent suggestions: {e}")
+        return set()
+    return set(doc.get("item_ids", [])) if doc else set()
+
+def record_recent_suggestion(recent_collection, user_id, items):
+    """
+    Append the items of a suggested outfit to the user's ring buffer of recent suggestions.
+    The buffer is capped with $slice in the same update, so it never grows past RECENT_SUGGESTIONS_SIZE.
+
+    Args:
+        recent_collection: MongoDB collection of recent suggestions
+        user_id: The user's _id
+        items (list): Suggested items (None entries, e.g. the bottom of a complete top, are skipped)
+    """
+    item_ids = [item["item_id"] for item in items if item]
+    if not item_ids:
+        return
+    try:
+        recent_collection.update_one(
+            {"user_id": user_id},
+            {
+                "$push": {"item_ids": {"$each": item_ids, "$slice": -RECENT_SUGGESTIONS_SIZE}},
+                "$set": {"updated_at": datetime.utcnow()}
+            },
+            upsert=True
+        )
+    except Exception as e:
+        print(f"Error recording recent suggestion: {e}")
+
+def recency_weight(item, recent_item_ids):
+    """
+    Get the score multiplier for an item: RECENT_ITEM_PENALTY if it was suggested recently, else 1
+    """
+    if recent_item_ids and item["item_id"] in recent_item_ids:
+        return RECENT_ITEM_PENALTY
+    return 1.0
+
+def penalize_recent(scored_items, recent_item_ids):
+    """
+    Down-weight recently suggested items in a list of (item, score) pairs, in place,
+    before the list is sorted and the top candidates are sampled
+    """
+    if not recent_item_ids:
+        return
+    for index, (item, score) in enumerate(scored_items):
+        if item["item_id"] in recent_item_ids:
+            scored_items[index] = (item, score * RECENT_ITEM_PENALTY)
+
+def choose_fresh_item(items, recent_item_ids):
+    """
+    Pick a random item, making recently suggested ones less likely
+    """
+    if not recent_item_ids:
+        return random.choice(items)
+    return random.choices(items, weights=[recency_weight(item, recent_item_ids) for item in items], k=1)[0]
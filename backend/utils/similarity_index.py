@@ -0,0 +1,200 @@
+# utils/similarity_index.py
+"""
+Per-user visual similarity index over wardrobe item embeddings (see utils/image_embedding.py).
+
+Each user's embeddings are written once to a float16 .npy file and opened as a memory map, so every server
+worker shares the same pages instead of keeping its own copy. Wardrobes with at least ANN_MIN_ITEMS items
+get an inverted-file (IVF) index: the embeddings are clustered with k-means, stored grouped by cluster, and
+a search only scans the SIMILARITY_NPROBE clusters closest to the query. Smaller wardrobes are searched
+exhaustively. An index is named after a digest of the item IDs it covers, so it is rebuilt only when items
+with embeddings are added or removed (availability changes don't touch it).
+"""
+import os
+import hashlib
+import tempfile
+import threading
+import numpy as np
+from cachetools import TTLCache
+from utils.image_embedding import embedding_from_bytes, EMBEDDING_DIM
+
+EMBEDDING_INDEX_DIR = os.environ.get("EMBEDDING_INDEX_DIR", os.path.join(tempfile.gettempdir(), "aesclo-embeddings"))
+# Wardrobes smaller than this are searched exhaustively
+ANN_MIN_ITEMS = int(os.environ.get("ANN_MIN_ITEMS", 512))
+# Clusters scanned per search in an IVF index
+SIMILARITY_NPROBE = int(os.environ.get("SIMILARITY_NPROBE", 4))
+KMEANS_ITERATIONS = 10
+
+_index_cache = TTLCache(maxsize=int(os.environ.get("SIMILARITY_INDEX_CACHE_SIZE", 128)), ttl=60 * 60)
+_index_cache_lock = threading.Lock()
+
+class SimilarityIndex:
+    """
+    A loaded index: memory-mapped embeddings grouped by cluster, with the item ID and category of every row
+    """
+    def __init__(self, embeddings, item_ids, categories, centroids, offsets):
+        self.embeddings = embeddings
+        self.item_ids = item_ids
+        self.categories = categories
+        self.centroids = centroids
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.item_ids)
+
+    def search(self, embedding, limit, categories=None, exclude_ids=()):
+        """
+        Find the rows most similar to an embedding
+
+        Args:
+            embedding (numpy.ndarray): Query embedding
+            limit (int): Maximum number of results
+            categories (set): Only return items of these categories (all if None)
+            exclude_ids (iterable): Item IDs to leave out (e.g. the query item itself)
+
+        Returns:
+            list: (item_id, similarity) tuples, most similar first
+        """
+        if self.centroids is None:
+            rows = np.arange(len(self.item_ids))
+        else:
+            nearest_clusters = np.argsort(-(self.centroids @ embedding))[:SIMILARITY_NPROBE]
+            rows = np.concatenate([np.arange(self.offsets[cluster], self.offsets[cluster + 1]) for cluster in nearest_clusters])
+
+        if categories is not None:
+            rows = rows[np.isin(self.categories[rows], list(categories))]
+        excluded = set(exclude_ids)
+        if excluded:
+            rows = rows[~np.isin(self.item_ids[rows], list(excluded))]
+        if not len(rows):
+            return []
+
+        similarities = np.asarray(self.embeddings[rows], dtype=np.float32) @ embedding
+        order = np.argsort(-similarities)[:limit]
+        return [(str(self.item_ids[rows[index]]), round(float(similarities[index]), 4)) for index in order]
+
+def _kmeans(vectors, clusters):
+    # Spherical k-means (cosine similarity) seeded with a fixed sample, so rebuilding gives the same index
+    rng = np.random.default_rng(0)
+    centroids = vectors[rng.choice(len(vectors), clusters, replace=False)].copy()
+    for _ in range(KMEANS_ITERATIONS):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        for cluster in range(clusters):
+            members = vectors[assignment == cluster]
+            if len(members):
+                center = members.sum(axis=0)
+                centroids[cluster] = center / (np.linalg.norm(center) or 1.0)
+    return centroids, np.argmax(vectors @ centroids.T, axis=1)
+
+def _write_index(path, embeddings, item_ids, categories):
+    # Group rows by cluster for IVF, then write the embeddings and metadata and move them into place
+    centroids, offsets = None, None
+    if len(item_ids) >= ANN_MIN_ITEMS:
+        clusters = int(np.sqrt(len(item_ids)))
+        centroids, assignment = _kmeans(embeddings, clusters)
+        order = np.argsort(assignment, kind="stable")
+        embeddings, item_ids, categories = embeddings[order], item_ids[order], categories[order]
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assignment, minlength=clusters))])
+
+    temporary = f"{path}.{os.getpid()}.{threading.get_ident()}"
+    np.save(f"{temporary}.npy", embeddings.astype(np.float16))
+    np.savez(f"{temporary}.meta.npz", item_ids=item_ids, categories=categories,
+             centroids=centroids if centroids is not None else np.zeros((0, EMBEDDING_DIM), dtype=np.float32),
+             offsets=offsets if offsets is not None else np.zeros(0, dtype=np.int64))
+    # Metadata last: an index only counts as written once its metadata exists
+    os.replace(f"{temporary}.npy", f"{path}.npy")
+    os.replace(f"{temporary}.meta.npz", f"{path}.meta.npz")
+
+def _load_index(path):
+    with np.load(f"{path}.meta.npz") as meta:
+        centroids = meta["centroids"]
+        return SimilarityIndex(np.load(f"{path}.npy", mmap_mode="r"), meta["item_ids"], meta["categories"],
+                               centroids if len(centroids) else None, meta["offsets"] if len(centroids) else None)
+
+# Suffixes of a completed index; temporary files carry a pid and thread id before these
+INDEX_FILE_SUFFIXES = ("npy", "meta.npz")
+
+def _remove_stale_indexes(user_directory, current):
+    # Only completed indexes are removed: another worker may still be writing its temporary files
+    for name in os.listdir(user_directory):
+        digest, _, suffix = name.partition(".")
+        if digest != current and suffix in INDEX_FILE_SUFFIXES:
+            try:
+                os.remove(os.path.join(user_directory, name))
+            except OSError:
+                pass
+
+def get_similarity_index(uploads_collection, user_id):
+    """
+    Get the user's similarity index, building it if their embedded items changed since it was written
+
+    Args:
+        uploads_collection: MongoDB collection of wardrobe items
+        user_id: The user's _id
+
+    Returns:
+        SimilarityIndex: The index, or None if the user has no items with embeddings
+    """
+    item_ids = sorted(item["item_id"] for item in uploads_collection.find(
+        {"user_id": user_id, "embedding": {"$exists": True}}, {"item_id": 1}))
+    if not item_ids:
+        return None
+    digest = hashlib.sha1("\n".join(item_ids).encode()).hexdigest()[:16]
+
+    cache_key = (user_id, digest)
+    with _index_cache_lock:
+        index = _index_cache.get(cache_key)
+    if index is not None:
+        return index
+
+    user_directory = os.path.join(EMBEDDING_INDEX_DIR, str(user_id))
+    path = os.path.join(user_directory, digest)
+    if not os.path.exists(f"{path}.meta.npz"):
+        embeddings, ids, categories = [], [], []
+        for item in uploads_collection.find({"user_id": user_id, "embedding": {"$exists": True}},
+                                            {"item_id": 1, "category": 1, "embedding": 1}):
+            embedding = embedding_from_bytes(item.get("embedding"))
+            if embedding is not None:
+                embeddings.append(embedding)
+                ids.append(item["item_id"])
+                categories.append(item.get("category") or "")
+        if not ids:
+            return None
+        os.makedirs(user_directory, exist_ok=True)
+        _write_index(path, np.array(embeddings, dtype=np.float32), np.array(ids), np.array(categories))
+        _remove_stale_indexes(user_directory, digest)
+
+    index = _load_index(path)
+    with _index_cache_lock:
+        _index_cache[cache_key] = index
+    return index
+
+def find_similar_items(uploads_collection, user_id, item, limit, same_category=True, available_only=True):
+    """
+    Find the user's items that look most like a given item
+
+    Args:
+        uploads_collection: MongoDB collection of wardrobe items
+        user_id: The user's _id
+        item (dict): The item to compare against (needs its stored embedding)
+        limit (int): Maximum number of results
+        same_category (bool): Only return items of the item's category
+        available_only (bool): Leave out items marked unavailable
+
+    Returns:
+        list: (item document, similarity) tuples, most similar first, or None if the item has no embedding
+    """
+    embedding = embedding_from_bytes(item.get("embedding"))
+    if embedding is None:
+        return None
+    index = get_similarity_index(uploads_collection, user_id)
+    if index is None:
+        return []
+
+    categories = {item.get("category")} if same_category else None
+    # Ask for extra candidates since unavailable ones are only dropped after the lookup
+    matches = index.search(embedding, limit * 3 + 5 if available_only else limit, categories, exclude_ids=[item["item_id"]])
+    query = {"user_id": user_id, "item_id": {"$in": [item_id for item_id, _ in matches]}}
+    if available_only:
+        query["unavailable"] = {"$ne": True}
+    documents = {document["item_id"]: document for document in uploads_collection.find(query, {"embedding": 0})}
+    return [(documents[item_id], similarity) for item_id, similarity in matches if item_id in documents][:limit]
@@ -0,0 +1,199 @@
+# utils/storage_utils.py
+import os
+import shutil
+import tempfile
+import threading
+from datetime import timedelta
+from cachetools import TTLCache
+
+class LocalStorageBackend:
+    """
+    Stores uploaded images on the local filesystem (static/uploads by default).
+    Files are served by the app itself, so get_url returns None.
+    """
+    serves_locally = True
+
+    def __init__(self, upload_folder):
+        self.upload_folder = upload_folder
+        os.makedirs(self.upload_folder, exist_ok=True)
+
+    def local_path(self, key):
+        """
+        Get the filesystem path for a storage key, or None if the key escapes the upload folder
+        """
+        path = os.path.abspath(os.path.join(self.upload_folder, key))
+        if os.path.dirname(path) != os.path.abspath(self.upload_folder):
+            return None
+        return path
+
+    def save(self, key, stream, content_type=None):
+        """
+        Stream a file-like object into storage under the given key.
+        Writes to a temporary file in the same folder and renames it, so readers never see partial files.
+        """
+        final_path = self.local_path(key)
+        fd, temp_path = tempfile.mkstemp(dir=self.upload_folder, prefix=".partial-")
+        try:
+            with os.fdopen(fd, "wb") as out_file:
+                shutil.copyfileobj(stream, out_file, 1024 * 1024)
+            os.replace(temp_path, final_path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def exists(self, key):
+        path = self.local_path(key)
+        return path is not None and os.path.isfile(path)
+
+    def get_url(self, key):
+        return None
+
+    def delete(self, key):
+        self.delete_many([key])
+
+    def delete_many(self, keys):
+        """
+        Delete several keys, ignoring keys that don't exist
+
+        Returns:
+            int: Number of files deleted
+        """
+        deleted = 0
+        for key in keys:
+            path = self.local_path(key)
+            if path and os.path.exists(path):
+                try:
+                    os.remove(path)
+                    deleted += 1
+                except Exception as e:
+                    print(f"Error deleting {key} from local storage: {e}")
+        return deleted
+
+class GCSStorageBackend:
+    """
+    Stores uploaded images in a Google Cloud Storage bucket so every replica sees the same files.
+    Images are served by redirecting to a short-lived signed URL.
+    The storage client is created on first use, so the GCS SDK stays out of the app's cold start.
+    Existence checks are cached, since every image request needs one and objects are never rewritten.
+
+    For local testing, point the google-cloud-storage client at an emulator such as
+    fake-gcs-server by setting STORAGE_EMULATOR_HOST (e.g. http://localhost:4443).
+    """
+    serves_locally = False
+
+    # Maximum number of calls the GCS JSON API accepts in one batch request
+    MAX_BATCH_SIZE = 100
+
+    def __init__(self, client_factory, bucket_name, signed_url_ttl=3600):
+        self.client_factory = client_factory
+        self.bucket_name = bucket_name
+        self.signed_url_ttl = signed_url_ttl
+        self._bucket = None
+        # Keys are unique and never rewritten, so found objects are cached for long; missing ones briefly,
+        # in case another replica is still writing them
+        self._found_keys = TTLCache(maxsize=int(os.environ.get("GCS_EXISTS_CACHE_SIZE", 65536)), ttl=60 * 60)
+        self._missing_keys = TTLCache(maxsize=int(os.environ.get("GCS_EXISTS_CACHE_SIZE", 65536)), ttl=60)
+        self._exists_cache_lock = threading.Lock()
+
+    @property
+    def client(self):
+        client = self.client_factory()
+        if client is None:
+            raise RuntimeError("Google Cloud Storage client is not available")
+        return client
+
+    @property
+    def bucket(self):
+        if self._bucket is None:
+            self._bucket = self.client.bucket(self.bucket_name)
+        return self._bucket
+
+    def local_path(self, key):
+        return None
+
+    def save(self, key, stream, content_type=None):
+        """
+        Stream a file-like object to the bucket (resumable upload for large files)
+        """
+        blob = self.bucket.blob(key)
+        blob.cache_control = "public, max-age=31536000, immutable"
+        blob.upload_from_file(stream, content_type=content_type, rewind=False)
+        self._remember_exists(key, True)
+
+    def exists(self, key):
+        with self._exists_cache_lock:
+            if key in self._found_keys:
+                return True
+            if key in self._missing_keys:
+                return False
+        found = self.bucket.blob(key).exists()
+        self._remember_exists(key, found)
+        return found
+
+    def _remember_exists(self, key, found):
+        with self._exists_cache_lock:
+            self._found_keys.pop(key, None)
+            self._missing_keys.pop(key, None)
+            (self._found_keys if found else self._missing_keys)[key] = True
+
+    def get_url(self, key):
+        """
+        Get a URL the browser can fetch the image from.
+        Uses a V4 signed URL when the credentials can sign, otherwise the public object URL.
+        """
+        blob = self.bucket.blob(key)
+        try:
+            return blob.generate_signed_url(
+                version="v4",
+                expiration=timedelta(seconds=self.signed_url_ttl),
+                method="GET"
+            )
+        except Exception as e:
+            print(f"Error signing URL for {key}, falling back to public URL: {e}")
+            return blob.public_url
+
+    def delete(self, key):
+        self.delete_many([key])
+
+    def delete_many(self, keys):
+        """
+        Delete several keys using batched requests, ignoring keys that don't exist
+
+        Returns:
+            int: Number of keys submitted for deletion
+        """
+        keys = list(keys)
+        for key in keys:
+            self._remember_exists(key, False)
+        for start in range(0, len(keys), self.MAX_BATCH_SIZE):
+            chunk = keys[start:start + self.MAX_BATCH_SIZE]
+            try:
+                with self.client.batch(raise_exception=False):
+                    for key in chunk:
+                        self.bucket.blob(key).delete()
+            except Exception as e:
+                print(f"Error deleting batch from GCS: {e}")
+        return len(keys)
+
+def create_storage_backend(backend_name, upload_folder, storage_client_factory=None, bucket_name=None):
+    """
+    Create the storage backend selected by configuration
+
+    Args:
+        backend_name (str): "local" or "gcs"
+        upload_folder (str): Folder used by the local backend
+        storage_client_factory (callable): Returns the google.cloud.storage.Client used by the GCS backend
+        bucket_name (str): Bucket used by the GCS backend
+
+    Returns:
+        LocalStorageBackend or GCSStorageBackend
+    """
+    if backend_name == "gcs":
+        if storage_client_factory is None:
+            print("WARNING: STORAGE_BACKEND is 'gcs' but no storage client is available. Falling back to local storage.")
+        else:
+            signed_url_ttl = int(os.environ.get("GCS_SIGNED_URL_TTL", 3600))
+            return GCSStorageBackend(storage_client_factory, bucket_name, signed_url_ttl=signed_url_ttl)
+
+    return LocalStorageBackend(upload_folder)
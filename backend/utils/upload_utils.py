@@ -0,0 +1,187 @@
+# utils/upload_utils.py
+import os
+import copy
+import hashlib
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from cachetools import TTLCache
+from utils.color_utils import get_color_name
+from utils.vision_utils import extract_colors, get_top_colors
+from utils.garment_mask import extract_garment_colors
+from utils.gemini_utils import analyze_clothing_occasion, categorize_clothing_item
+from utils.gemini_weather_utils import analyze_clothing_weather_suitability
+from utils.metrics import record_cache_lookup, stage_timer
+
+# Analysis results keyed by image content hash, shared by the single and batch upload paths.
+# Re-uploading the same bytes (common during bulk imports) skips every external API call.
+_analysis_cache = TTLCache(maxsize=int(os.environ.get("ANALYSIS_CACHE_SIZE", 1024)), ttl=24 * 60 * 60)
+_analysis_cache_lock = threading.Lock()
+
+# Bounded pool for upload enrichment so a large batch can't open unbounded API connections
+_enrichment_executor = None
+_enrichment_executor_lock = threading.Lock()
+
+def get_enrichment_executor():
+    """
+    Get the process-wide thread pool used to analyze uploaded images.
+    Its size is set by UPLOAD_ENRICHMENT_WORKERS (default 4).
+    """
+    global _enrichment_executor
+    if _enrichment_executor is None:
+        with _enrichment_executor_lock:
+            if _enrichment_executor is None:
+                max_workers = int(os.environ.get("UPLOAD_ENRICHMENT_WORKERS", 4))
+                _enrichment_executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="upload-enrichment")
+    return _enrichment_executor
+
+def shutdown_enrichment_executor(wait=True):
+    """
+    Stop the enrichment pool, by default after the queued analyses finish (called when a worker exits)
+    """
+    global _enrichment_executor
+    with _enrichment_executor_lock:
+        executor, _enrichment_executor = _enrichment_executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait)
+
+# Upload requests allowed to run at once per process. Keeping this below the server's thread
+# count leaves threads free for the fast wardrobe and generation routes while uploads are slow.
+_upload_slots = threading.BoundedSemaphore(int(os.environ.get("UPLOAD_CONCURRENCY", 4)))
+UPLOAD_SLOT_TIMEOUT = float(os.environ.get("UPLOAD_SLOT_TIMEOUT", 30))
+
+def with_upload_slot(busy_response):
+    """
+    Decorator that makes an upload view wait for a free upload slot.
+    If none frees up within UPLOAD_SLOT_TIMEOUT seconds, busy_response() is returned instead.
+
+    Args:
+        busy_response (callable): Builds the response sent when the server is busy
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if not _upload_slots.acquire(timeout=UPLOAD_SLOT_TIMEOUT):
+                return busy_response()
+            try:
+                return view(*args, **kwargs)
+            finally:
+                _upload_slots.release()
+        return wrapper
+    return decorator
+
+def compute_image_hash(image_bytes):
+    """
+    Compute the SHA-256 content hash of an image
+    """
+    return hashlib.sha256(image_bytes).hexdigest()
+
+# Analysis fields shared by every item analyzed from the same photo
+ANALYSIS_FIELDS = ("category", "subcategory", "colors", "occasions", "weather_conditions", "temperature_range",
+                   "category_source")
+# Fields with a single value rather than a list
+SCALAR_ANALYSIS_FIELDS = ("category", "subcategory", "category_source")
+
+def analysis_from_item(item):
+    """
+    Copy the analysis of an existing wardrobe item, for an upload of the same garment. The category
+    source is kept too, so a locally classified category never becomes a classifier reference by reuse.
+
+    Returns:
+        dict: Analysis fields in the shape analyze_clothing_image returns
+    """
+    return copy.deepcopy({field: item.get(field, None if field in SCALAR_ANALYSIS_FIELDS else [])
+                          for field in ANALYSIS_FIELDS})
+
+def analyze_clothing_image(image_bytes, vision_client, classify=None):
+    """
+    Run the full upload analysis for one image: category, dominant colors, occasions and weather suitability.
+    Results are cached by content hash, so identical images are only analyzed once. Only analyses
+    categorized by Gemini are cached: a local category comes from one user's wardrobe and mustn't be
+    reused for another user's upload of the same image.
+
+    Args:
+        image_bytes (bytes): The uploaded image content
+        vision_client: Google Cloud Vision client used for color extraction
+        classify (callable): Called on a cache miss to get (category, subcategory) from the local
+                             classifier, or None to ask Gemini; a known category skips the Gemini call
+
+    Returns:
+        dict: Analysis fields to store on the wardrobe item (category, subcategory, colors,
+              occasions, weather_conditions, temperature_range, category_source), or None if the image
+              doesn't appear to be a clothing item
+    """
+    image_hash = compute_image_hash(image_bytes)
+    with _analysis_cache_lock:
+        cached = _analysis_cache.get(image_hash)
+    record_cache_lookup("analysis", cached is not None)
+    if cached is not None:
+        return copy.deepcopy(cached)
+
+    # Predict clothing category and subcategory
+    category = classify() if classify else None
+    if category:
+        predicted_category, predicted_subcategory = category
+    else:
+        with stage_timer("analysis_categorize"):
+            predicted_category, predicted_subcategory = categorize_clothing_item(image_bytes)
+    if not predicted_category:
+        return None
+
+    # Extract dominant colors, from the masked garment when GARMENT_MASKING is on (Vision otherwise or if masking fails)
+    try:
+        with stage_timer("analysis_colors"):
+            colors = extract_garment_colors(image_bytes) or extract_colors(image_bytes, vision_client)
+        top_colors = get_top_colors(colors, max_colors=3, single_color_threshold=0.6)
+
+        dominant_colors = []
+        for color in top_colors:
+            rgb = color['rgb']
+            color_name = get_color_name(rgb)
+            dominant_colors.append({
+                'name': color_name,
+                'rgb': rgb,
+                'score': color['score'],
+                'pixel_fraction': color['pixel_fraction']
+            })
+    except Exception as e:
+        print(f"Error extracting colors: {e}")
+        dominant_colors = []
+
+    # Analyze clothing occasion
+    try:
+        with stage_timer("analysis_occasions"):
+            occasions = analyze_clothing_occasion(image_bytes)
+        print(f"Detected occasions: {occasions}")
+    except Exception as e:
+        print(f"Error analyzing clothing occasion: {e}")
+        occasions = []
+
+    # Analyze weather suitability
+    try:
+        with stage_timer("analysis_weather"):
+            weather_suitability = analyze_clothing_weather_suitability(image_bytes)
+        weather_conditions = weather_suitability.get("weather_conditions", [])
+        temperature_range = weather_suitability.get("temperature_range", [])
+        print(f"Detected weather suitability: {weather_suitability}")
+    except Exception as e:
+        print(f"Error analyzing clothing weather suitability: {e}")
+        weather_conditions = []
+        temperature_range = []
+
+    analysis = {
+        "category": predicted_category,
+        "subcategory": predicted_subcategory,
+        "colors": dominant_colors,
+        "occasions": occasions,
+        "weather_conditions": weather_conditions,
+        "temperature_range": temperature_range,
+        "category_source": "local" if category else "gemini"
+    }
+
+    # Only cache complete analyses so a transient API failure is retried on the next upload
+    if not category and dominant_colors and occasions and weather_conditions and temperature_range:
+        with _analysis_cache_lock:
+            _analysis_cache[image_hash] = copy.deepcopy(analysis)
+
+    return analysis
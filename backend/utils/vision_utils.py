@@ -1,21 +1,26 @@
 # utils/vision_utils.py
-import io
-from google.cloud import vision
+from utils.image_utils import read_image_bytes
+from utils.metrics import track_external_call
 
-def extract_colors(image_path, vision_client):
+def extract_colors(image_source, vision_client):
     """
     Extract dominant colors from an image using Google Cloud Vision API.
+    Accepts an image path or the image bytes already in memory.
     Returns a list of dominant colors with their RGB values, sorted by score.
     """
-    # Read the image file
-    with io.open(image_path, 'rb') as image_file:
-        content = image_file.read()
+    # Read the image file only if a path was given; an uploaded bytes buffer is passed through as-is
+    content = read_image_bytes(image_source)
+    if not isinstance(content, bytes):
+        # The Vision request's content field only takes bytes
+        content = bytes(content)
     
-    # Create an image object
+    # Create an image object (the Vision SDK is imported on first use to keep it out of cold starts)
+    from google.cloud import vision
     image = vision.Image(content=content)
     
     # Use the imageProperties feature to get color information
-    image_properties = vision_client.image_properties(image=image).image_properties_annotation
+    with track_external_call("vision"):
+        image_properties = vision_client.image_properties(image=image).image_properties_annotation
     
     # Extract colors and sort by score (highest first)
     colors = []
@@ -65,20 +70,25 @@ def get_top_colors(colors, max_colors=3, single_color_threshold=0.7):
     # Otherwise, return the top max_colors colors by score
     return colors[:max_colors]
 
-def predict_clothing_category(image_path, vision_client):
+def predict_clothing_category(image_source, vision_client):
     """
     Predict clothing category using Google Cloud Vision API object detection.
+    Accepts an image path or the image bytes already in memory.
     Returns a category string: "top", "bottom", "shoes", "accessory", or None if no match.
     """
-    # Read the image file
-    with io.open(image_path, 'rb') as image_file:
-        content = image_file.read()
+    # Read the image file only if a path was given; an uploaded bytes buffer is passed through as-is
+    content = read_image_bytes(image_source)
+    if not isinstance(content, bytes):
+        # The Vision request's content field only takes bytes
+        content = bytes(content)
     
-    # Create an image object
+    # Create an image object (the Vision SDK is imported on first use to keep it out of cold starts)
+    from google.cloud import vision
     image = vision.Image(content=content)
     
     # Perform object detection instead of label detection
-    response = vision_client.object_localization(image=image)
+    with track_external_call("vision"):
+        response = vision_client.object_localization(image=image)
     objects = response.localized_object_annotations
     
     # Keywords for categorization
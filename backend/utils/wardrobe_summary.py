@@ -0,0 +1,192 @@
+# utils/wardrobe_summary.py
+from collections import Counter
+from contextlib import contextmanager
+from pymongo import ReturnDocument
+
+# Bump when the summary layout changes so stored summaries are rebuilt on next read
+SUMMARY_SCHEMA_VERSION = 2
+
+# Only the fields the summary counts are read when rebuilding it
+SUMMARY_PROJECTION = {"category": 1, "colors.name": 1, "occasions": 1, "temperature_range": 1}
+
+# Per-user counts of wardrobe changes started and finished (see wardrobe_change)
+CHANGE_COUNT_PROJECTION = {"summary_changes_started": 1, "summary_changes": 1}
+
+def _summary_key(value):
+    """
+    Make a tag usable as a MongoDB field name (no dots, no leading $)
+    """
+    return str(value).replace(".", "_").lstrip("$")
+
+def count_item(item):
+    """
+    List the summary counters one wardrobe item contributes to
+
+    Args:
+        item (dict): Wardrobe item document
+
+    Returns:
+        list: Dotted counter paths, e.g. ["total", "categories.top", "dominant_colors.red", ...]
+    """
+    counters = ["total"]
+    category = item.get("category")
+    if category:
+        counters.append(f"categories.{_summary_key(category)}")
+
+    # The color dropdown offers the dominant (first) color of each top
+    colors = item.get("colors") or []
+    if category == "top" and colors:
+        color_name = (colors[0].get("name") or "").lower()
+        if color_name and color_name != "unknown":
+            counters.append(f"dominant_colors.{_summary_key(color_name)}")
+
+    for occasion in set(item.get("occasions") or []):
+        counters.append(f"occasions.{_summary_key(occasion)}")
+    for temperature in set(item.get("temperature_range") or []):
+        counters.append(f"temperatures.{_summary_key(temperature)}")
+    return counters
+
+class WardrobeChange:
+    """
+    Items inserted or deleted by one wardrobe change, applied to the summary when the change ends
+    """
+    def __init__(self):
+        self.increments = Counter()
+        self.reset = False
+
+    def add(self, items, sign=1):
+        """
+        Record inserted (sign=1) or deleted (sign=-1) wardrobe items
+        """
+        for item in items:
+            for counter in count_item(item):
+                self.increments[counter] += sign
+
+    def clear(self):
+        """
+        Record that the whole wardrobe was deleted
+        """
+        self.reset = True
+
+@contextmanager
+def wardrobe_change(users_collection, summaries_collection, user_id):
+    """
+    Track a change to a user's items so their summary stays consistent with concurrent rebuilds.
+
+    The user document counts changes started and finished. A change is counted as started before the items
+    are written and finished after, and its $inc only applies to a summary at the version just before it;
+    any other summary is left behind the finished count and rebuilt on next read. A rebuild only stores its
+    scan when no change started or finished while it ran (see get_wardrobe_summary).
+
+    Usage:
+        with wardrobe_change(users_collection, summaries_collection, user_id) as change:
+            uploads_collection.insert_one(item)
+            change.add([item])
+    """
+    users_collection.update_one({"_id": user_id}, {"$inc": {"summary_changes_started": 1}})
+    change = WardrobeChange()
+    failed = True
+    try:
+        yield change
+        failed = False
+    finally:
+        # Finish even when the write failed, or rebuilds would wait on it forever
+        user = users_collection.find_one_and_update({"_id": user_id}, {"$inc": {"summary_changes": 1}},
+                                                    projection={"summary_changes": 1},
+                                                    return_document=ReturnDocument.AFTER)
+        if not failed and user:
+            if change.reset:
+                reset_wardrobe_summary(summaries_collection, user_id)
+            else:
+                _apply_increments(summaries_collection, user_id, change.increments, user["summary_changes"])
+
+def _apply_increments(summaries_collection, user_id, increments, version):
+    # Only a summary at the previous version is updated: creating one here would count just these items, and
+    # a summary at any other version is stale anyway, so it is left for the next read to rebuild
+    try:
+        update = {"$set": {"version": version}}
+        if increments:
+            update["$inc"] = dict(increments)
+        summaries_collection.update_one(
+            {"user_id": user_id, "schema_version": SUMMARY_SCHEMA_VERSION, "version": version - 1},
+            update
+        )
+    except Exception as e:
+        print(f"Error updating wardrobe summary: {e}")
+
+def reset_wardrobe_summary(summaries_collection, user_id):
+    """
+    Delete a user's summary (e.g. after clearing the wardrobe); it is rebuilt on next read
+    """
+    try:
+        summaries_collection.delete_many({"user_id": user_id})
+    except Exception as e:
+        print(f"Error resetting wardrobe summary: {e}")
+
+def build_wardrobe_summary(uploads_collection, user_id, version=0):
+    """
+    Build a user's summary from scratch with one projected scan of their wardrobe
+    """
+    summary = {
+        "user_id": user_id,
+        "schema_version": SUMMARY_SCHEMA_VERSION,
+        "version": version,
+        "total": 0,
+        "categories": {},
+        "dominant_colors": {},
+        "occasions": {},
+        "temperatures": {}
+    }
+    for item in uploads_collection.find({"user_id": user_id}, SUMMARY_PROJECTION):
+        for counter in count_item(item):
+            if counter == "total":
+                summary["total"] += 1
+                continue
+            group, key = counter.split(".", 1)
+            summary[group][key] = summary[group].get(key, 0) + 1
+    return summary
+
+def _get_change_counts(users_collection, user_id):
+    user = users_collection.find_one({"_id": user_id}, CHANGE_COUNT_PROJECTION) or {}
+    return user.get("summary_changes_started", 0), user.get("summary_changes", 0)
+
+def get_wardrobe_summary(summaries_collection, uploads_collection, users_collection, user_id):
+    """
+    Get a user's wardrobe summary, rebuilding it if it's missing, outdated or behind the user's changes
+
+    Args:
+        summaries_collection: MongoDB collection holding the summaries
+        uploads_collection: MongoDB collection holding wardrobe items
+        users_collection: MongoDB collection holding users (and their change counts)
+        user_id: Owner's ObjectId
+
+    Returns:
+        dict: Summary with total and per-category, dominant color, occasion and temperature counts
+    """
+    started, finished = _get_change_counts(users_collection, user_id)
+    summary = summaries_collection.find_one({"user_id": user_id})
+    if (summary and summary.get("schema_version") == SUMMARY_SCHEMA_VERSION
+            and summary.get("version") == finished):
+        return summary
+
+    summary = build_wardrobe_summary(uploads_collection, user_id, finished)
+    # Store the scan only if no change was in progress or made while it ran: a change's items may or may not
+    # be in the scan, so its $inc could be lost or counted twice. Otherwise the next read tries again.
+    if started == finished and _get_change_counts(users_collection, user_id) == (started, finished):
+        try:
+            summaries_collection.replace_one({"user_id": user_id}, summary, upsert=True)
+        except Exception as e:
+            print(f"Error storing wardrobe summary: {e}")
+    return summary
+
+def get_category_count(summary, category):
+    """
+    Get the number of items of a category from a summary
+    """
+    return max(summary.get("categories", {}).get(category, 0), 0)
+
+def get_summary_colors(summary):
+    """
+    Get the sorted dominant colors of the user's tops from a summary
+    """
+    return sorted(color for color, count in summary.get("dominant_colors", {}).items() if count > 0)
@@ -0,0 +1,205 @@
+# utils/wardrobe_utils.py
+import os
+import hashlib
+import threading
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ASCENDING, UpdateOne
+from cachetools import TTLCache
+from utils.item_features import get_item_features, FEATURE_VERSION
+
+# Page size limits for the wardrobe API
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Loaded wardrobes keyed by (user, wardrobe version): any change to the wardrobe produces a new key
+_wardrobe_index_cache = TTLCache(maxsize=int(os.environ.get("WARDROBE_INDEX_CACHE_SIZE", 256)), ttl=10 * 60)
+_wardrobe_index_cache_lock = threading.Lock()
+
+# Query string parameter -> item field used for filtering
+WARDROBE_FILTER_FIELDS = {
+    "category": "category",
+    "subcategory": "subcategory",
+    "color": "colors.name",
+    "occasion": "occasions",
+    "temperature": "temperature_range",
+    "weather": "weather_conditions"
+}
+
+def ensure_indexes(users_collection, uploads_collection, outfits_collection, summaries_collection=None):
+    """
+    Create the indexes used by the wardrobe queries (no-op if they already exist).
+    Every wardrobe filter is paired with user_id and ends in _id so cursor pagination stays an index scan.
+    """
+    try:
+        users_collection.create_index([("username", ASCENDING)])
+        users_collection.create_index([("email", ASCENDING)])
+
+        uploads_collection.create_index([("item_id", ASCENDING)])
+        uploads_collection.create_index([("user_id", ASCENDING), ("_id", ASCENDING)])
+        uploads_collection.create_index([("user_id", ASCENDING), ("category", ASCENDING), ("subcategory", ASCENDING), ("_id", ASCENDING)])
+        uploads_collection.create_index([("user_id", ASCENDING), ("colors.name", ASCENDING), ("_id", ASCENDING)])
+        uploads_collection.create_index([("user_id", ASCENDING), ("occasions", ASCENDING), ("_id", ASCENDING)])
+        uploads_collection.create_index([("user_id", ASCENDING), ("temperature_range", ASCENDING), ("_id", ASCENDING)])
+        uploads_collection.create_index([("user_id", ASCENDING), ("weather_conditions", ASCENDING), ("_id", ASCENDING)])
+        # Multikey index over the perceptual hash bands used for near-duplicate lookups
+        uploads_collection.create_index([("user_id", ASCENDING), ("dhash_bands", ASCENDING)])
+
+        outfits_collection.create_index([("user_id", ASCENDING)])
+        outfits_collection.create_index([("outfit_id", ASCENDING)])
+
+        if summaries_collection is not None:
+            summaries_collection.create_index([("user_id", ASCENDING)], unique=True)
+    except Exception as e:
+        print(f"Error creating MongoDB indexes: {e}")
+
+def bump_wardrobe_version(users_collection, user_id):
+    """
+    Increment the user's wardrobe version after any change to their items.
+    The version is part of every wardrobe ETag, so cached pages are invalidated immediately.
+    """
+    users_collection.update_one({"_id": user_id}, {"$inc": {"wardrobe_version": 1}})
+
+def get_wardrobe_etag(user, *parts):
+    """
+    Build a weak ETag for a wardrobe response from the user's wardrobe version and the request parameters
+
+    Args:
+        user (dict): User document
+        *parts: Anything else that changes the response body (e.g. the query string)
+
+    Returns:
+        str: ETag value (without the W/ prefix and quotes)
+    """
+    digest = hashlib.sha1()
+    digest.update(str(user["_id"]).encode())
+    digest.update(str(user.get("wardrobe_version", 0)).encode())
+    for part in parts:
+        digest.update(b"\0")
+        digest.update(str(part).encode())
+    return digest.hexdigest()
+
+def parse_page_size(value):
+    """
+    Parse the limit query parameter, clamped to 1..MAX_PAGE_SIZE
+
+    Returns:
+        int: Page size, or None if the value isn't a number
+    """
+    if value is None or value == "":
+        return DEFAULT_PAGE_SIZE
+    try:
+        return max(1, min(int(value), MAX_PAGE_SIZE))
+    except ValueError:
+        return None
+
+def build_wardrobe_query(user_id, args):
+    """
+    Build the MongoDB filter for a wardrobe page from request query parameters.
+    Repeated or comma-separated values match any of them, e.g. ?color=red,blue
+
+    Args:
+        user_id: Owner's ObjectId
+        args: Request query parameters (werkzeug MultiDict)
+
+    Returns:
+        tuple: (query dict, error message or None)
+    """
+    query = {"user_id": user_id}
+
+    for param, field in WARDROBE_FILTER_FIELDS.items():
+        values = []
+        for raw in args.getlist(param):
+            values.extend(v.strip() for v in raw.split(",") if v.strip())
+        if len(values) == 1:
+            query[field] = values[0]
+        elif values:
+            query[field] = {"$in": values}
+
+    available = args.get("available")
+    if available is not None:
+        if available.lower() in ("1", "true", "yes"):
+            query["unavailable"] = {"$ne": True}
+        elif available.lower() in ("0", "false", "no"):
+            query["unavailable"] = True
+        else:
+            return None, "available must be true or false"
+
+    cursor = args.get("cursor")
+    if cursor:
+        try:
+            query["_id"] = {"$gt": ObjectId(cursor)}
+        except (InvalidId, TypeError):
+            return None, "Invalid cursor"
+
+    return query, None
+
+def serialize_wardrobe_item(item):
+    """
+    Convert a wardrobe item document into the JSON shape returned by the wardrobe API
+    """
+    return {
+        "id": item["item_id"],
+        "image_url": item["image_url"],
+        "category": item.get("category"),
+        "subcategory": item.get("subcategory"),
+        "colors": [color.get("name") for color in item.get("colors", [])],
+        "occasions": item.get("occasions", []),
+        "weather_conditions": item.get("weather_conditions", []),
+        "temperature_range": item.get("temperature_range", []),
+        "unavailable": item.get("unavailable", False)
+    }
+
+def load_wardrobe_items(uploads_collection, user_id, projection=None):
+    """
+    Load all of a user's items, storing the feature record of any item whose record was missing or stale
+    so it is only recomputed once (one bulk write, usually nothing to write)
+
+    Args:
+        uploads_collection: MongoDB collection of wardrobe items
+        user_id: The user's _id
+        projection (dict): Fields to load (all if None)
+
+    Returns:
+        list: Item documents with current feature records
+    """
+    items = list(uploads_collection.find({"user_id": user_id}, projection))
+    upgrades = []
+    for item in items:
+        stored = item.get("features")
+        if not stored or stored.get("version") != FEATURE_VERSION:
+            upgrades.append(UpdateOne({"_id": item["_id"], "features.version": {"$ne": FEATURE_VERSION}},
+                                      {"$set": {"features": get_item_features(item)}}))
+    if upgrades:
+        try:
+            uploads_collection.bulk_write(upgrades, ordered=False)
+        except Exception as e:
+            print(f"Error storing upgraded item features: {e}")
+    return items
+
+def get_wardrobe_index(uploads_collection, user):
+    """
+    Get all of a user's items, grouped for quick lookups, loading them only when the wardrobe version changed.
+    The cached item dicts are shared between requests and must not be modified (beyond their feature record).
+
+    Args:
+        uploads_collection: MongoDB collection of wardrobe items
+        user (dict): User document
+
+    Returns:
+        dict: {"items": every item, "by_id": item_id -> item, "by_category": category -> items}
+    """
+    cache_key = (user["_id"], user.get("wardrobe_version", 0))
+    with _wardrobe_index_cache_lock:
+        index = _wardrobe_index_cache.get(cache_key)
+    if index is not None:
+        return index
+
+    items = load_wardrobe_items(uploads_collection, user["_id"], {"embedding": 0})
+    by_category = {}
+    for item in items:
+        by_category.setdefault(item.get("category"), []).append(item)
+    index = {"items": items, "by_id": {item["item_id"]: item for item in items}, "by_category": by_category}
+    with _wardrobe_index_cache_lock:
+        _wardrobe_index_cache[cache_key] = index
+    return index
@@ -3,6 +3,10 @@
 import random
 from utils.outfit_generator import calculate_dominant_color_match_score, has_matching_occasion
 from utils.color_utils import is_neutral_color
+from utils.metrics import timed
+from utils.item_features import (get_item_features, is_complete_top_item, is_outerwear_item, get_dominant_color_pair_score,
+                                 has_tag, shares_tag, TEMPERATURE_BITS, WEATHER_BITS, EXCLUDED_TOP_BOTTOM_MASK, LOUNGE_MASK)
+from utils.recent_suggestions import penalize_recent, choose_fresh_item
 
 def calculate_weather_tag_match_score(item1, item2, current_temp_range, weather_condition):
     """
@@ -103,6 +107,7 @@ def calculate_weather_tag_match_score(item1, item2, current_temp_range, weather_
     # Cap the score between 0.0 and 1.0
     return max(0.0, min(1.0, score))
 
+@timed("filter_items_by_strict_temperature")
 def filter_items_by_strict_temperature(items, current_temp_range, weather_condition):
     """
     More strictly filter items by temperature and weather condition
@@ -266,6 +271,7 @@ def filter_items_by_strict_temperature(items, current_temp_range, weather_condit
     random.shuffle(result)  # Shuffle to prevent first-added bias
     return result
 
+@timed("filter_items_by_temperature_priority")
 def filter_items_by_temperature_priority(items, current_temp_range, weather_condition):
     """
     Filter clothing items based on their tagged weather metadata
@@ -350,7 +356,8 @@ def filter_items_by_temperature_priority(items, current_temp_range, weather_cond
             random.shuffle(items)  
             return items
 
-def generate_weather_based_outfit(tops, bottoms, shoes, temperature, weather_condition):
+@timed("generate_weather_based_outfit")
+def generate_weather_based_outfit(tops, bottoms, shoes, temperature, weather_condition, recent_item_ids=None):
     """
     Generate an outfit appropriate for the current weather conditions
     Prioritizing items with matching weather_conditions and temperature_range tags
@@ -365,6 +372,7 @@ def generate_weather_based_outfit(tops, bottoms, shoes, temperature, weather_con
         shoes (list): List of shoe items
         temperature (int): Current temperature in Fahrenheit
         weather_condition (str): Current weather condition (sunny, cloudy, rain, snow, etc.)
+        recent_item_ids (set): IDs of items recently suggested to the user, which are down-weighted
         
     Returns:
         tuple: (top, bottom, shoes) where bottom may be None for complete tops
@@ -490,10 +498,10 @@ def generate_weather_based_outfit(tops, bottoms, shoes, temperature, weather_con
         return None, None, None
     
     # Use a true random selection rather than any color bias
-    base_top = random.choice(weather_appropriate_tops)
+    base_top = choose_fresh_item(weather_appropriate_tops, recent_item_ids)
     
     # Check if the selected top is a "complete" top (dress, jumpsuit, etc.)
-    is_complete_top = base_top.get("subcategory") == "complete"
+    is_complete_top = is_complete_top_item(base_top)
     
     if is_complete_top:
         # For complete tops, skip bottom selection and directly match with shoes
@@ -534,6 +542,7 @@ def generate_weather_based_outfit(tops, bottoms, shoes, temperature, weather_con
             
             # If we have scored direct matches, select from them with higher probability
             if scored_direct_matches:
+                penalize_recent(scored_direct_matches, recent_item_ids)
                 scored_direct_matches.sort(key=lambda x: x[1], reverse=True)
                 top_direct_matches = scored_direct_matches[:min(3, len(scored_direct_matches))]
                 
@@ -605,8 +614,8 @@ def generate_weather_based_outfit(tops, bottoms, shoes, temperature, weather_con
                 color_score = calculate_dominant_color_match_score(base_top, shoe)
                 
                 # Check for direct color match and apply bonus
-                top_dominant_color = base_top['colors'][0]['name'].lower() if 'colors' in base_top and base_top['colors'] else None
-                shoe_dominant_color = shoe['colors'][0]['name'].lower() if 'colors' in shoe and shoe['colors'] else None
+                top_dominant_color = get_item_features(base_top)["dominant_color"]
+                shoe_dominant_color = get_item_features(shoe)["dominant_color"]
                 
                 if top_dominant_color and shoe_dominant_color and top_dominant_color == shoe_dominant_color:
                     # Direct color match bonus
@@ -625,6 +634,7 @@ def generate_weather_based_outfit(tops, bottoms, shoes, temperature, weather_con
                 scored_shoes.append((shoe, combined_score))
         
         # Sort by score and get top matches
+        penalize_recent(scored_shoes, recent_item_ids)
         scored_shoes.sort(key=lambda x: x[1], reverse=True)
         top_shoes = scored_shoes[:min(3, len(scored_shoes))]
         
@@ -671,6 +681,7 @@ def generate_weather_based_outfit(tops, bottoms, shoes, temperature, weather_con
         scored_bottoms.append((bottom, combined_score))
     
     # Sort by score and get top matches
+    penalize_recent(scored_bottoms, recent_item_ids)
     scored_bottoms.sort(key=lambda x: x[1], reverse=True)
     top_bottoms = scored_bottoms[:min(3, len(scored_bottoms))]
     
@@ -738,6 +749,7 @@ def generate_weather_based_outfit(tops, bottoms, shoes, temperature, weather_con
         
         # If we have scored direct matches, select from them with higher probability
         if scored_direct_matches:
+            penalize_recent(scored_direct_matches, recent_item_ids)
             scored_direct_matches.sort(key=lambda x: x[1], reverse=True)
             top_direct_matches = scored_direct_matches[:min(3, len(scored_direct_matches))]
             
@@ -817,8 +829,8 @@ def generate_weather_based_outfit(tops, bottoms, shoes, temperature, weather_con
             color_score = (top_color_score + bottom_color_score) / 2
             
             # Check for direct color match and apply bonus
-            top_colors = [color_data['name'].lower() for color_data in base_top['colors']] if 'colors' in base_top and base_top['colors'] else []
-            shoe_colors = [color_data['name'].lower() for color_data in shoe['colors']] if 'colors' in shoe and shoe['colors'] else []
+            top_colors = get_item_features(base_top)["colors"]
+            shoe_colors = get_item_features(shoe)["colors"]
             
             # Check for any color match between top and shoe colors
             if top_colors and shoe_colors:
@@ -849,6 +861,7 @@ def generate_weather_based_outfit(tops, bottoms, shoes, temperature, weather_con
             scored_shoes.append((shoe, combined_score))
     
     # Sort by score and get top matches
+    penalize_recent(scored_shoes, recent_item_ids)
     scored_shoes.sort(key=lambda x: x[1], reverse=True)
     top_shoes = scored_shoes[:min(3, len(scored_shoes))]
     
@@ -864,6 +877,135 @@ def generate_weather_based_outfit(tops, bottoms, shoes, temperature, weather_con
     
     return base_top, selected_bottom, selected_shoes
 
+# Temperature ranges that call for an outer layer, and the range tags an outer layer may have for each
+LAYERING_TEMP_RANGES = {"cold": ["cold"], "cool": ["cold", "cool"]}
+# Minimum score for an optional (cool weather) outer layer; cold weather always gets the best one available
+MIN_OPTIONAL_LAYER_SCORE = 0.6
+
+@timed("generate_layered_weather_outfit")
+def generate_layered_weather_outfit(tops, bottoms, shoes, temperature, weather_condition, recent_item_ids=None):
+    """
+    Generate a weather-based outfit with an outer layer (jacket, coat, etc.) over the top in cold or cool weather
+
+    The base outfit comes from generate_weather_based_outfit using only base tops; the outer layer is then chosen
+    for that outfit. Candidates are pruned with their precomputed feature masks and the precomputed dominant color
+    compatibility table before any full scoring, so layering adds one pass over the outerwear instead of
+    multiplying the top search.
+
+    Args:
+        tops (list): List of top items (base tops and outerwear)
+        bottoms (list): List of bottom items
+        shoes (list): List of shoe items
+        temperature (int): Current temperature in Fahrenheit
+        weather_condition (str): Current weather condition (sunny, cloudy, rain, snow, etc.)
+        recent_item_ids (set): IDs of items recently suggested to the user, which are down-weighted
+
+    Returns:
+        tuple: (top, bottom, shoes, outer_layer) where bottom may be None for complete tops and
+               outer_layer is None when no layer is needed or none fits
+    """
+    current_temp_range = get_temperature_range(temperature)
+    layer_temp_ranges = LAYERING_TEMP_RANGES.get(current_temp_range)
+
+    outer_layers = [top for top in tops if is_outerwear_item(top)] if layer_temp_ranges else []
+    base_tops = [top for top in tops if not is_outerwear_item(top)]
+
+    # No layering needed (or possible): same outfit as before
+    if not outer_layers or not base_tops:
+        return (*generate_weather_based_outfit(tops, bottoms, shoes, temperature, weather_condition, recent_item_ids), None)
+
+    base_top, bottom, shoe = generate_weather_based_outfit(base_tops, bottoms, shoes, temperature, weather_condition, recent_item_ids)
+    if not base_top:
+        return (*generate_weather_based_outfit(tops, bottoms, shoes, temperature, weather_condition, recent_item_ids), None)
+
+    # Prune on the feature masks: warm enough for today, tagged for today's weather if it's wet, and not formal/lounge
+    temp_mask = 0
+    for temp_range in layer_temp_ranges:
+        temp_mask |= TEMPERATURE_BITS[temp_range]
+    weather_mask = WEATHER_BITS.get(weather_condition, 0) if weather_condition in ["rain", "snow"] else 0
+    candidates = []
+    for layer in outer_layers:
+        features = get_item_features(layer)
+        if features["occasions"] & EXCLUDED_TOP_BOTTOM_MASK:
+            continue
+        if features["temperatures"] and not features["temperatures"] & temp_mask:
+            continue
+        if weather_mask and features["weather"] and not features["weather"] & weather_mask:
+            continue
+        candidates.append(layer)
+
+    # Prune on color: keep layers whose dominant color works with the base top (table lookup, no scoring yet)
+    color_compatible = [layer for layer in candidates if get_dominant_color_pair_score(layer, base_top) >= 0.8]
+    if color_compatible:
+        candidates = color_compatible
+    if not candidates:
+        return base_top, bottom, shoe, None
+
+    scored_layers = []
+    for layer in candidates:
+        weather_score = calculate_weather_tag_match_score(layer, base_top, current_temp_range, weather_condition)
+        color_score = get_dominant_color_pair_score(layer, base_top)
+        if bottom:
+            color_score = (color_score + get_dominant_color_pair_score(layer, bottom)) / 2
+        occasion_score = 0.1 if shares_any_occasion(layer, base_top) else 0
+        scored_layers.append((layer, (weather_score * 0.5) + (color_score * 0.4) + occasion_score))
+
+    penalize_recent(scored_layers, recent_item_ids)
+    scored_layers.sort(key=lambda x: x[1], reverse=True)
+    top_layers = scored_layers[:min(3, len(scored_layers))]
+
+    # Cool weather: only add a layer that actually goes with the outfit
+    if current_temp_range == "cool" and top_layers[0][1] < MIN_OPTIONAL_LAYER_SCORE:
+        return base_top, bottom, shoe, None
+
+    outer_layer = random.choices(
+        [item[0] for item in top_layers],
+        weights=[max(0.1, item[1]) for item in top_layers],
+        k=1
+    )[0]
+
+    return base_top, bottom, shoe, outer_layer
+
+def _without_items(items, excluded_ids):
+    # Drop excluded items unless that would leave nothing to choose from
+    remaining = [item for item in items if item["item_id"] not in excluded_ids]
+    return remaining if remaining else items
+
+@timed("generate_weekly_weather_outfits")
+def generate_weekly_weather_outfits(tops, bottoms, shoes, day_forecasts, recent_item_ids=None):
+    """
+    Generate one layered weather outfit per day from a single wardrobe snapshot
+
+    Items worn on one day are left out of the next day's candidates (unless a category would run empty),
+    and every item already planned this week is down-weighted like a recent suggestion, so the week
+    spreads across the wardrobe.
+
+    Args:
+        tops, bottoms, shoes (list): Wardrobe snapshot split by category
+        day_forecasts (list): Per-day dicts with "temperature" and "weather_condition" (see summarize_forecast_window)
+        recent_item_ids (set): IDs of items recently suggested to the user, which are down-weighted
+
+    Returns:
+        list: (top, bottom, shoes, outer_layer) per day, in the order of day_forecasts
+    """
+    planned = []
+    week_item_ids = set(recent_item_ids or ())
+    previous_day_ids = set()
+
+    for day in day_forecasts:
+        outfit = generate_layered_weather_outfit(
+            _without_items(tops, previous_day_ids),
+            _without_items(bottoms, previous_day_ids),
+            _without_items(shoes, previous_day_ids),
+            day["temperature"], day["weather_condition"], week_item_ids
+        )
+        planned.append(outfit)
+        previous_day_ids = {item["item_id"] for item in outfit if item}
+        week_item_ids |= previous_day_ids
+
+    return planned
+
+@timed("weather_filter_shoes_by_color_match")
 def filter_shoes_by_color_match(top, shoes):
     """
     Filter shoes to include those that match any of the top's colors, complement the top's colors,
@@ -884,7 +1026,7 @@ def filter_shoes_by_color_match(top, shoes):
         return shoes
     
     # Get ALL of the top's colors
-    top_colors = [color_data['name'].lower() for color_data in top['colors']] if top['colors'] else []
+    top_colors = get_item_features(top)["colors"]
     
     if not top_colors:
         return shoes
@@ -913,7 +1055,7 @@ def filter_shoes_by_color_match(top, shoes):
             continue
             
         # Get ALL of the shoe's colors
-        shoe_colors = [color_data['name'].lower() for color_data in shoe['colors']]
+        shoe_colors = get_item_features(shoe)["colors"]
         
         # Check if ANY shoe color directly matches ANY top color
         has_direct_match = any(shoe_color in top_colors for shoe_color in shoe_colors)
@@ -971,12 +1113,8 @@ def shares_any_occasion(item1, item2):
     Returns:
         bool: True if items share at least one occasion tag, False otherwise
     """
-    if 'occasions' not in item1 or not item1['occasions'] or 'occasions' not in item2 or not item2['occasions']:
-        # If either item has no occasion tags, consider them as not sharing occasions
-        return False
-    
-    # Check for intersection between occasion lists
-    return bool(set(item1['occasions']).intersection(set(item2['occasions'])))
+    # Items with no occasion tags never share occasions
+    return shares_tag(get_item_features(item1), get_item_features(item2), "occasions")
 
 def has_excluded_occasion_for_top_bottom(item):
     """
@@ -989,10 +1127,7 @@ def has_excluded_occasion_for_top_bottom(item):
     Returns:
         bool: True if the item has an excluded occasion tag, False otherwise
     """
-    if 'occasions' in item and item['occasions']:
-        excluded_occasions = ["formal", "lounge/sleepwear"]
-        return any(occasion in excluded_occasions for occasion in item['occasions'])
-    return False
+    return bool(get_item_features(item)["occasions"] & EXCLUDED_TOP_BOTTOM_MASK)
 
 def has_lounge_sleepwear_occasion(item):
     """
@@ -1005,9 +1140,7 @@ def has_lounge_sleepwear_occasion(item):
     Returns:
         bool: True if the item has the lounge/sleepwear tag, False otherwise
     """
-    if 'occasions' in item and item['occasions']:
-        return "lounge/sleepwear" in item['occasions']
-    return False
+    return bool(get_item_features(item)["occasions"] & LOUNGE_MASK)
 
 def get_temperature_range(temperature):
     """
@@ -1039,9 +1172,7 @@ def has_weather_tag(item, weather_condition):
     Returns:
         bool: True if the item has the weather tag, False otherwise
     """
-    if 'weather_conditions' in item and item['weather_conditions']:
-        return weather_condition in item['weather_conditions']
-    return False
+    return has_tag(get_item_features(item), "weather", weather_condition)
 
 def has_temperature_range_tag(item, temp_range):
     """
@@ -1054,9 +1185,7 @@ def has_temperature_range_tag(item, temp_range):
     Returns:
         bool: True if the item has the temperature range tag, False otherwise
     """
-    if 'temperature_range' in item and item['temperature_range']:
-        return temp_range in item['temperature_range']
-    return False
+    return has_tag(get_item_features(item), "temperatures", temp_range)
 
 def get_adjacent_temp_ranges(temp_range):
     """
@@ -1,7 +1,32 @@
 # utils/weather_utils.py
-import requests
+import os
+import copy
+import threading
+from datetime import datetime, timedelta, timezone
+from cachetools import TTLCache
+from utils.http_utils import http_session, OPENWEATHER_API_BASE
+from utils.metrics import record_cache_lookup
 import math
 
+# 5 day / 3 hour forecasts keyed by location. OpenWeather refreshes them every few hours, so one
+# fetch serves every planning request for the same place until the entry expires.
+_forecast_cache = TTLCache(maxsize=int(os.environ.get("FORECAST_CACHE_SIZE", 256)),
+                           ttl=int(os.environ.get("FORECAST_CACHE_TTL", 30 * 60)))
+_forecast_cache_lock = threading.Lock()
+
+# Length of one forecast step and number of days the forecast covers
+FORECAST_STEP = timedelta(hours=3)
+FORECAST_DAYS = 5
+
+# How bad each simplified condition is for an outfit; a window takes its worst condition
+CONDITION_SEVERITY = {"sunny": 0, "other": 1, "cloudy": 2, "rain": 3, "snow": 4}
+
+def _location_query(location):
+    # US zip codes and city names use different query parameters
+    if location.isdigit() and len(location) == 5:
+        return f"zip={location},us"
+    return f"q={location}"
+
 def get_weather_by_location(location, api_key):
     """
     Get weather information for a specific location using OpenWeather API
@@ -15,15 +40,9 @@ def get_weather_by_location(location, api_key):
         dict: Weather data or None if request fails
     """
     try:
-        # Check if the location is a US zip code
-        if location.isdigit() and len(location) == 5:
-            # US zip code
-            url = f"https://api.openweathermap.org/data/2.5/weather?zip={location},us&appid={api_key}&units=imperial"
-        else:
-            # City name
-            url = f"https://api.openweathermap.org/data/2.5/weather?q={location}&appid={api_key}&units=imperial"
+        url = f"{OPENWEATHER_API_BASE}/data/2.5/weather?{_location_query(location)}&appid={api_key}&units=imperial"
             
-        response = requests.get(url)
+        response = http_session.get(url)
         response.raise_for_status()
         
         weather_data = response.json()
@@ -37,6 +56,118 @@ def get_weather_by_location(location, api_key):
         print(f"Error fetching weather data: {e}")
         return None
 
+def get_forecast_by_location(location, api_key):
+    """
+    Get the 5 day / 3 hour forecast for a location using OpenWeather API, cached per location
+    
+    Args:
+        location (str): City name or zip code
+        api_key (str): OpenWeather API key
+        
+    Returns:
+        dict: Forecast data ("list" of 3-hour entries and "city" with its UTC offset) or None if request fails
+    """
+    cache_key = location.strip().lower()
+    with _forecast_cache_lock:
+        cached = _forecast_cache.get(cache_key)
+    record_cache_lookup("forecast", cached is not None)
+    if cached is not None:
+        return copy.deepcopy(cached)
+
+    try:
+        url = f"{OPENWEATHER_API_BASE}/data/2.5/forecast?{_location_query(location)}&appid={api_key}&units=imperial"
+        response = http_session.get(url)
+        response.raise_for_status()
+        forecast_data = response.json()
+    except Exception as e:
+        print(f"Error fetching forecast data: {e}")
+        return None
+
+    if not forecast_data.get("list"):
+        print(f"Error fetching forecast data: no forecast entries for {location}")
+        return None
+
+    # Failed lookups aren't cached, so the next request retries
+    with _forecast_cache_lock:
+        _forecast_cache[cache_key] = copy.deepcopy(forecast_data)
+    return forecast_data
+
+def get_forecast_timezone(forecast_data):
+    """
+    Get the forecast location's timezone from its UTC offset in seconds
+    """
+    return timezone(timedelta(seconds=forecast_data.get("city", {}).get("timezone", 0)))
+
+def get_local_window(forecast_data, day_offset, start_hour, end_hour):
+    """
+    Build a time window in the forecast location's local time
+    
+    Args:
+        forecast_data (dict): Forecast from get_forecast_by_location
+        day_offset (int): Days after today (0 = today, in the location's timezone)
+        start_hour (int): Local hour the window starts (0-23)
+        end_hour (int): Local hour the window ends (1-24, after start_hour)
+        
+    Returns:
+        tuple: (start, end) timezone-aware datetimes
+    """
+    tz = get_forecast_timezone(forecast_data)
+    today = datetime.now(tz).replace(hour=0, minute=0, second=0, microsecond=0)
+    day = today + timedelta(days=day_offset)
+    return day + timedelta(hours=start_hour), day + timedelta(hours=end_hour)
+
+def summarize_forecast_window(forecast_data, start, end):
+    """
+    Summarize the forecast over a time window: its temperature range and its worst weather condition
+    
+    Every 3-hour entry that overlaps the window counts. If none does (the window is already over or
+    beyond the forecast), the entry closest to the window is used instead.
+    
+    Args:
+        forecast_data (dict): Forecast from get_forecast_by_location
+        start (datetime): Window start (timezone-aware)
+        end (datetime): Window end (timezone-aware)
+        
+    Returns:
+        dict: Summary with:
+            - start / end: the window in ISO format
+            - min_temperature / max_temperature: rounded temperature range over the window
+            - temperature: the temperature to dress for (the window's minimum, so the outfit covers the coldest part)
+            - weather_condition: worst simplified condition over the window
+            - weather_description: description of the entry with that condition
+            - entries: number of forecast entries the summary covers
+            - estimated: True if no entry overlapped the window and the closest one was used
+    """
+    entries = []
+    for entry in forecast_data["list"]:
+        entry_start = datetime.fromtimestamp(entry["dt"], tz=timezone.utc)
+        if entry_start < end and entry_start + FORECAST_STEP > start:
+            entries.append(entry)
+    if not entries:
+        entries = [min(forecast_data["list"], key=lambda entry: abs(entry["dt"] - start.timestamp()))]
+        estimated = True
+    else:
+        estimated = False
+
+    temperatures = [entry["main"]["temp"] for entry in entries]
+    worst_condition, worst_description = "sunny", ""
+    for entry in entries:
+        condition = get_weather_condition_by_id(entry["weather"][0]["id"])
+        if not worst_description or CONDITION_SEVERITY.get(condition, 1) > CONDITION_SEVERITY.get(worst_condition, 1):
+            worst_condition, worst_description = condition, entry["weather"][0].get("description", "")
+
+    return {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "min_temperature": round(min(temperatures)),
+        "max_temperature": round(max(temperatures)),
+        "temperature": round(min(temperatures)),
+        "weather_condition": worst_condition,
+        "weather_description": worst_description,
+        "entries": len(entries),
+        "estimated": estimated
+    }
+
 def get_weather_condition_by_id(weather_id):
     """
     Map OpenWeather condition ID to simplified condition name